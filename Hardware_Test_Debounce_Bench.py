@@ -0,0 +1,123 @@
+# Melatroid - Whammy 4 TEST - DEBOUNCE COST BENCHMARK 1.00
+# Per-iteration cost of the input debouncers (run on the RP2040, prints us/iteration):
+#   pin_scalar : Pin.value() per input + scalar state   (NEO main.py up to 2.22)
+#   pin_dict   : Pin.value() per input + dict state     (Hardware_Test_Midi_Access.py)
+#   sio_vcount : one mem32 read of SIO GPIO_IN + vertical counter (NEO main.py 2.23)
+from machine import Pin, mem32
+import time
+
+PIN_FOOTSW = 4
+PIN_LAYER_SWITCH = 14
+EXTRA_PINS = (2, 3, 5, 6, 7, 8)   # unused pins with pull-ups: shows how the cost scales
+
+DEBOUNCE_MS = 10
+ITERATIONS = 5000
+SIO_GPIO_IN = 0xD0000004
+
+footsw = Pin(PIN_FOOTSW, Pin.IN, Pin.PULL_UP)
+layer_sw = Pin(PIN_LAYER_SWITCH, Pin.IN, Pin.PULL_UP)
+extra = [Pin(p, Pin.IN, Pin.PULL_UP) for p in EXTRA_PINS]
+
+
+# ---------------- Pin.value() + scalar state ----------------
+stable_sw = footsw.value()
+last_sw = stable_sw
+last_change = time.ticks_ms()
+stable_layer = layer_sw.value()
+last_layer = stable_layer
+last_layer_change = time.ticks_ms()
+
+
+def pin_scalar(now):
+    global stable_sw, last_sw, last_change, stable_layer, last_layer, last_layer_change
+    raw = layer_sw.value()
+    if raw != last_layer:
+        last_layer = raw
+        last_layer_change = now
+    if time.ticks_diff(now, last_layer_change) >= DEBOUNCE_MS and stable_layer != last_layer:
+        stable_layer = last_layer
+    raw = footsw.value()
+    if raw != last_sw:
+        last_sw = raw
+        last_change = now
+    if time.ticks_diff(now, last_change) >= DEBOUNCE_MS and stable_sw != last_sw:
+        stable_sw = last_sw
+
+
+# ---------------- Pin.value() + dict state ----------------
+def debounce_init(pin):
+    v = pin.value()
+    return {"stable": v, "last_raw": v, "last_change_ms": time.ticks_ms()}
+
+
+def debounce_update(pin, state, now_ms):
+    raw = pin.value()
+    if raw != state["last_raw"]:
+        state["last_raw"] = raw
+        state["last_change_ms"] = now_ms
+    if time.ticks_diff(now_ms, state["last_change_ms"]) >= DEBOUNCE_MS:
+        if state["stable"] != state["last_raw"]:
+            state["stable"] = state["last_raw"]
+
+
+dict_pins = [footsw, layer_sw]
+dict_states = [debounce_init(p) for p in dict_pins]
+
+
+def pin_dict(now):
+    for k in range(len(dict_pins)):
+        debounce_update(dict_pins[k], dict_states[k], now)
+
+
+# ---------------- SIO snapshot + vertical counter ----------------
+input_mask = (1 << PIN_FOOTSW) | (1 << PIN_LAYER_SWITCH)
+db_state = mem32[SIO_GPIO_IN] & input_mask
+db_cnt0 = 0
+db_cnt1 = 0
+
+
+def sio_vcount(now):
+    global db_state, db_cnt0, db_cnt1
+    delta = (mem32[SIO_GPIO_IN] & input_mask) ^ db_state
+    db_cnt1 = (db_cnt1 ^ db_cnt0) & delta
+    db_cnt0 = ~db_cnt0 & delta
+    flipped = delta & ~(db_cnt0 | db_cnt1)
+    db_state ^= flipped
+    return flipped
+
+
+def use_pins(pins):
+    """Debounce footswitch + layer switch + `pins` in the dict and SIO variants."""
+    global dict_pins, dict_states, input_mask, db_state, db_cnt0, db_cnt1
+    dict_pins = [footsw, layer_sw] + pins
+    dict_states = [debounce_init(p) for p in dict_pins]
+    input_mask = (1 << PIN_FOOTSW) | (1 << PIN_LAYER_SWITCH)
+    for p in EXTRA_PINS[:len(pins)]:
+        input_mask |= 1 << p
+    db_state = mem32[SIO_GPIO_IN] & input_mask
+    db_cnt0 = 0
+    db_cnt1 = 0
+
+
+def bench(fn):
+    now = time.ticks_ms()
+    t0 = time.ticks_us()
+    for _ in range(ITERATIONS):
+        fn(now)
+    return time.ticks_diff(time.ticks_us(), t0) / ITERATIONS
+
+
+def bench_empty(now):
+    pass
+
+
+print("=== DEBOUNCE COST (%d iterations, us per iteration, loop overhead removed) ===" % ITERATIONS)
+base = bench(bench_empty)
+print("pin_scalar  2 inputs: %6.2f" % (bench(pin_scalar) - base))
+use_pins([])
+print("pin_dict    2 inputs: %6.2f" % (bench(pin_dict) - base))
+print("sio_vcount  2 inputs: %6.2f" % (bench(sio_vcount) - base))
+use_pins(extra)
+n = 2 + len(extra)
+print("pin_dict    %d inputs: %6.2f" % (n, bench(pin_dict) - base))
+print("sio_vcount  %d inputs: %6.2f" % (n, bench(sio_vcount) - base))
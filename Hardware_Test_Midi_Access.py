@@ -1,7 +1,14 @@
-# Melatroid - Whammy 4 MIDI TEST - SWITCHES AND MIDI CHANNELS 1.10 
+# Melatroid - Whammy 4 MIDI TEST - SWITCHES AND MIDI CHANNELS 1.12 
 from machine import Pin, ADC, UART
+from array import array
+import micropython
 import time
 
+# "channels": switches, pot and MIDI channel test (1 Hz)
+# "bounce"  : raw footswitch/layer switch edges -> bounce statistics (see BOUNCE CAPTURE)
+# "pot"     : pot ADC noise floor, dead zones, linearity -> pot_cal.json (see POT PROFILE)
+TEST_MODE = "channels"
+
 SHOWVALUES = True
 TEST_CHANNELS = True
 
@@ -29,6 +36,26 @@ CHANNEL_TEST_CC_ON = 127
 CHANNEL_TEST_CC_OFF = 0
 CHANNEL_TEST_PULSE_MS = 60
 
+# Bounce capture: every raw edge on GPIO4/GPIO14 is timestamped (ticks_us) in the pin IRQ
+# and printed as "E <gpio> <level> <t_us>". The board reports the bounce distribution
+# every BOUNCE_REPORT_EVERY footswitch presses (and on Ctrl+C) with bounce_analysis.py
+# (upload it next to this file); the same analysis runs on a captured log on the PC:
+#   python bounce_analysis.py capture.txt
+BOUNCE_RING = 256
+BOUNCE_PRINT_EDGES = True
+BOUNCE_REPORT_EVERY = 20
+
+# Pot profile: at POT_PROFILE_MARKS knob positions (footswitch = capture) the pot ADC is
+# read back to back into an array. pot_analysis.py (upload it next to this file) reports
+# noise floor, end-stop dead zones and linearity, suggests the pot filter parameters and
+# writes the calibration table POT_CAL_FILE (NEO loads it at boot). The same analysis
+# runs on a captured log on the PC:
+#   python pot_analysis.py capture.txt
+POT_PROFILE_MARKS = 5          # 0 %, 25 %, 50 %, 75 %, 100 % of the knob travel (>= 2)
+POT_PROFILE_SAMPLES = 4096
+POT_PROFILE_SETTLE_MS = 500    # foot off the pedal before the capture starts
+POT_CAL_FILE = "pot_cal.json"
+
 PRESETS = [
     ("Detune Shallow", 0),
     ("Detune Deep", 1),
@@ -87,76 +114,202 @@ def pressed_from_pullup(stable_raw):
 def adc_to_8bit(v_u16):
     return (v_u16 * 255 + 32767) // 65535
 
-fs_state = debounce_init(footsw)
-ly_state = debounce_init(layer_sw)
-
-raw8 = adc_to_8bit(pot.read_u16())
-filt8 = raw8
-
-last_pot_8_reported = filt8
-pending_pot_8 = last_pot_8_reported
-pending_pot_changed = False
-
-last_tick_ms = time.ticks_ms()
-ch_test_0 = 0
-preset_index = 0
-
-print("=== INPUT + CHANNEL TEST (1Hz) ===")
-print("Ctrl+C to stop\n")
+# =========================================================
+# BOUNCE CAPTURE (TEST_MODE = "bounce")
+# =========================================================
+# The IRQ only stores (ticks_us, gpio, level) in a preallocated ring; the loop prints
+# and analyses the edges. A full ring drops edges (counted, reported at the end).
+micropython.alloc_emergency_exception_buf(100)
+
+bounce_t = array("I", [0] * BOUNCE_RING)
+bounce_gpio = bytearray(BOUNCE_RING)
+bounce_level = bytearray(BOUNCE_RING)
+bounce_head = 0     # next slot the IRQ writes
+bounce_tail = 0     # next slot the loop reads
+bounce_lost = 0
+
+def bounce_irq(pin):
+    global bounce_head, bounce_lost
+    t = time.ticks_us()
+    nxt = (bounce_head + 1) % BOUNCE_RING
+    if nxt == bounce_tail:
+        bounce_lost += 1
+        return
+    bounce_t[bounce_head] = t
+    bounce_gpio[bounce_head] = PIN_FOOTSW if pin is footsw else PIN_LAYER_SWITCH
+    bounce_level[bounce_head] = pin.value()
+    bounce_head = nxt
+
+def bounce_test():
+    global bounce_tail
+    import bounce_analysis
+    an = bounce_analysis.BounceAnalyzer()
+    for pin in (footsw, layer_sw):
+        pin.irq(bounce_irq, Pin.IRQ_FALLING | Pin.IRQ_RISING, hard=True)
+    print("=== SWITCH BOUNCE CAPTURE === press the footswitch / flip the layer switch many times")
+    print("Ctrl+C to stop\n")
+    reported = 0
+    try:
+        while True:
+            while bounce_tail != bounce_head:
+                k = bounce_tail
+                if BOUNCE_PRINT_EDGES:
+                    print("E", bounce_gpio[k], bounce_level[k], bounce_t[k])
+                an.feed(bounce_gpio[k], bounce_level[k], bounce_t[k])
+                bounce_tail = (k + 1) % BOUNCE_RING
+            an.settle(time.ticks_us())
+            presses = an.count(PIN_FOOTSW, bounce_analysis.PRESS)
+            if presses - reported >= BOUNCE_REPORT_EVERY:
+                reported = presses
+                for line in an.report():
+                    print(line)
+            time.sleep_ms(POLL_MS)
+    except KeyboardInterrupt:
+        pass
+    for pin in (footsw, layer_sw):
+        pin.irq(None)
+    an.finish()
+    for line in an.report():
+        print(line)
+    print("lost edges (ring full):", bounce_lost)
+    print("\nTest stopped.")
 
-try:
+# =========================================================
+# POT PROFILE (TEST_MODE = "pot")
+# =========================================================
+def pot_capture(buf):
+    """Fill buf with back-to-back pot reads, returns the sample rate (Hz)."""
+    read = pot.read_u16
+    t0 = time.ticks_us()
+    for i in range(len(buf)):
+        buf[i] = read()
+    dt = time.ticks_diff(time.ticks_us(), t0)
+    return len(buf) * 1000000 // max(dt, 1)
+
+def wait_footswitch():
+    """Debounced footswitch press + release; shows the live pot reading meanwhile."""
+    state = debounce_init(footsw)
+    was_pressed = False
+    last_print_ms = time.ticks_ms()
     while True:
         now = time.ticks_ms()
-
-        debounce_update(footsw, fs_state, now)
-        debounce_update(layer_sw, ly_state, now)
-
-        raw8 = adc_to_8bit(pot.read_u16())
-        filt8 = filt8 + (POT_SMOOTH_ALPHA_NUM * (raw8 - filt8)) // POT_SMOOTH_ALPHA_DEN
-
-        if abs(filt8 - last_pot_8_reported) >= POT_PRINT_THRESHOLD_8BIT:
-            pending_pot_8 = filt8
-            pending_pot_changed = True
-
-        if (SHOWVALUES or TEST_CHANNELS) and time.ticks_diff(now, last_tick_ms) >= PRINT_EVERY_MS:
-            fs_pressed = pressed_from_pullup(fs_state["stable"])
-            ly_on = pressed_from_pullup(ly_state["stable"])
-            layer = "LAYER_2" if ly_on else "LAYER_1"
-
-            if pending_pot_changed:
-                last_pot_8_reported = pending_pot_8
-                pending_pot_changed = False
-
-            ch_1based = ch_test_0 + 1
-
-            if TEST_CHANNELS:
-                if CHANNEL_TEST_SEND_PC:
-                    _, pc = PRESETS[preset_index]
-                    midi_pc(pc, ch_test_0)
-                if CHANNEL_TEST_SEND_CC0:
-                    midi_cc(CHANNEL_TEST_CC_NUM, CHANNEL_TEST_CC_ON, ch_test_0)
-                    time.sleep_ms(CHANNEL_TEST_PULSE_MS)
-                    midi_cc(CHANNEL_TEST_CC_NUM, CHANNEL_TEST_CC_OFF, ch_test_0)
-
-            if SHOWVALUES:
-                preset_name, preset_pc = PRESETS[preset_index]
-                print(
-                    f"CH={ch_1based:02d} | "
-                    f"FOOTSW={fs_pressed} | "
-                    f"LAYER_SW={ly_on} ({layer}) | "
-                    f"POT_8bit={last_pot_8_reported:3d} | "
-                    f"PC={preset_pc:02d} {preset_name}"
-                )
-            else:
-                print(f"CH={ch_1based:02d}")
-
-            ch_test_0 = (ch_test_0 + 1) % 16
-            preset_index = (preset_index + 1) % len(PRESETS)
-            last_tick_ms = now
-
+        debounce_update(footsw, state, now)
+        pressed = pressed_from_pullup(state["stable"])
+        if was_pressed and not pressed:
+            return
+        was_pressed = pressed
+        if time.ticks_diff(now, last_print_ms) >= PRINT_EVERY_MS:
+            print("   pot now:", pot.read_u16())
+            last_print_ms = now
         time.sleep_ms(POLL_MS)
 
-except KeyboardInterrupt:
-    print("\nTest stopped.")
-
-
+def pot_test():
+    if POT_PROFILE_MARKS < 2:
+        print("POT_PROFILE_MARKS must be >= 2 (both ends of the travel)")
+        return
+    import pot_analysis
+    prof = pot_analysis.PotProfile()
+    buf = array("H", bytes(2 * POT_PROFILE_SAMPLES))
+    print("=== POT PROFILE (%d knob positions, %d reads each) ===" % (
+        POT_PROFILE_MARKS, POT_PROFILE_SAMPLES))
+    print("Ctrl+C to stop\n")
+    try:
+        for k in range(POT_PROFILE_MARKS):
+            percent = k * 100 // (POT_PROFILE_MARKS - 1)
+            print("turn the pot to %d %% of its travel, then press the footswitch" % percent)
+            wait_footswitch()
+            time.sleep_ms(POT_PROFILE_SETTLE_MS)
+            rate = pot_capture(buf)
+            point = prof.add_block(k * 65535 // (POT_PROFILE_MARKS - 1), buf)
+            print(pot_analysis.point_line(point))
+            print("   %d reads at %d Hz" % (len(buf), rate))
+    except KeyboardInterrupt:
+        print("\nTest stopped.")
+        return
+    for line in prof.report():
+        print(line)
+    cal = prof.table()
+    if cal is not None:
+        pot_analysis.save_table(cal, POT_CAL_FILE)
+        print("calibration table written to", POT_CAL_FILE)
+    print("\nTest done.")
+
+def channel_test():
+    fs_state = debounce_init(footsw)
+    ly_state = debounce_init(layer_sw)
+
+    raw8 = adc_to_8bit(pot.read_u16())
+    filt8 = raw8
+
+    last_pot_8_reported = filt8
+    pending_pot_8 = last_pot_8_reported
+    pending_pot_changed = False
+
+    last_tick_ms = time.ticks_ms()
+    ch_test_0 = 0
+    preset_index = 0
+
+    print("=== INPUT + CHANNEL TEST (1Hz) ===")
+    print("Ctrl+C to stop\n")
+
+    try:
+        while True:
+            now = time.ticks_ms()
+
+            debounce_update(footsw, fs_state, now)
+            debounce_update(layer_sw, ly_state, now)
+
+            raw8 = adc_to_8bit(pot.read_u16())
+            filt8 = filt8 + (POT_SMOOTH_ALPHA_NUM * (raw8 - filt8)) // POT_SMOOTH_ALPHA_DEN
+
+            if abs(filt8 - last_pot_8_reported) >= POT_PRINT_THRESHOLD_8BIT:
+                pending_pot_8 = filt8
+                pending_pot_changed = True
+
+            if (SHOWVALUES or TEST_CHANNELS) and time.ticks_diff(now, last_tick_ms) >= PRINT_EVERY_MS:
+                fs_pressed = pressed_from_pullup(fs_state["stable"])
+                ly_on = pressed_from_pullup(ly_state["stable"])
+                layer = "LAYER_2" if ly_on else "LAYER_1"
+
+                if pending_pot_changed:
+                    last_pot_8_reported = pending_pot_8
+                    pending_pot_changed = False
+
+                ch_1based = ch_test_0 + 1
+
+                if TEST_CHANNELS:
+                    if CHANNEL_TEST_SEND_PC:
+                        _, pc = PRESETS[preset_index]
+                        midi_pc(pc, ch_test_0)
+                    if CHANNEL_TEST_SEND_CC0:
+                        midi_cc(CHANNEL_TEST_CC_NUM, CHANNEL_TEST_CC_ON, ch_test_0)
+                        time.sleep_ms(CHANNEL_TEST_PULSE_MS)
+                        midi_cc(CHANNEL_TEST_CC_NUM, CHANNEL_TEST_CC_OFF, ch_test_0)
+
+                if SHOWVALUES:
+                    preset_name, preset_pc = PRESETS[preset_index]
+                    print(
+                        f"CH={ch_1based:02d} | "
+                        f"FOOTSW={fs_pressed} | "
+                        f"LAYER_SW={ly_on} ({layer}) | "
+                        f"POT_8bit={last_pot_8_reported:3d} | "
+                        f"PC={preset_pc:02d} {preset_name}"
+                    )
+                else:
+                    print(f"CH={ch_1based:02d}")
+
+                ch_test_0 = (ch_test_0 + 1) % 16
+                preset_index = (preset_index + 1) % len(PRESETS)
+                last_tick_ms = now
+
+            time.sleep_ms(POLL_MS)
+
+    except KeyboardInterrupt:
+        print("\nTest stopped.")
+
+if TEST_MODE == "bounce":
+    bounce_test()
+elif TEST_MODE == "pot":
+    pot_test()
+else:
+    channel_test()
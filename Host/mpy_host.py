@@ -0,0 +1,719 @@
+# Melatroid - Whammy 4 - Host stand-in (CPython)
+"""
+Runs the RP2040 MicroPython firmwares unchanged on a PC with a VIRTUAL clock.
+
+- machine.Pin / ADC / UART, time.ticks_*, urandom, gc are replaced by stand-ins
+- machine.SPI / I2C talk to device models in h.spi_devices (by bus id) and
+  h.i2c_devices (by address); a transfer takes its modelled bus time
+- h.pin_hooks[pin_id](level) sees output levels the firmware writes (e.g. a latch pin)
+- run(..., overrides={"NAME": value}) replaces top-level `NAME = ...` config lines
+- machine.mem32/mem16/mem8: SIO GPIO_IN (0xD0000004) reads the pin levels, other
+  addresses read back what was written (h.mem)
+- rp2: @asm_pio programs are not run; a StateMachine records what is put into its TX
+  FIFO and whether it is active (h.state_machines)
+- micropython.native/viper are plain Python; the viper casts ptr8/ptr16/ptr32 return
+  the buffer itself and uint is int (firmware keeps values in range, see eng_stepseq)
+- the firmware runs as the __main__ module with its folder on sys.path, so modules it
+  imports next to it (NEO eng_*.py) load as on the board and can `import __main__`
+- time only advances inside sleep_ms()/sleep_us(); the optional injected loop lag (the
+  work of a main loop pass) is added once per pass, after whichever sleep ends it, so
+  the next pass (and its lane service) runs that much later
+- every UART write is logged with its write time and its modelled wire time
+  (10 bits per byte at the configured baud rate)
+- h.loopback_pin: the UART TX line wired back to a GPIO (start bit of every byte as a
+  falling edge at its wire time, pin IRQs fire then)
+- USB serial: sys.stdin/sys.stdout are redirected to usb_rx/usb_tx during a run,
+  select.poll() sees usb_rx
+
+A "driver" generator scripts the physical world:
+    yield 250                      -> let 250 ms of virtual time pass
+    yield lambda ns: ns["stage"]   -> wait until the firmware state matches
+    h.set_pin(4, 0)                -> footswitch down (pull-up: 0 = pressed)
+"""
+import builtins
+import collections
+import heapq
+import io
+import os
+import random
+import sys
+import tempfile
+import types
+
+TICKS_PERIOD = 1 << 30   # MicroPython ticks wrap (same on RP2040)
+TICKS_HALF = TICKS_PERIOD >> 1
+
+MIDI_BITS_PER_BYTE = 10
+
+
+class SimDone(KeyboardInterrupt):
+    """Raised from sleep when the run is over (firmwares exit on KeyboardInterrupt)."""
+
+
+class Host:
+    def __init__(self, seed=1, start_us=0, loop_lag_us=None):
+        self.us = start_us
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.loop_lag_us = loop_lag_us     # callable -> extra µs per pass (loop lateness)
+        self.pin_levels = {}
+        self.pins = {}
+        self.adc_values = {}
+        self.uarts = []
+        self.tx_log = []                   # (write_us, wire_start_us, wire_end_us, bytes)
+        self.pin_log = []                  # (us, pin_id, level) for every level change set_pin() made
+        self.rx_queue = collections.deque()  # (arrival_us, byte)
+        self.usb_rx = collections.deque()    # bytes waiting on USB serial (host -> board)
+        self.usb_tx = bytearray()            # bytes written to USB serial (board -> host)
+        self.ns = None
+        self.until_us = None
+        self._driver = None
+        self._wait = None
+        self._wake_us = 0
+        self._sleep_calls = 0
+        self.tx_free_us = 0
+        self.baud = 31250
+        self.mem = {}                      # machine.memNN writes (address -> value)
+        self.spi_devices = {}              # SPI bus id -> model with readinto(buf)
+        self.i2c_devices = {}              # I2C address -> model (see build_modules: I2C)
+        self.pin_hooks = {}                # pin id -> fn(level) on every firmware write
+        self.state_machines = {}           # rp2 state machine id -> stand-in (program not run)
+        self.loopback_pin = None           # GPIO the UART TX line is wired back to
+        self.pin_events = []               # heap of (us, n, pin_id, level) for schedule_pin()
+        self._pin_event_n = 0
+
+    # -----------------------------------------------------
+    # world control (used by drivers)
+    # -----------------------------------------------------
+    def set_pin(self, pin_id: int, level: int):
+        old = self.pin_levels.get(pin_id, 1)
+        self.pin_levels[pin_id] = 1 if level else 0
+        if old != self.pin_levels[pin_id]:
+            self.pin_log.append((self.us, pin_id, self.pin_levels[pin_id]))
+        pin = self.pins.get(pin_id)
+        if pin is not None and old != self.pin_levels[pin_id]:
+            pin._edge(self.pin_levels[pin_id])
+
+    def schedule_pin(self, us: int, pin_id: int, level: int):
+        """set_pin() at virtual time `us` (fires while the firmware sleeps past it)."""
+        self._pin_event_n += 1
+        heapq.heappush(self.pin_events, (us, self._pin_event_n, pin_id, level))
+
+    def set_adc(self, pin_id: int, value_u16: int):
+        self.adc_values[pin_id] = value_u16 & 0xFFFF
+
+    def feed_rx(self, data: bytes, spacing_us: int = None):
+        """Queue bytes on the UART RX line, back-to-back at wire speed by default."""
+        if spacing_us is None:
+            spacing_us = self.byte_us()
+        t = self.us
+        if self.rx_queue:
+            t = max(t, self.rx_queue[-1][0])
+        for b in data:
+            t += spacing_us
+            self.rx_queue.append((t, b))
+
+    def feed_usb(self, data: bytes):
+        """Bytes sent from the PC over USB serial (available immediately)."""
+        self.usb_rx.extend(data)
+
+    def take_usb(self) -> bytes:
+        """Everything the board wrote to USB serial since the last call."""
+        data = bytes(self.usb_tx)
+        self.usb_tx.clear()
+        return data
+
+    def now_ms(self) -> int:
+        return self.us // 1000
+
+    def byte_us(self) -> int:
+        return (MIDI_BITS_PER_BYTE * 1000000) // self.baud
+
+    # -----------------------------------------------------
+    # clock
+    # -----------------------------------------------------
+    def pass_lag_us(self) -> int:
+        """Loop lateness added after a sleep (the work of one pass), 0 without injected lag."""
+        return self.loop_lag_us(self) if self.loop_lag_us is not None else 0
+
+    def advance(self, us: int):
+        end = self.us + us
+        while True:
+            self._run_driver()
+            if self._wake_us > self.us and self._wait is None:
+                step_to = min(end, self._wake_us)
+            else:
+                step_to = end
+            if self.until_us is not None and step_to >= self.until_us:
+                self.us = self.until_us
+                raise SimDone()
+            while self.pin_events and self.pin_events[0][0] <= step_to:
+                t, _n, pin_id, level = heapq.heappop(self.pin_events)
+                self.us = max(self.us, t)
+                self.set_pin(pin_id, level)
+            self.us = step_to
+            if self.us >= end:
+                self._run_driver()
+                return
+
+    def _run_driver(self):
+        if self._driver is None:
+            return
+        while True:
+            if self._wait is not None:
+                if not self._wait(self.ns):
+                    return
+                self._wait = None
+            elif self.us < self._wake_us:
+                return
+            try:
+                item = next(self._driver)
+            except StopIteration:
+                self._driver = None
+                return
+            if callable(item):
+                self._wait = item
+            else:
+                self._wake_us = self.us + int(item) * 1000
+
+    # -----------------------------------------------------
+    # run a firmware file
+    # -----------------------------------------------------
+    def run(self, path: str, until_ms: int, driver=None, workdir: str = None, overrides=None):
+        """
+        Execute firmware `path` until virtual time `until_ms`.
+        `overrides` {"NAME": value} replaces the firmware's top-level `NAME = ...` lines.
+        Returns the firmware's global namespace (for inspection).
+        """
+        self.until_us = until_ms * 1000
+        self._driver = driver(self) if driver is not None else None
+        self._wait = None
+        self._wake_us = self.us
+
+        with open(path, "r", encoding="utf-8") as f:
+            src = f.read()
+        for name, value in (overrides or {}).items():
+            src = override_config(src, name, value)
+        code = compile(src, path, "exec")
+
+        main_mod = types.ModuleType("__main__")
+        main_mod.__file__ = path
+        mods = build_modules(self)
+        mods["__main__"] = main_mod
+        saved = {name: sys.modules.get(name) for name in mods}
+        fw_dir = os.path.dirname(os.path.abspath(path))
+        before = set(sys.modules)
+        old_cwd = os.getcwd()
+        tmp = None
+        if workdir is None:
+            tmp = tempfile.TemporaryDirectory()
+            workdir = tmp.name
+        self.ns = main_mod.__dict__
+        saved_stdio = (sys.stdin, sys.stdout)
+        saved_builtins = {name: getattr(builtins, name, None) for name in VIPER_BUILTINS}
+        try:
+            sys.modules.update(mods)
+            for name, fn in VIPER_BUILTINS.items():
+                setattr(builtins, name, fn)
+            sys.path.insert(0, fw_dir)
+            sys.stdin = _UsbIn(self)
+            sys.stdout = _UsbOut(self, saved_stdio[1])
+            os.chdir(workdir)
+            try:
+                exec(code, self.ns)
+            except KeyboardInterrupt:
+                pass
+        finally:
+            sys.stdin, sys.stdout = saved_stdio
+            os.chdir(old_cwd)
+            for name, fn in saved_builtins.items():
+                if fn is None:
+                    delattr(builtins, name)
+                else:
+                    setattr(builtins, name, fn)
+            sys.path.remove(fw_dir)
+            for name in set(sys.modules) - before:   # firmware-side imports: fresh per run
+                if os.path.dirname(os.path.abspath(getattr(sys.modules[name], "__file__", None) or "")) == fw_dir:
+                    del sys.modules[name]
+            for name, mod in saved.items():
+                if mod is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = mod
+            if tmp is not None:
+                tmp.cleanup()
+        return self.ns
+
+    # -----------------------------------------------------
+    # log helpers
+    # -----------------------------------------------------
+    def messages(self):
+        """UART log as (write_ms_float, wire_end_ms_float, bytes) tuples."""
+        return [(w / 1000.0, e / 1000.0, d) for (w, _s, e, d) in self.tx_log]
+
+    def midi_messages(self, start=0):
+        """
+        tx_log[start:] as complete MIDI messages: [(write_us, bytes)].
+        Output running status is expanded; realtime bytes come out as they were sent,
+        a SysEx as one message F0 .. F7.
+        """
+        out = []
+        running = 0
+        cur = bytearray()
+        need = 0
+        sysex = None
+        for (w, _s, _e, d) in self.tx_log[start:]:
+            for b in d:
+                if b >= 0xF8:
+                    out.append((w, bytes([b])))
+                    continue
+                if sysex is not None:
+                    sysex.append(b)
+                    if b & 0x80:
+                        out.append((w, bytes(sysex)))
+                        sysex = None
+                    continue
+                if b == 0xF0:
+                    running = 0
+                    cur = bytearray()
+                    sysex = bytearray([b])
+                    continue
+                if b & 0x80:
+                    cur = bytearray([b])
+                    if b >= 0xF0:
+                        running = 0
+                        out.append((w, bytes(cur)))    # system common / SysEx: kept raw
+                        cur = bytearray()
+                        continue
+                    running = b
+                    need = 1 if (b & 0xF0) in (0xC0, 0xD0) else 2
+                    continue
+                if not cur:
+                    if not running:
+                        continue
+                    cur = bytearray([running])
+                    need = 1 if (running & 0xF0) in (0xC0, 0xD0) else 2
+                cur.append(b)
+                if len(cur) == need + 1:
+                    out.append((w, bytes(cur)))
+                    cur = bytearray()
+        return out
+
+
+# =========================================================
+# USB serial (sys.stdin / sys.stdout while a firmware runs)
+# =========================================================
+class _UsbInBuffer:
+    def __init__(self, h):
+        self.h = h
+
+    def read(self, n=-1):
+        q = self.h.usb_rx
+        n = len(q) if n is None or n < 0 else min(n, len(q))
+        return bytes(q.popleft() for _ in range(n))
+
+    def readinto(self, buf):
+        q = self.h.usb_rx
+        n = min(len(buf), len(q))
+        for k in range(n):
+            buf[k] = q.popleft()
+        return n
+
+
+class _UsbIn(io.TextIOBase):
+    def __init__(self, h):
+        self.buffer = _UsbInBuffer(h)
+
+
+class _UsbOutBuffer:
+    def __init__(self, h):
+        self.h = h
+
+    def write(self, data):
+        self.h.usb_tx += bytes(data)
+        return len(data)
+
+
+class _UsbOut(io.TextIOBase):
+    """Binary writes go to usb_tx; print() text still reaches the real console."""
+
+    def __init__(self, h, console):
+        self.buffer = _UsbOutBuffer(h)
+        self.console = console
+
+    def write(self, text):
+        return self.console.write(text)
+
+    def flush(self):
+        self.console.flush()
+
+
+# =========================================================
+# stand-in modules
+# =========================================================
+SIO_GPIO_IN = 0xD0000004   # RP2040 SIO: GPIO0..29 input levels
+
+
+def override_config(src: str, name: str, value) -> str:
+    """
+    Replace the top-level `name = ...` line (comment kept) with `name = repr(value)`;
+    a build flag `name = const(...)` stays a const.
+    """
+    lines = src.split("\n")
+    for k, line in enumerate(lines):
+        if line.startswith(name + " =") or line.startswith(name + "="):
+            comment = line.find("#")
+            tail = ("  " + line[comment:]) if comment >= 0 else ""
+            rhs = line[line.find("=") + 1:].lstrip()
+            fmt = "%s = const(%r)%s" if rhs.startswith("const(") else "%s = %r%s"
+            lines[k] = fmt % (name, value, tail)
+            return "\n".join(lines)
+    raise KeyError("no top-level %s = ... in firmware" % name)
+
+VIPER_BUILTINS = {
+    "ptr8": lambda buf: buf,
+    "ptr16": lambda buf: buf,
+    "ptr32": lambda buf: buf,
+    "uint": int,
+}
+
+
+def build_modules(h: Host):
+    # ---------------- time ----------------
+    t = types.ModuleType("time")
+
+    def ticks_us():
+        return h.us & (TICKS_PERIOD - 1)
+
+    def ticks_ms():
+        return (h.us // 1000) & (TICKS_PERIOD - 1)
+
+    def ticks_cpu():
+        return ticks_us()
+
+    def ticks_add(ticks, delta):
+        return (ticks + delta) & (TICKS_PERIOD - 1)
+
+    def ticks_diff(a, b):
+        d = (a - b) & (TICKS_PERIOD - 1)
+        if d >= TICKS_HALF:
+            d -= TICKS_PERIOD
+        return d
+
+    def sleep_ms(ms):
+        h._sleep_calls += 1
+        h.advance(max(0, int(ms)) * 1000 + h.pass_lag_us())
+
+    def sleep_us(us):
+        h._sleep_calls += 1
+        h.advance(max(0, int(us)) + h.pass_lag_us())
+
+    def sleep(s):
+        h.advance(int(s * 1000000))
+
+    def time_s():
+        return h.us // 1000000
+
+    t.ticks_us = ticks_us
+    t.ticks_ms = ticks_ms
+    t.ticks_cpu = ticks_cpu
+    t.ticks_add = ticks_add
+    t.ticks_diff = ticks_diff
+    t.sleep_ms = sleep_ms
+    t.sleep_us = sleep_us
+    t.sleep = sleep
+    t.time = time_s
+
+    # ---------------- machine ----------------
+    m = types.ModuleType("machine")
+
+    class Pin:
+        IN = 0
+        OUT = 1
+        OPEN_DRAIN = 2
+        PULL_UP = 1
+        PULL_DOWN = 2
+        IRQ_FALLING = 4
+        IRQ_RISING = 8
+
+        def __init__(self, pin_id, mode=-1, pull=-1, value=None):
+            self.id = pin_id
+            self._irq = None
+            self._trigger = 0
+            h.pins[pin_id] = self
+            h.pin_levels.setdefault(pin_id, 1)
+            if value is not None:
+                h.pin_levels[pin_id] = 1 if value else 0
+
+        def init(self, mode=-1, pull=-1, value=None):
+            if value is not None:
+                h.pin_levels[self.id] = 1 if value else 0
+
+        def value(self, v=None):
+            if v is None:
+                return h.pin_levels.get(self.id, 1)
+            h.pin_levels[self.id] = 1 if v else 0
+            hook = h.pin_hooks.get(self.id)
+            if hook is not None:
+                hook(h.pin_levels[self.id])
+            return None
+
+        def __call__(self, v=None):
+            return self.value(v)
+
+        def irq(self, handler=None, trigger=0, hard=False):
+            self._irq = handler
+            self._trigger = trigger
+
+        def _edge(self, level):
+            if self._irq is None:
+                return
+            if (level and (self._trigger & Pin.IRQ_RISING)) or ((not level) and (self._trigger & Pin.IRQ_FALLING)):
+                self._irq(self)
+
+    class ADC:
+        def __init__(self, pin):
+            self.id = pin.id if isinstance(pin, Pin) else pin
+            h.adc_values.setdefault(self.id, 32768)
+
+        def read_u16(self):
+            v = h.adc_values.get(self.id, 32768)
+            return v(h) & 0xFFFF if callable(v) else v
+
+    class UART:
+        def __init__(self, uart_id, baudrate=9600, tx=None, rx=None, **kw):
+            self.id = uart_id
+            h.baud = baudrate
+            h.uarts.append(self)
+
+        def write(self, data, max_len=None):
+            # stream write(buf, max_len) as on MicroPython: the first max_len bytes
+            data = bytes(data) if max_len is None else bytes(data[:max_len])
+            start = max(h.us, h.tx_free_us)
+            end = start + len(data) * h.byte_us()
+            h.tx_free_us = end
+            h.tx_log.append((h.us, start, end, data))
+            if h.loopback_pin is not None:
+                bit_us = h.byte_us() // 10
+                for k in range(len(data)):
+                    t = start + k * h.byte_us()
+                    h.schedule_pin(t, h.loopback_pin, 0)            # start bit
+                    h.schedule_pin(t + bit_us, h.loopback_pin, 1)
+            return len(data)
+
+        def txdone(self):
+            return h.tx_free_us <= h.us
+
+        def any(self):
+            n = 0
+            for (t_arr, _b) in h.rx_queue:
+                if t_arr > h.us:
+                    break
+                n += 1
+            return n
+
+        def read(self, nbytes=-1):
+            n = self.any()
+            if nbytes is not None and nbytes >= 0:
+                n = min(n, nbytes)
+            if n == 0:
+                return None
+            return bytes(h.rx_queue.popleft()[1] for _ in range(n))
+
+        def readinto(self, buf, nbytes=None):
+            n = self.any()
+            n = min(n, len(buf) if nbytes is None else nbytes)
+            if n == 0:
+                return None
+            for k in range(n):
+                buf[k] = h.rx_queue.popleft()[1]
+            return n
+
+    class SPI:
+        """Controller; the device model on the bus is h.spi_devices[id]."""
+        MSB = 0
+        LSB = 1
+
+        def __init__(self, bus_id, baudrate=1000000, **kw):
+            self.id = bus_id
+            self.baudrate = baudrate
+
+        def init(self, baudrate=None, **kw):
+            if baudrate:
+                self.baudrate = baudrate
+
+        def readinto(self, buf, write=0):
+            dev = h.spi_devices.get(self.id)
+            for k in range(len(buf)):
+                buf[k] = 0xFF
+            if dev is not None:
+                dev.readinto(buf)
+            h.us += (len(buf) * 8 * 1000000) // self.baudrate
+
+        def read(self, nbytes, write=0):
+            buf = bytearray(nbytes)
+            self.readinto(buf, write)
+            return bytes(buf)
+
+        def write(self, data):
+            dev = h.spi_devices.get(self.id)
+            if dev is not None and hasattr(dev, "write"):
+                dev.write(bytes(data))
+            h.us += (len(data) * 8 * 1000000) // self.baudrate
+
+    class I2C:
+        """
+        Controller; h.i2c_devices[addr] models implement readfrom_into(buf), writeto(data),
+        readfrom_mem_into(reg, buf), writeto_mem(reg, data) as far as they need.
+        Missing device -> OSError(19) like a NACK.
+        """
+        def __init__(self, bus_id, freq=400000, **kw):
+            self.id = bus_id
+            self.freq = freq
+
+        def _dev(self, addr, nbytes):
+            h.us += ((1 + nbytes) * 9 * 1000000) // self.freq
+            dev = h.i2c_devices.get(addr)
+            if dev is None:
+                raise OSError(19)
+            return dev
+
+        def scan(self):
+            return sorted(h.i2c_devices)
+
+        def readfrom_into(self, addr, buf):
+            self._dev(addr, len(buf)).readfrom_into(buf)
+
+        def readfrom(self, addr, nbytes):
+            buf = bytearray(nbytes)
+            self.readfrom_into(addr, buf)
+            return bytes(buf)
+
+        def writeto(self, addr, data):
+            self._dev(addr, len(data)).writeto(bytes(data))
+            return len(data)
+
+        def readfrom_mem_into(self, addr, reg, buf):
+            self._dev(addr, len(buf) + 2).readfrom_mem_into(reg, buf)
+
+        def readfrom_mem(self, addr, reg, nbytes):
+            buf = bytearray(nbytes)
+            self.readfrom_mem_into(addr, reg, buf)
+            return bytes(buf)
+
+        def writeto_mem(self, addr, reg, data):
+            self._dev(addr, len(data) + 1).writeto_mem(reg, bytes(data))
+
+    m.Pin = Pin
+    m.ADC = ADC
+    m.UART = UART
+    m.SPI = SPI
+    m.I2C = I2C
+
+    class Mem:
+        def __init__(self, bits):
+            self.mask = (1 << bits) - 1
+
+        def __getitem__(self, addr):
+            if addr == SIO_GPIO_IN:
+                v = 0
+                for pin_id, level in h.pin_levels.items():
+                    if isinstance(pin_id, int) and 0 <= pin_id < 30 and level:
+                        v |= 1 << pin_id
+                return v & self.mask
+            return h.mem.get(addr, 0) & self.mask
+
+        def __setitem__(self, addr, v):
+            h.mem[addr] = v & self.mask
+
+    m.mem32 = Mem(32)
+    m.mem16 = Mem(16)
+    m.mem8 = Mem(8)
+    m.freq = lambda *a: 125000000
+    m.reset = lambda: None
+
+    # ---------------- urandom ----------------
+    r = types.ModuleType("urandom")
+    r.getrandbits = lambda n: h.rng.getrandbits(n)
+    r.seed = lambda s=None: h.rng.seed(s)
+    r.randint = lambda a, b: h.rng.randint(a, b)
+    r.random = lambda: h.rng.random()
+
+    # ---------------- select (USB serial only) ----------------
+    sel = types.ModuleType("select")
+    sel.POLLIN = 1
+    sel.POLLOUT = 4
+
+    class Poll:
+        def __init__(self):
+            self.objs = []
+
+        def register(self, obj, flags=1):
+            self.objs.append(obj)
+
+        def ipoll(self, timeout=-1, flags=0):
+            if h.usb_rx and self.objs:
+                yield (self.objs[0], sel.POLLIN)
+
+        def poll(self, timeout=-1):
+            return list(self.ipoll(timeout))
+
+    sel.poll = Poll
+
+    # ---------------- gc (no MicroPython heap on the host) ----------------
+    g = types.ModuleType("gc")
+    g.collect = lambda: None
+    g.mem_free = lambda: 0
+    g.mem_alloc = lambda: 0
+    g.enable = lambda: None
+    g.disable = lambda: None
+
+    # ---------------- micropython (code emitters run as plain Python) ----------------
+    mp = types.ModuleType("micropython")
+    mp.const = lambda v: v
+    mp.native = lambda f: f
+    mp.viper = lambda f: f
+    mp.alloc_emergency_exception_buf = lambda n: None
+    mp.schedule = lambda fn, arg: fn(arg)
+    mp.opt_level = lambda *a: 0
+
+    # ---------------- rp2 (PIO programs are not run) ----------------
+    rp2 = types.ModuleType("rp2")
+
+    class PIO:
+        OUT_LOW = 0
+        OUT_HIGH = 1
+        IN_LOW = 0
+        IN_HIGH = 1
+        SHIFT_LEFT = 0
+        SHIFT_RIGHT = 1
+
+    class StateMachine:
+        def __init__(self, sm_id, program=None, **kwargs):
+            self.id = sm_id
+            self.program = program
+            self.running = False
+            self.tx = []               # every value put into the TX FIFO
+            h.state_machines[sm_id] = self
+
+        def init(self, program, **kwargs):
+            self.program = program
+
+        def active(self, v=None):
+            if v is None:
+                return int(self.running)
+            self.running = bool(v)
+            return None
+
+        def put(self, value, shift=0):
+            self.tx.append(value)
+
+        def tx_fifo(self):
+            return 0
+
+    rp2.PIO = PIO
+    rp2.StateMachine = StateMachine
+    rp2.asm_pio = lambda **kwargs: (lambda program: program)
+
+    return {"time": t, "machine": m, "urandom": r, "select": sel, "gc": g, "micropython": mp,
+            "rp2": rp2}
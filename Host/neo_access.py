@@ -0,0 +1,175 @@
+# Melatroid - Whammy 4 NEO - access mode check (host stand-in)
+"""
+Runs NEO/main.py built with ACCESS_MODE_ENABLED and checks the preset access on GPIO14:
+button (short press = preset A/B, held = access, four slots, double tap -> slot D),
+level switch with hold-to-run Shutter, and level switch with the relay gate (relays WET
+while previewing, DRY again after). Reports level switch edge -> first MIDI message out.
+
+    python Host/neo_access.py                   # all cases
+    python Host/neo_access.py button
+"""
+import argparse
+import sys
+
+from mpy_host import Host
+from neo_drive import (NEO_MAIN, PIN_LAYER_SWITCH, PIN_POT, SETTING_LATCH,
+                       SETTING_SHUTTER, hold, press, program, release, tap)
+
+RELAY_PIN_A = 2
+PC = 0xC0
+
+CASES = {
+    # name: (setting, overrides)
+    "button": (SETTING_LATCH, {"ACCESS_SWITCH": "button", "ACCESS_SLOTS": 4}),
+    "level_hold_to_run": (SETTING_SHUTTER, {"ACCESS_SWITCH": "level", "ACCESS_NEXT_SLOT": True,
+                                            "SHUTTER_HOLD_TO_RUN": True}),
+    "level_gate": (SETTING_SHUTTER, {"ACCESS_SWITCH": "level", "RELAY_GATE_ENABLED": True}),
+}
+
+
+def pcs_since(h, us):
+    """Program numbers of the PCs written from virtual time `us` on."""
+    return [m[1] for (w, m) in h.midi_messages() if w >= us and m[0] & 0xF0 == PC]
+
+
+def run(name):
+    setting, overrides = CASES[name]
+    h = Host(seed=1)
+    h.set_adc(PIN_POT, 20000)
+    checks = []
+    lat = []
+
+    def check(label, cond, wait_ms=100):
+        def step(h):
+            yield wait_ms
+            checks.append((label, bool(cond(h.ns))))
+        return step(h)
+
+    def gpio14(level):
+        n = len(h.tx_log)
+        us = h.us
+        h.set_pin(PIN_LAYER_SWITCH, level)
+        yield lambda ns: len(h.tx_log) > n
+        lat.append((h.tx_log[n][0] - us) / 1000.0)
+
+    def in_access(ns):
+        return ns["access"].active and ns["runtime_layer"] == ns["LAYER_ACCESS"]
+
+    def preview_and_commit(label, slot):
+        acc = h.ns["access"]
+        want = (acc.preview + 1) % len(h.ns["PRESETS"])
+        n = h.us
+        yield from tap(h)
+        yield from check(label + ": preview", lambda ns: acc.preview == want and acc.pending
+                         and pcs_since(h, n)[:1] == [ns["PRESETS"][want][1]], 50)
+        yield h.ns["ACCESS_COMMIT_MS"]
+        pc = h.ns["PRESETS"][want][1]
+        yield from check(label + ": stored + confirmed",
+                         lambda ns: ns["stored_preset_index"][slot] == want
+                         and ns["active_slot"] == slot and not acc.pending
+                         and pcs_since(h, n).count(ns["pc_bypass"](pc))
+                         == ns["ACCESS_CONFIRM_TOGGLES"], 1000)
+
+    def driver_button(h):
+        yield from program(h, preset_a=8, preset_b=9, setting=setting)
+        yield 300
+        yield from tap(h, 100, PIN_LAYER_SWITCH)         # short press: A -> B
+        yield from check("short press: preset B", lambda ns: ns["active_slot"] == 1
+                         and not ns["access"].active, 600)
+        yield from press(h, PIN_LAYER_SWITCH)
+        yield from check("not yet access", lambda ns: not ns["access"].active, 300)
+        yield from check("held: access", in_access, 300)
+        yield from tap(h)                                # double click: next edit slot (C)
+        yield 100
+        yield from tap(h)
+        yield from check("double click: edit slot C", lambda ns: ns["access"].edit_slot == 2)
+        yield from preview_and_commit("slot C", 2)
+        yield from tap(h)                                # double click: edit slot D
+        yield 100
+        yield from tap(h)
+        yield from check("double click: edit slot D", lambda ns: ns["access"].edit_slot == 3)
+        yield from preview_and_commit("slot D", 3)
+        stored_d = h.ns["stored_preset_index"][3]
+        yield from hold(h, 1100)                         # scroll: preview + 3 steps
+        yield from check("hold scrolls", lambda ns: ns["access"].preview
+                         == (stored_d + 4) % len(ns["PRESETS"]), 0)
+        yield from release(h, PIN_LAYER_SWITCH)
+        yield from check("release: performance, preview dropped",
+                         lambda ns: (not ns["access"].active)
+                         and ns["runtime_layer"] == ns["LAYER_PRESET"]
+                         and ns["stored_preset_index"][3] == stored_d, 600)
+        yield from tap(h, 100, PIN_LAYER_SWITCH)         # D -> A
+        yield from check("short press from D: preset A", lambda ns: ns["active_slot"] == 0, 600)
+        yield from tap(h)
+        yield 100
+        yield from tap(h)
+        yield from check("double tap: slot D", lambda ns: ns["active_slot"] == 3, 800)
+        yield from tap(h)
+        yield 100
+        yield from tap(h)
+        yield from check("double tap: back to A", lambda ns: ns["active_slot"] == 0, 800)
+
+    def driver_level(h):
+        gate = name == "level_gate"
+        yield from program(h, preset_a=8, preset_b=9, setting=setting)
+        yield 300
+        if gate:
+            yield from check("gate idle DRY", lambda ns: h.pin_levels[RELAY_PIN_A] == 0, 0)
+        yield from gpio14(0)
+        yield from check("closed: access", in_access, 50)
+        if gate:
+            yield from check("previewing WET", lambda ns: h.pin_levels[RELAY_PIN_A] == 1, 0)
+        yield from preview_and_commit("slot A", 0)
+        if not gate:
+            yield from check("next edit slot B", lambda ns: ns["access"].edit_slot == 1, 0)
+        yield from gpio14(1)
+        yield from check("open: performance", lambda ns: not ns["access"].active, 600)
+        if gate:
+            yield from check("gate DRY again", lambda ns: h.pin_levels[RELAY_PIN_A] == 0, 0)
+            yield from tap(h)
+            yield from check("press starts the gate", lambda ns: ns["shutter_active"]
+                             and ns["relay"].running, 200)
+            yield from tap(h)
+            yield from check("press stops it", lambda ns: not ns["shutter_active"], 200)
+            return
+        yield from tap(h)
+        yield from check("tap: no shutter", lambda ns: not ns["shutter_active"], 500)
+        yield from press(h)
+        yield from check("held: shutter runs", lambda ns: ns["shutter_active"], 400)
+        yield from release(h)
+        yield from check("release: shutter stops", lambda ns: not ns["shutter_active"], 100)
+        yield 400
+        yield from tap(h)
+        yield 100
+        yield from tap(h)
+        yield from check("double tap: preset B", lambda ns: ns["active_slot"] == 1
+                         and not ns["shutter_active"], 800)
+
+    def driver(h):
+        yield from (driver_button(h) if name == "button" else driver_level(h))
+        h.until_us = h.us + 1
+
+    h.run(NEO_MAIN, until_ms=3600 * 1000, driver=driver,
+          overrides=dict(overrides, ACCESS_MODE_ENABLED=True))
+    return checks, lat
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("cases", nargs="*", help="default: all (%s)" % ", ".join(CASES))
+    args = ap.parse_args()
+    names = args.cases or list(CASES)
+    failed = 0
+    for name in names:
+        if name not in CASES:
+            ap.error("unknown case " + name)
+        checks, lat = run(name)
+        print("%s%s" % (name, (": GPIO14 -> MIDI max=%.1fms" % max(lat)) if lat else ""))
+        for label, ok in checks:
+            print("  %-4s %s" % ("ok" if ok else "FAIL", label))
+            failed += not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
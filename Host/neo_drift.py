@@ -0,0 +1,99 @@
+# Melatroid - Whammy 4 NEO - Long-run drift check (host stand-in)
+"""
+Runs NEO/main.py on the virtual clock with random loop lateness injected and
+measures how far a step engine drifts from an ideal click at pot_time_ms, and how much
+its steps jitter around that click (spread of the step lateness).
+
+    python Host/neo_drift.py --engine harmony --minutes 5 --lag-ms 3
+    python Host/neo_drift.py --engine shutter --pot 0      # 50 ms shutter phases
+"""
+import argparse
+import random
+
+from mpy_host import Host
+from neo_drive import (NEO_MAIN, PIN_POT, SETTING_HARMONY, SETTING_SHUTTER,
+                       SETTING_STEPSEQ, program, tap)
+
+ENGINES = {
+    "harmony": SETTING_HARMONY,
+    "stepseq": SETTING_STEPSEQ,
+    "shutter": SETTING_SHUTTER,
+}
+
+
+def measure(engine="harmony", minutes=2.0, lag_ms=3.0, pot_u16=20000, seed=1):
+    lag_rng = random.Random(seed + 1)
+    lag_us = int(lag_ms * 1000)
+    h = Host(seed=seed, loop_lag_us=(lambda _h: lag_rng.randrange(0, lag_us + 1)) if lag_us else None)
+    h.set_adc(PIN_POT, pot_u16)
+    marks = {}
+
+    def driver(h):
+        yield from program(h, setting=ENGINES[engine])
+        if engine != "stepseq":   # StepSeq already runs after apply_current_sound()
+            yield from tap(h)
+        yield 1000                # settle (pot read, first steps)
+        marks["t0_us"] = h.us
+
+    run_ms = int(marks_total_ms(minutes))
+    ns = h.run(NEO_MAIN, until_ms=run_ms, driver=driver)
+
+    period = ns["pot_time_ms"]
+    t0 = marks.get("t0_us")
+    if t0 is None:
+        raise RuntimeError("scenario did not reach the engine start")
+    steps = [w for (w, m) in h.midi_messages() if w >= t0 and len(m) == 2 and (m[0] & 0xF0) == 0xC0]
+    if len(steps) < 2:
+        raise RuntimeError("engine produced no steps")
+
+    n = len(steps) - 1
+    span_ms = (steps[-1] - steps[0]) / 1000.0
+    ideal_ms = n * period
+    drift_ms = span_ms - ideal_ms
+    errs = [((steps[k] - steps[0]) / 1000.0) - k * period for k in range(len(steps))]
+    lateness = [e - min(errs) for e in errs]
+    mean_late = sum(lateness) / len(lateness)
+    sd = (sum((x - mean_late) ** 2 for x in lateness) / len(lateness)) ** 0.5
+    return {
+        "engine": engine,
+        "period_ms": period,
+        "steps": n,
+        "span_ms": span_ms,
+        "drift_ms": drift_ms,
+        "drift_ppm": (drift_ms / span_ms) * 1e6 if span_ms else 0.0,
+        "max_abs_phase_err_ms": max(abs(e) for e in errs),
+        "mean_late_ms": mean_late,
+        "jitter_sd_ms": sd,
+        "jitter_pp_ms": max(lateness),
+        "nowbased_drift_est_ms": n * mean_late,
+    }
+
+
+def marks_total_ms(minutes):
+    # boot + programming takes ~20 s of virtual time
+    return 20000 + int(minutes * 60000)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--engine", choices=sorted(ENGINES), default=None)
+    ap.add_argument("--minutes", type=float, default=2.0)
+    ap.add_argument("--lag-ms", type=float, default=3.0)
+    ap.add_argument("--pot", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    for engine in ([args.engine] if args.engine else sorted(ENGINES)):
+        r = measure(engine, args.minutes, args.lag_ms, args.pot, args.seed)
+        print(
+            f"{r['engine']:8s} period={r['period_ms']}ms steps={r['steps']} "
+            f"span={r['span_ms']:.1f}ms drift={r['drift_ms']:+.2f}ms ({r['drift_ppm']:+.1f}ppm) "
+            f"max_phase_err={r['max_abs_phase_err_ms']:.2f}ms "
+            f"mean_late={r['mean_late_ms']:.2f}ms "
+            f"jitter sd={r['jitter_sd_ms']:.3f}ms p-p={r['jitter_pp_ms']:.2f}ms "
+            f"(now-based scheduling would accumulate ~{r['nowbased_drift_est_ms']:.0f}ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Melatroid - Whammy 4 NEO - Host drivers
+"""
+Reusable driver steps for running RP2040_Zero/NEO/main.py on the host stand-in
+(see mpy_host.py). All steps are generators meant for `yield from`.
+"""
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NEO_MAIN = os.path.join(HERE, "..", "RP2040_Zero", "NEO", "main.py")
+
+PIN_FOOTSW = 4
+PIN_LAYER_SWITCH = 14
+PIN_POT = 26
+
+# SETTINGS menu index per mode (see SETTINGS in NEO/main.py)
+SETTING_LATCH = 0
+SETTING_MOMENTARY = 1
+SETTING_HOLDING = 2
+SETTING_SHUTTER = 3
+SETTING_HARMONY = 4
+SETTING_STEPSEQ = 5
+SETTING_LEGACY = 8
+
+
+def press(h, pin=PIN_FOOTSW):
+    h.set_pin(pin, 0)
+    yield 0
+
+
+def release(h, pin=PIN_FOOTSW):
+    h.set_pin(pin, 1)
+    yield 0
+
+
+def tap(h, dur_ms=60, pin=PIN_FOOTSW):
+    h.set_pin(pin, 0)
+    yield dur_ms
+    h.set_pin(pin, 1)
+    yield 0
+
+
+def hold(h, dur_ms, pin=PIN_FOOTSW):
+    yield from tap(h, dur_ms, pin)
+
+
+def flip_layer(h):
+    """GPIO14 is a flip-flop: any debounced edge toggles the layer."""
+    level = h.pin_levels.get(PIN_LAYER_SWITCH, 1)
+    h.set_pin(PIN_LAYER_SWITCH, 0 if level else 1)
+    yield 0
+
+
+def wait_main_loop(h):
+    yield lambda ns: "now" in ns
+
+
+def program(h, preset_a=8, preset_b=9, setting=SETTING_LATCH):
+    """
+    Boot programming: pick preset A, preset B, then the mode from the 1 s scan.
+    Ends when programming is done and the main loop runs in Layer 1.
+    """
+    yield from wait_main_loop(h)
+    yield lambda ns: ns["stage"] == 0 and ns["selection_index"] == preset_a
+    yield from tap(h)
+    yield lambda ns: ns["stage"] == 1 and (not ns["scan_paused"]) and ns["selection_index"] == preset_b
+    yield from tap(h)
+    yield lambda ns: ns["stage"] == 2 and (not ns["scan_paused"]) and ns["selection_index"] == setting
+    yield from tap(h)
+    yield lambda ns: ns["programming_done"]
+    yield 20
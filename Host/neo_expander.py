@@ -0,0 +1,181 @@
+# Melatroid - Whammy 4 NEO - expansion switch check (host stand-in)
+"""
+Runs NEO/main.py with expansion switches on a modelled bus (74HC165 chain on SPI1,
+PCF8574 or MCP23017 on I2C1), presses them with contact bounce and checks the direct
+slot/mode actions. Reports scan cost (modelled bus time) and press -> MIDI latency.
+
+    python Host/neo_expander.py                 # all buses
+    python Host/neo_expander.py 165 mcp23017
+"""
+import argparse
+import sys
+
+from mpy_host import Host
+from neo_drive import NEO_MAIN, PIN_POT, SETTING_LATCH, program
+
+LOAD_PIN = 9
+I2C_ADDR = 0x20
+BOUNCE_MS = (1, 1, 2, 1)    # level flips before the contact settles
+
+
+class Switches:
+    """Levels of the expansion switches, bit k = switch k (pull-ups: 1 = released)."""
+    def __init__(self, count):
+        self.count = count
+        self.levels = (1 << count) - 1
+
+    def set(self, k, pressed):
+        if pressed:
+            self.levels &= ~(1 << k)
+        else:
+            self.levels |= 1 << k
+
+    def bytes(self, n):
+        return bytes((self.levels >> (8 * i)) & 0xFF for i in range(n))
+
+
+class HC165Chain:
+    """Parallel inputs are sampled while SH/LD is low, then shifted out on SPI."""
+    def __init__(self, h, sw):
+        self.sw = sw
+        self.loaded = sw.bytes((sw.count + 7) // 8)
+        self.loads = 0
+        h.pin_hooks[LOAD_PIN] = self.latch
+
+    def latch(self, level):
+        if level == 0:
+            self.loaded = self.sw.bytes(len(self.loaded))
+            self.loads += 1
+
+    def readinto(self, buf):
+        for k in range(min(len(buf), len(self.loaded))):
+            buf[k] = self.loaded[k]
+
+
+class PCF8574:
+    """Quasi-bidirectional port: reads a pin as its level only after 1 was written."""
+    def __init__(self, sw):
+        self.sw = sw
+        self.out = bytes(1)
+
+    def writeto(self, data):
+        self.out = data
+
+    def readfrom_into(self, buf):
+        port = self.sw.bytes(len(buf))
+        for k in range(len(buf)):
+            buf[k] = port[k] & (self.out[k] if k < len(self.out) else 0)
+
+
+class MCP23017:
+    """Inputs at reset; without GPPU pull-ups an open switch reads 0 (floating)."""
+    def __init__(self, sw):
+        self.sw = sw
+        self.regs = bytearray(0x16)
+
+    def writeto_mem(self, reg, data):
+        self.regs[reg:reg + len(data)] = data
+
+    def readfrom_mem_into(self, reg, buf):
+        port = self.sw.bytes(2)
+        for k in range(len(buf)):
+            if reg + k in (0x12, 0x13):
+                buf[k] = port[reg + k - 0x12] & self.regs[0x0C + reg + k - 0x12]
+            else:
+                buf[k] = self.regs[reg + k]
+
+
+BUSES = {
+    # name: (EXP_BUS, EXP_COUNT)
+    "165": ("165", 8),
+    "165x2": ("165", 16),
+    "pcf8574": ("pcf8574", 8),
+    "mcp23017": ("mcp23017", 16),
+}
+
+
+def attach(h, bus, count):
+    sw = Switches(count)
+    if bus == "165":
+        h.spi_devices[1] = HC165Chain(h, sw)
+    elif bus == "pcf8574":
+        h.i2c_devices[I2C_ADDR] = PCF8574(sw)
+    else:
+        h.i2c_devices[I2C_ADDR] = MCP23017(sw)
+    return sw
+
+
+def bounce_press(sw, k, hold_ms=80):
+    for i, ms in enumerate(BOUNCE_MS):
+        sw.set(k, i % 2 == 0)
+        yield ms
+    sw.set(k, True)
+    yield hold_ms
+    for i, ms in enumerate(BOUNCE_MS):
+        sw.set(k, i % 2 == 1)
+        yield ms
+    sw.set(k, False)
+    yield 0
+
+
+def run(name):
+    bus, count = BUSES[name]
+    h = Host(seed=1)
+    h.set_adc(PIN_POT, 20000)
+    sw = attach(h, bus, count)
+    checks = []
+
+    def check(label, cond):
+        def step(h):
+            yield 400
+            ok = cond(h.ns)
+            checks.append((label, ok))
+        return step(h)
+
+    def driver(h):
+        yield from program(h, preset_a=8, preset_b=9, setting=SETTING_LATCH)
+        yield 300
+        yield from bounce_press(sw, 1)                   # ("slot", 1)
+        yield from check("slot B", lambda ns: ns["active_slot"] == 1)
+        yield from bounce_press(sw, 4)                   # ("mode", MODE_HARMONY)
+        yield from check("mode Harmony", lambda ns: ns["mode"] == ns["MODE_HARMONY"])
+        yield from bounce_press(sw, 0)                   # ("slot", 0)
+        yield from check("slot A in Harmony", lambda ns: ns["active_slot"] == 0
+                         and ns["mode"] == ns["MODE_HARMONY"])
+        yield from bounce_press(sw, 2)                   # ("mode", MODE_LATCH)
+        yield from check("mode Latch", lambda ns: ns["mode"] == ns["MODE_LATCH"])
+        n_before = h.ns["exp_presses"]
+        for _ in range(3):                               # bounce only, never settles pressed
+            sw.set(3, True)
+            yield 1
+            sw.set(3, False)
+            yield 1
+        yield from check("bounce alone ignored", lambda ns: ns["exp_presses"] == n_before)
+        h.until_us = h.us + 1
+
+    ns = h.run(NEO_MAIN, until_ms=3600 * 1000, driver=driver,
+               overrides={"EXP_BUS": bus, "EXP_COUNT": count})
+    scans, scan_last, scan_max, presses, errors, lat_last, lat_max = ns["expansion_stats"]()
+    return checks, (scans, scan_max, presses, errors, lat_max)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("buses", nargs="*", help="default: all (%s)" % ", ".join(BUSES))
+    args = ap.parse_args()
+    names = args.buses or list(BUSES)
+    failed = 0
+    for name in names:
+        if name not in BUSES:
+            ap.error("unknown bus " + name)
+        checks, (scans, scan_max, presses, errors, lat_max) = run(name)
+        print("%s: scans=%d scan max=%dus presses=%d bus errors=%d press->MIDI max=%.1fms" % (
+            name, scans, scan_max, presses, errors, lat_max / 1000.0))
+        for label, ok in checks:
+            print("  %-4s %s" % ("ok" if ok else "FAIL", label))
+            failed += not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# Melatroid - Whammy 4 NEO - build profile footprint (host)
+"""
+Builds NEO/main.py per build profile (the const build flags at the top of main.py),
+compiles it and the modules the profile needs with mpy-cross (-march=armv6m) and reports
+flash (.mpy bytes on the board) and RAM (preallocated buffers in the firmware namespace
+after boot on the host stand-in + the UART RX ring). Checks that the code of every
+disabled feature is absent from the compiled main.mpy and present when enabled.
+Heap on the real board: python Host/neo_serial.py memory
+
+    python Host/neo_footprint.py
+    python Host/neo_footprint.py full minimal
+"""
+import argparse
+import array
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from mpy_host import Host, override_config
+from neo_drive import NEO_MAIN, PIN_POT
+
+NEO_DIR = os.path.dirname(NEO_MAIN)
+ENGINE_FILES = ("eng_harmony.py", "eng_stepseq.py", "eng_modulation.py")
+
+# flag: (name only compiled in with the feature, modules the feature needs on the board)
+FEATURES = {
+    "MIDI_IN_ENABLED": ("_midi_in_byte", ()),
+    "REMOTE_ENABLED": ("remote_apply", ()),
+    "SERIAL_PROTO_ENABLED": ("_ser_frame", ()),
+    "TRACE_ENABLED": ("trace_oldest", ()),
+    "ENGINES_ENABLED": ("engine_select", ENGINE_FILES),
+    "EXPANSION_ENABLED": ("expansion_scan", ()),
+    "RELAY_GATE_ENABLED": ("feat_relay", ("feat_relay.py",)),
+    "ACCESS_MODE_ENABLED": ("feat_access", ("feat_access.py",)),
+    "LATENCY_PROBE_ENABLED": ("latency_probe_arm", ()),
+}
+NO_TELEMETRY = {"SERIAL_PROTO_ENABLED": False, "TRACE_ENABLED": False}
+PROFILES = {
+    # name: flag overrides (everything else as in main.py)
+    "full": {},
+    "no_telemetry": NO_TELEMETRY,
+    "gate": dict(NO_TELEMETRY, RELAY_GATE_ENABLED=True),
+    "access": dict(NO_TELEMETRY, ACCESS_MODE_ENABLED=True),
+    "access_gate": dict(NO_TELEMETRY, ACCESS_MODE_ENABLED=True, RELAY_GATE_ENABLED=True),
+    "probe": {"LATENCY_PROBE_ENABLED": True},
+    "midi_out": dict(NO_TELEMETRY, MIDI_IN_ENABLED=False, REMOTE_ENABLED=False,
+                     EXPANSION_ENABLED=False),
+    "minimal": dict((flag, False) for flag in FEATURES),
+}
+
+
+def flags_of(profile):
+    """Effective flag values of a profile (main.py defaults + overrides)."""
+    with open(NEO_MAIN, "r", encoding="utf-8") as f:
+        src = f.read()
+    flags = {}
+    for line in src.split("\n"):
+        name = line.split(" =")[0]
+        if name in FEATURES:
+            flags[name] = "const(True)" in line
+    flags.update(PROFILES[profile])
+    return flags
+
+
+def mpy_cross(src, out):
+    args = ["-march=armv6m", "-o", out, src]
+    try:
+        import mpy_cross as mc
+        proc = mc.run(*args, stderr=subprocess.PIPE)
+    except ImportError:
+        proc = subprocess.Popen(["mpy-cross"] + args, stderr=subprocess.PIPE)
+    err = proc.communicate()[1]
+    if proc.returncode:
+        raise RuntimeError("mpy-cross %s: %s" % (os.path.basename(src), err.decode().strip()))
+    return os.path.getsize(out)
+
+
+def flash(profile, flags, workdir):
+    """(.mpy bytes of main, of the other modules, compiled main.mpy contents)"""
+    with open(NEO_MAIN, "r", encoding="utf-8") as f:
+        src = f.read()
+    for name, value in PROFILES[profile].items():
+        src = override_config(src, name, value)
+    main_py = os.path.join(workdir, "main.py")
+    with open(main_py, "w", encoding="utf-8") as f:
+        f.write(src)
+    main_mpy = os.path.join(workdir, "main.mpy")
+    main_bytes = mpy_cross(main_py, main_mpy)
+    with open(main_mpy, "rb") as f:
+        compiled = f.read()
+    module_bytes = 0
+    for flag, (_probe, files) in FEATURES.items():
+        if flags[flag]:
+            for name in files:
+                module_bytes += mpy_cross(os.path.join(NEO_DIR, name),
+                                          os.path.join(workdir, name[:-3] + ".mpy"))
+    return main_bytes, module_bytes, compiled
+
+
+def buffers(ns):
+    """Bytes held by the buffers (bytes/bytearray/array) of a namespace and its modules."""
+    total = 0
+    spaces = [ns] + [v.__dict__ for k, v in ns.items() if k in ("relay", "access")]
+    for space in spaces:
+        for v in space.values():
+            if isinstance(v, (bytes, bytearray)):
+                total += len(v)
+            elif isinstance(v, array.array):
+                total += len(v) * v.itemsize
+    return total
+
+
+def ram(profile, flags):
+    """(buffer bytes, UART RX ring bytes, firmware globals) after boot on the host."""
+    h = Host(seed=1)
+    h.set_adc(PIN_POT, 20000)
+    ns = h.run(NEO_MAIN, until_ms=3000, overrides=PROFILES[profile])
+    rxbuf = ns["MIDI_IN_RXBUF"] if flags["MIDI_IN_ENABLED"] else 0
+    names = [k for k, v in ns.items() if not k.startswith("__") and type(v) is not type(sys)]
+    return buffers(ns), rxbuf, len(names)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("profiles", nargs="*", help="default: all (%s)" % ", ".join(PROFILES))
+    args = ap.parse_args()
+    names = args.profiles or list(PROFILES)
+    for name in names:
+        if name not in PROFILES:
+            ap.error("unknown profile " + name)
+
+    print("%-13s %9s %9s %9s %9s %7s %9s %8s  %s" % (
+        "profile", "main.mpy", "modules", "flash", "buffers", "rxbuf", "RAM est", "globals",
+        "stripped"))
+    failed = 0
+    workdir = tempfile.mkdtemp()
+    try:
+        for name in names:
+            flags = flags_of(name)
+            main_bytes, module_bytes, compiled = flash(name, flags, workdir)
+            buf, rxbuf, n_globals = ram(name, flags)
+            wrong = [flag for flag, (probe, _files) in FEATURES.items()
+                     if (probe.encode() in compiled) != flags[flag]]
+            failed += len(wrong)
+            off = [flag[:-8].lower() for flag in FEATURES if not flags[flag]]
+            print("%-13s %9d %9d %9d %9d %7d %9d %8d  %s" % (
+                name, main_bytes, module_bytes, main_bytes + module_bytes, buf, rxbuf,
+                buf + rxbuf, n_globals,
+                ("FAIL: " + ", ".join(wrong)) if wrong else ("ok (off: %s)" % ", ".join(off)
+                                                              if off else "ok")))
+    finally:
+        shutil.rmtree(workdir)
+    print("RAM est = buffers + rxbuf; each global also costs a dict slot, engines load on demand")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
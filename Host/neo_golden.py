@@ -0,0 +1,242 @@
+# Melatroid - Whammy 4 NEO - golden trace regression (host stand-in)
+"""
+Runs scripted scenarios on NEO/main.py (virtual clock) and compares the emitted MIDI
+messages and their timestamps with the golden traces in Host/golden/.
+Reports per-scenario worst-case response (switch edge -> first MIDI message out).
+
+    python Host/neo_golden.py                  # check all scenarios
+    python Host/neo_golden.py shutter_min_pot  # check some
+    python Host/neo_golden.py --update         # re-record goldens after an intended change
+
+Exit code 1 when a scenario differs (messages, timing beyond tolerance, or a worse
+response time than recorded plus tolerance).
+"""
+import argparse
+import json
+import os
+import sys
+
+from mpy_host import Host
+from neo_drive import (HERE, NEO_MAIN, PIN_FOOTSW, PIN_LAYER_SWITCH, PIN_POT, SETTING_HARMONY,
+                       SETTING_HOLDING, SETTING_LATCH, SETTING_SHUTTER, SETTING_STEPSEQ,
+                       hold, program, tap, wait_main_loop)
+
+GOLDEN_DIR = os.path.join(HERE, "golden")
+TOLERANCE_MS = 2.0           # per message timestamp
+RESPONSE_TOLERANCE_MS = 2.0  # worst-case response may grow by this much
+
+
+# =========================================================
+# scenarios: (driver, pot_u16, tolerance_ms)
+# =========================================================
+def sc_boot(h):
+    yield from wait_main_loop(h)
+    yield 3000
+
+
+def sc_pot_cal_boot(h):
+    # footswitch held from power-up (HELD_AT_BOOT): sweep both end stops, release on centre
+    for v in (0, 65535, 32768):
+        h.set_adc(PIN_POT, v)
+        yield 200
+    h.set_pin(PIN_FOOTSW, 1)     # the gesture's release must not select preset A
+    yield from program(h, setting=SETTING_LATCH)
+    yield 800
+    yield from tap(h)
+    yield 800
+
+
+def sc_program_both(h):
+    yield from program(h, preset_a=8, preset_b=9, setting=SETTING_LATCH)
+    yield 500
+
+
+def sc_latch_toggles(h):
+    yield from program(h, setting=SETTING_LATCH)
+    for _ in range(3):
+        yield 800
+        yield from tap(h)
+    yield 800
+
+
+def sc_double_tap_switch(h):
+    yield from program(h, setting=SETTING_LATCH)
+    for k in range(3):
+        yield 800
+        if k == 1:
+            yield from tap(h)    # effect off: the next switch goes through the mute
+            yield 800
+        yield from tap(h)
+        yield 100
+        yield from tap(h)
+    yield 800
+
+
+def sc_holding_release(h):
+    yield from program(h, setting=SETTING_HOLDING)
+    yield 500
+    yield from hold(h, 600)      # engages after MOMENTARY_HOLD_MS, OFF after pot time
+    yield 1200
+    yield from tap(h, 50)        # short tap: ON + OFF pulse
+    yield 800
+
+
+def _shutter(h, run_ms):
+    yield from program(h, setting=SETTING_SHUTTER)
+    yield 500
+    yield from tap(h)
+    yield run_ms
+    yield from tap(h)
+    yield 500
+
+
+def sc_shutter_min_pot(h):
+    yield from _shutter(h, 1000)
+
+
+def sc_shutter_max_pot(h):
+    yield from _shutter(h, 3000)
+
+
+def sc_harmony_cycle(h):
+    yield from program(h, setting=SETTING_HARMONY)
+    yield 500
+    yield from tap(h)            # start
+    for _ in range(3):
+        yield 1500
+        yield from tap(h)        # next order
+    yield 1500
+    yield from hold(h, 300)      # stop
+    yield 500
+
+
+def sc_stepseq_patterns(h):
+    yield from program(h, setting=SETTING_STEPSEQ)
+    yield 1000
+    yield from tap(h)            # new pattern
+    yield 1000
+    yield from tap(h)            # new pattern
+    yield 1000
+    yield from hold(h, 1300)     # store the previous pattern in the bank
+    yield 1000
+    yield from tap(h)
+    yield 100
+    yield from tap(h)            # quick second tap: recall from the bank
+    yield 1500
+
+
+SCENARIOS = {
+    "boot": (sc_boot, 32768, TOLERANCE_MS),
+    "pot_cal_boot": (sc_pot_cal_boot, 32768, TOLERANCE_MS),
+    "program_both": (sc_program_both, 32768, TOLERANCE_MS),
+    "latch_toggles": (sc_latch_toggles, 32768, TOLERANCE_MS),
+    "double_tap_switch": (sc_double_tap_switch, 32768, TOLERANCE_MS),
+    "holding_release": (sc_holding_release, 0, TOLERANCE_MS),
+    "shutter_min_pot": (sc_shutter_min_pot, 0, TOLERANCE_MS),
+    "shutter_max_pot": (sc_shutter_max_pot, 65535, TOLERANCE_MS),
+    "harmony_cycle": (sc_harmony_cycle, 20000, TOLERANCE_MS),
+    "stepseq_patterns": (sc_stepseq_patterns, 20000, TOLERANCE_MS),
+}
+HELD_AT_BOOT = ("pot_cal_boot",)   # footswitch down before main.py is imported
+
+
+# =========================================================
+# record / compare
+# =========================================================
+def record(name):
+    driver, pot_u16, _tol = SCENARIOS[name]
+    h = Host(seed=1)
+    h.set_adc(PIN_POT, pot_u16)
+    if name in HELD_AT_BOOT:
+        h.set_pin(PIN_FOOTSW, 0)
+
+    def wrapped(h):
+        yield from driver(h)
+        h.until_us = h.us + 1
+
+    h.run(NEO_MAIN, until_ms=3600 * 1000, driver=wrapped)
+    msgs = [(round(w / 1000.0, 3), m.hex()) for (w, m) in h.midi_messages()]
+    return {"messages": msgs, "worst_response_ms": worst_response(h)}
+
+
+def worst_response(h):
+    """Largest delay from a switch edge to the first MIDI message written after it."""
+    edges = [us for (us, pin, _lvl) in h.pin_log if pin in (PIN_FOOTSW, PIN_LAYER_SWITCH)]
+    writes = [w for (w, _s, _e, _d) in h.tx_log]
+    worst = 0.0
+    k = 0
+    for i, us in enumerate(edges):
+        nxt = edges[i + 1] if i + 1 < len(edges) else None
+        while k < len(writes) and writes[k] < us:
+            k += 1
+        if k < len(writes) and (nxt is None or writes[k] < nxt):
+            worst = max(worst, (writes[k] - us) / 1000.0)
+    return round(worst, 3)
+
+
+def compare(name, got, gold):
+    """Returns a list of problems (empty = pass)."""
+    tol = SCENARIOS[name][2]
+    problems = []
+    gm, em = got["messages"], gold["messages"]
+    for k in range(min(len(gm), len(em))):
+        (gt, gd), (et, ed) = gm[k], em[k]
+        if gd != ed:
+            problems.append("message %d: got %s at %.3fms, golden %s at %.3fms" % (k, gd, gt, ed, et))
+            break
+        if abs(gt - et) > tol:
+            problems.append("message %d (%s): at %.3fms, golden %.3fms (tolerance %.1fms)" % (k, gd, gt, et, tol))
+            break
+    if not problems and len(gm) != len(em):
+        problems.append("%d messages, golden has %d" % (len(gm), len(em)))
+    if got["worst_response_ms"] > gold["worst_response_ms"] + RESPONSE_TOLERANCE_MS:
+        problems.append("worst response %.3fms, golden %.3fms" % (got["worst_response_ms"], gold["worst_response_ms"]))
+    return problems
+
+
+def golden_path(name):
+    return os.path.join(GOLDEN_DIR, name + ".json")
+
+
+def write_golden(name, got):
+    """JSON with one message per line (readable diffs when a golden is re-recorded)."""
+    lines = ",\n".join("  " + json.dumps(m) for m in got["messages"])
+    with open(golden_path(name), "w") as f:
+        f.write('{\n"scenario": %s,\n"worst_response_ms": %s,\n"messages": [\n%s\n]\n}\n' % (
+            json.dumps(name), json.dumps(got["worst_response_ms"]), lines))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("scenarios", nargs="*", help="default: all (%s)" % ", ".join(SCENARIOS))
+    ap.add_argument("--update", action="store_true", help="re-record the golden traces")
+    args = ap.parse_args()
+
+    names = args.scenarios or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            ap.error("unknown scenario " + name)
+
+    failed = 0
+    print("%-20s %8s %10s  %s" % ("scenario", "messages", "worst ms", "result"))
+    for name in names:
+        got = record(name)
+        if args.update:
+            os.makedirs(GOLDEN_DIR, exist_ok=True)
+            write_golden(name, got)
+            result = "recorded"
+        elif not os.path.exists(golden_path(name)):
+            result = "NO GOLDEN (run --update)"
+            failed += 1
+        else:
+            with open(golden_path(name)) as f:
+                problems = compare(name, got, json.load(f))
+            result = "ok" if not problems else "FAIL: " + "; ".join(problems)
+            failed += bool(problems)
+        print("%-20s %8d %10.3f  %s" % (name, len(got["messages"]), got["worst_response_ms"], result))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
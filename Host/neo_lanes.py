@@ -0,0 +1,157 @@
+# Melatroid - Whammy 4 NEO - Shutter chop over a runner (lane scheduler, host stand-in)
+"""
+Runs Harmony with the Shutter chop lane on top (RUNNER_CHOP_PERCENT) on the virtual
+clock with random loop lateness, and checks the one MIDI stream both lanes produce
+against a model of the two lanes: runner steps every pot_time_ms, chop phases every
+pot_time_ms * percent / 100 (SHUTTER_PATTERN), lanes due together -> one PC, a runner
+step behind a closed gate -> no PC; lanes due within one late pass merge as well.
+Reports PCs sent, how often both lanes were due together and the lateness of the stream.
+
+    python Host/neo_lanes.py
+    python Host/neo_lanes.py --percent 50 --minutes 5 --lag-ms 3
+"""
+import argparse
+import bisect
+import random
+import sys
+
+from mpy_host import Host
+from neo_drive import NEO_MAIN, PIN_POT, SETTING_HARMONY, program, tap
+
+BYPASS_OFFSET = 17
+SLACK_MS = 2                 # window = loop lateness + this
+
+
+def model(seq, pattern, run, chop, t0_ms):
+    """
+    Expected output from t0_ms on, from the lane state at the end of the run:
+    run / chop = (last deadline ms, period ms, index after the last step), ms to the us.
+    Returns [(t_ms, output PC, sent)] per lane event and how often both were due together.
+    """
+    events = {}
+    for lane, (due, period, idx) in enumerate((run, chop)):
+        k = 1
+        while due - k * period >= t0_ms:
+            t = round(due - k * period, 3)      # to the us: lanes due together share t
+            events.setdefault(t, [None, None])[lane] = idx - (k - 1)
+            k += 1
+    times = sorted(events)
+    # state before the first event: one step back on each lane
+    r_idx = min(x for x in (e[0] for e in events.values()) if x is not None) - 1
+    g_idx = min(x for x in (e[1] for e in events.values()) if x is not None) - 1
+    gate = pattern[g_idx % len(pattern)] != 0
+    out = []
+    merged = 0
+    for t in times:
+        r, g = events[t]
+        dirty = False
+        if r is not None:
+            r_idx = r
+            dirty = gate
+        if g is not None:
+            if (pattern[g % len(pattern)] != 0) != gate:
+                gate = not gate
+                dirty = True
+        merged += r is not None and g is not None
+        pc = seq[r_idx % len(seq)]
+        out.append((t, pc if gate else pc + BYPASS_OFFSET, dirty))
+    return out, merged
+
+
+def measure(percent, minutes, lag_ms, pot_u16, seed):
+    lag_rng = random.Random(seed + 1)
+    lag_us = int(lag_ms * 1000)
+    h = Host(seed=seed, loop_lag_us=(lambda _h: lag_rng.randrange(0, lag_us + 1)) if lag_us else None)
+    h.set_adc(PIN_POT, pot_u16)
+    marks = {}
+
+    def driver(h):
+        yield from program(h, setting=SETTING_HARMONY)
+        yield 1000                # pot read settles
+        yield from tap(h)         # Harmony start (the short tap also cycles the order)
+        yield 1000                # start transient (blink) over
+        marks["t0_ms"] = h.now_ms()
+
+    run_ms = 20000 + int(minutes * 60000)
+    ns = h.run(NEO_MAIN, until_ms=run_ms, driver=driver,
+               overrides={"RUNNER_CHOP_PERCENT": percent})
+    if "t0_ms" not in marks or not ns["engine_active"](ns["MODE_HARMONY"]):
+        raise RuntimeError("Harmony did not start")
+    period = ns["pot_time_ms"]
+    due = ns["lane_due"]
+    now = ns["time"].ticks_us()
+
+    def due_ms(lane):
+        # ticks_us deadline -> virtual ms (the tick wraps after ~18 minutes)
+        return (h.us + ns["time"].ticks_diff(due[lane], now)) / 1000.0
+
+    run = (due_ms(ns["LANE_RUNNER"]), period, ns["engine"].i)
+    chop = (due_ms(ns["LANE_GATE"]), ns["lane_period"](ns["LANE_GATE"]) / 1000.0, ns["lane_gate_i"])
+    want, merged = model(ns["engine"].seq, ns["shutter_pattern"], run, chop, marks["t0_ms"])
+    t_from = want[0][0] * 1000
+    got = [(w, m[1]) for (w, m) in h.midi_messages()
+           if w >= t_from and len(m) == 2 and (m[0] & 0xF0) == 0xC0]
+    return check(want, got, lag_ms + SLACK_MS), merged, period, chop[1]
+
+
+def check(want, got, window_ms):
+    """
+    Lanes due within one pass (loop lateness) merge into one PC: every PC sent must be
+    a model state of the last window_ms, and every PC the model sends for a state that
+    lasted longer than window_ms must have been sent inside it.
+    Returns (PCs sent, PCs off the model, model states missed, lateness in ms).
+    """
+    times = [t for t, _pc, _sent in want]
+    bad = 0
+    for w, pc in got:
+        t = w / 1000.0
+        lo = bisect.bisect_right(times, t - window_ms) - 1
+        hi = bisect.bisect_right(times, t)
+        if pc not in [p for _t, p, _s in want[max(lo, 0):hi]]:
+            bad += 1
+    missed = 0
+    late = []
+    sent = [w / 1000.0 for w, _pc in got]
+    for n, (t, pc, was_sent) in enumerate(want):
+        if not was_sent:
+            continue
+        k = bisect.bisect_left(sent, t)
+        hit = None
+        while k < len(got) and sent[k] - t <= window_ms:
+            if got[k][1] == pc:
+                hit = sent[k] - t
+                break
+            k += 1
+        if hit is not None:
+            late.append(hit)
+        elif n + 1 < len(want) and want[n + 1][0] - t > window_ms:
+            missed += 1
+    return len(got), bad, missed, late
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--percent", type=int, action="append", default=[],
+                    help="RUNNER_CHOP_PERCENT (repeatable, default 50 and 37)")
+    ap.add_argument("--minutes", type=float, default=1.0)
+    ap.add_argument("--lag-ms", type=float, default=3.0)
+    ap.add_argument("--pot", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    failed = 0
+    for percent in args.percent or [50, 37]:
+        (sent, bad, missed, late), merged, period, chop = measure(
+            percent, args.minutes, args.lag_ms, args.pot, args.seed)
+        ok = not bad and not missed and late
+        failed += not ok
+        print("chop %3d%%: runner %dms chop %gms | PCs sent=%d, lanes due together=%d | "
+              "late mean=%.2fms max=%.2fms | %s" % (
+                  percent, period, chop, sent, merged,
+                  sum(late) / len(late) if late else 0.0, max(late) if late else 0.0,
+                  "ok" if ok else "FAIL: %d PCs off the model, %d states missed" % (bad, missed)))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# Melatroid - Whammy 4 NEO - press -> MIDI latency per mode (host stand-in)
+"""
+Presses the footswitch many times per case (random press phase and tap length, one
+contact bounce on each release) and
+timestamps the press edge and the arrival of the resulting MIDI byte (end of its stop
+bit on the wire): latency distribution per case. The build runs with the latency probe
+on and MIDI TX looped back to LATENCY_PROBE_PIN, so the firmware's own measurement
+(the same as on the board, see LATENCY PROBE in main.py) is checked against it.
+
+    python Host/neo_latency.py
+    python Host/neo_latency.py --presses 50 Latch Momentary
+    python Host/neo_latency.py --set DEBOUNCE_MS=5 --set MOMENTARY_HOLD_MS=60
+
+On the board: LATENCY_PROBE_ENABLED = const(True), wire GPIO0 to LATENCY_PROBE_PIN,
+then python Host/neo_serial.py --port COM5 latency
+"""
+import argparse
+import random
+import sys
+
+from mpy_host import Host
+from neo_drive import (NEO_MAIN, PIN_POT, SETTING_HARMONY, SETTING_HOLDING, SETTING_LATCH,
+                       SETTING_MOMENTARY, SETTING_SHUTTER, SETTING_STEPSEQ, PIN_FOOTSW,
+                       program, tap)
+
+PIN_LOOPBACK = 5             # LATENCY_PROBE_PIN of the probe build
+
+WINDOW_PARAMS = ("DEBOUNCE_MS", "DOUBLE_TAP_WINDOW_MS", "MOMENTARY_HOLD_MS",
+                 "LATCH_SPECULATIVE_TAP")
+
+
+# =========================================================
+# cases: one measured press each; mark(h) at the press edge
+# =========================================================
+def btap(h, dur_ms=60):
+    """tap() with one bounce on the release: a stray falling edge the probe must not keep."""
+    yield from tap(h, dur_ms)
+    h.set_pin(PIN_FOOTSW, 0)
+    yield 1
+    h.set_pin(PIN_FOOTSW, 1)
+    yield 0
+
+
+def press_latch(h, rng, mark):
+    mark(h)
+    yield from btap(h, rng.randint(40, 120))       # toggles on release (or after the window)
+    yield 900                                     # no double tap
+
+
+def press_momentary(h, rng, mark):
+    mark(h)
+    yield from btap(h, rng.randint(150, 300))      # ON at press, OFF at release
+    yield 600
+
+
+def press_holding(h, rng, mark):
+    mark(h)
+    yield from btap(h, rng.randint(200, 400))      # ON after MOMENTARY_HOLD_MS
+    yield 1200                                    # OFF after the pot time (pot at 0: 500 ms)
+
+
+def press_shutter(h, rng, mark):
+    mark(h)
+    yield from btap(h, rng.randint(40, 80))        # start
+    yield 300
+    yield from btap(h)                             # stop
+    yield 600
+
+
+def press_harmony(h, rng, mark):
+    mark(h)
+    yield from btap(h, rng.randint(40, 80))        # start on press
+    yield 400
+    yield from btap(h, 300)                        # long press: stop on release
+    yield 600
+
+
+def press_stepseq(h, rng, mark):
+    # press between two steps (a step PC before the re-roll would be taken for it)
+    yield lambda ns: ns["time"].ticks_diff(ns["lane_due"][ns["LANE_RUNNER"]],
+                                           ns["time"].ticks_us()) > 200000
+    mark(h)
+    yield from btap(h, rng.randint(40, 80))        # new pattern at once
+    yield 600                                     # no quick second tap (bank recall)
+
+
+CASES = (
+    # name, setting, pot, measured press, probe kind (LAT_KINDS), overrides
+    ("Latch", SETTING_LATCH, 0, press_latch, 0, {}),
+    ("Latch (no spec.)", SETTING_LATCH, 0, press_latch, 0, {"LATCH_SPECULATIVE_TAP": False}),
+    ("Momentary", SETTING_MOMENTARY, 0, press_momentary, 1, {}),
+    ("Holding", SETTING_HOLDING, 0, press_holding, 2, {}),
+    ("Shutter start", SETTING_SHUTTER, 0, press_shutter, 3, {}),
+    ("Harmony start", SETTING_HARMONY, 0, press_harmony, 4, {}),
+    ("StepSeq re-roll", SETTING_STEPSEQ, 65535, press_stepseq, 5, {}),
+)
+
+
+def percentile(sorted_vals, p: int):
+    """Nearest-rank percentile of an ascending list."""
+    k = (p * len(sorted_vals) + 99) // 100 - 1
+    return sorted_vals[min(max(k, 0), len(sorted_vals) - 1)]
+
+
+def latencies(h, marks):
+    """Press edge -> arrival of the first byte written after it (us), per press."""
+    out = []
+    k = 0
+    for t in marks:
+        while k < len(h.tx_log) and h.tx_log[k][0] < t:
+            k += 1
+        if k < len(h.tx_log):
+            out.append(h.tx_log[k][1] + h.byte_us() - t)
+    return out
+
+
+def run(case, presses, seed, overrides):
+    _name, setting, pot, one, _kind, case_overrides = case
+    rng = random.Random(seed)
+    h = Host(seed=seed)
+    h.set_adc(PIN_POT, pot)
+    marks = []
+
+    def mark(h):
+        marks.append(h.us)
+
+    def driver(h):
+        yield from program(h, preset_a=3, preset_b=9, setting=setting)
+        yield 500
+        for _ in range(presses):
+            yield rng.randint(0, 20)                  # press phase vs. loop and debounce
+            yield from one(h, rng, mark)
+        h.until_us = h.us + 1
+
+    ov = dict(overrides, LATENCY_PROBE_ENABLED=True, LATENCY_PROBE_PIN=PIN_LOOPBACK)
+    ov.update(case_overrides)
+    h.loopback_pin = PIN_LOOPBACK
+    ns = h.run(NEO_MAIN, until_ms=3600 * 1000, driver=driver, overrides=ov)
+    return latencies(h, marks), ns
+
+
+def probe_check(ns, kind, lat):
+    """The firmware's ring for this kind holds the same values as the harness measured."""
+    n = ns["lat_count"][kind]
+    hist = ns["LAT_HISTORY"]
+    ring = sorted(ns["lat_us"][kind * hist + j] for j in range(min(n, hist)))
+    want = sorted(lat[-hist:])
+    if n != len(lat):
+        return "FAIL: probe saw %d presses, harness %d" % (n, len(lat))
+    if ring != want:
+        return "FAIL: probe %s, harness %s" % (ring[:4], want[:4])
+    return "ok"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("cases", nargs="*", help="default: all (%s)" % ", ".join(c[0] for c in CASES))
+    ap.add_argument("--presses", type=int, default=20, help="measured presses per case")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                    help="override a main.py parameter (int or True/False)")
+    args = ap.parse_args()
+    overrides = {}
+    for item in args.set:
+        name, _, value = item.partition("=")
+        overrides[name] = value == "True" if value in ("True", "False") else int(value)
+    names = set(args.cases)
+    for name in names:
+        if name not in [c[0] for c in CASES]:
+            ap.error("unknown case " + name)
+
+    print("%-17s %5s %8s %8s %8s %8s  %s" % ("case", "n", "min ms", "p50 ms", "p95 ms",
+                                             "max ms", "probe"))
+    failed = 0
+    ns = None
+    for case in CASES:
+        if names and case[0] not in names:
+            continue
+        lat, ns = run(case, args.presses, args.seed, overrides)
+        if not lat:
+            print("%-17s %5d  FAIL: no MIDI after the presses" % (case[0], 0))
+            failed += 1
+            continue
+        check = probe_check(ns, case[4], lat)
+        failed += check != "ok"
+        s = sorted(lat)
+        print("%-17s %5d %8.1f %8.1f %8.1f %8.1f  %s" % (
+            case[0], len(s), s[0] / 1000.0, percentile(s, 50) / 1000.0,
+            percentile(s, 95) / 1000.0, s[-1] / 1000.0, check))
+    if ns is not None:
+        print("windows: " + ", ".join("%s=%s" % (p, ns[p]) for p in WINDOW_PARAMS))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Melatroid - Whammy 4 NEO - remote control check (host stand-in)
+"""
+Sends remote CC/PC commands (REMOTE_CH) into MIDI IN and checks that mode, slot,
+harmony order and tempo follow, then reports command -> MIDI out latency.
+
+    python Host/neo_remote.py
+"""
+import argparse
+
+from mpy_host import Host
+from neo_drive import NEO_MAIN, PIN_POT, SETTING_HARMONY, SETTING_STEPSEQ, program
+
+
+def run(pot_u16=0):
+    h = Host()
+    h.set_adc(PIN_POT, pot_u16)
+    checks = []
+
+    def cmd(h, data):
+        h.feed_rx(bytes(data))
+        yield 300
+
+    def check(name, fn):
+        checks.append((name, bool(fn(h.ns))))
+
+    def driver(h):
+        yield from program(h)
+        ns = h.ns
+        ch = ns["REMOTE_CH"]
+        yield 500
+
+        yield from cmd(h, [0xC0 | ch, SETTING_HARMONY])
+        check("PC -> Harmony mode", lambda ns: ns["mode"] == ns["MODE_HARMONY"])
+
+        yield from cmd(h, [0xB0 | ch, ns["REMOTE_CC_SLOT"], 127])
+        yield ns["SWITCH_MUTE_MS"]
+        check("CC slot -> preset B", lambda ns: ns["active_slot"] == 1 and not ns["switch_apply_pending"])
+
+        yield from cmd(h, [0xB0 | ch, ns["REMOTE_CC_HARMONY"], 1])
+        check("CC harmony order", lambda ns: ns["harmony_mode"] == 1)
+
+        yield from cmd(h, [0xB0 | ch, ns["REMOTE_CC_TEMPO"], 127])
+        check("CC tempo (virtual pot)", lambda ns: ns["pot_time_ms"] >= ns["HARMONY_STEP_MAX_MS"] - 5)
+
+        h.set_adc(PIN_POT, 65535 - pot_u16)
+        yield 200
+        check("pot move takes tempo back", lambda ns: not ns["remote_stats"]()[3])
+
+        yield from cmd(h, [0xB0 | ch, ns["REMOTE_CC_MODE"], SETTING_STEPSEQ,
+                           ns["REMOTE_CC_STEPSEQ"], 2])
+        yield ns["SWITCH_MUTE_MS"]
+        check("CC mode -> StepSeq running", lambda ns: ns["mode"] == ns["MODE_STEPSEQ"] and ns["engine_active"](ns["MODE_STEPSEQ"]))
+        check("CC stepseq order", lambda ns: ns["stepseq_mode"] == 2)
+
+        yield from cmd(h, [0xB0 | ((ch + 1) & 0x0F), ns["REMOTE_CC_SLOT"], 0])
+        check("other channel ignored", lambda ns: ns["active_slot"] == 1)
+
+    ns = h.run(NEO_MAIN, until_ms=40000, driver=driver)
+    return ns, checks
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--pot", type=int, default=0)
+    args = ap.parse_args()
+
+    ns, checks = run(args.pot)
+    for name, ok in checks:
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+    cmds, lat_last, lat_max, _tempo = ns["remote_stats"]()
+    print(f"remote cmds={cmds} latency last={lat_last}us max={lat_max}us")
+
+
+if __name__ == "__main__":
+    main()
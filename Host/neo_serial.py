@@ -0,0 +1,439 @@
+# Melatroid - Whammy 4 NEO - USB serial protocol client
+"""
+Talks to the NEO firmware's framed binary protocol over USB serial
+(see SERIAL PROTOCOL in RP2040_Zero/NEO/main.py). Needs pyserial for a real board.
+
+    python Host/neo_serial.py --port /dev/ttyACM0 params
+    python Host/neo_serial.py --port COM5 set SWITCH_MUTE_MS 120
+    python Host/neo_serial.py --port COM5 stream --period 250
+    python Host/neo_serial.py --port COM5 memory   # boot time + free heap per mode
+    python Host/neo_serial.py --port COM5 inputs   # expansion switch scan cost / latency
+    python Host/neo_serial.py --port COM5 switches # preset/mode switch gaps (median, worst)
+    python Host/neo_serial.py --port COM5 latency  # press -> MIDI per mode (probe build)
+    python Host/neo_serial.py --sim [action]   # against NEO/main.py on the host stand-in
+"""
+import argparse
+import struct
+import time
+
+END = 0xC0
+ESC = 0xDB
+ESC_END = 0xDC
+ESC_ESC = 0xDD
+ESC_INTR = 0xDE
+
+CMD_HELLO = 0x01
+CMD_PARAM_INFO = 0x02
+CMD_PARAM_GET = 0x03
+CMD_PARAM_SET = 0x04
+CMD_STATE = 0x05
+CMD_COUNTERS = 0x06
+CMD_STREAM = 0x07
+CMD_TRACE_INFO = 0x08
+CMD_TRACE_READ = 0x09
+CMD_MEMORY = 0x0A
+CMD_INPUTS = 0x0B
+CMD_SWITCH = 0x0C
+CMD_LATENCY = 0x0D
+
+STATUS_TEXT = {0: "ok", 1: "unknown command", 2: "bad index", 3: "bad length"}
+
+STATE_FIELDS = ("mode", "layer", "active_slot", "programming_done", "stage", "effect_enabled",
+                "shutter_active", "harmony_active", "stepseq_active", "mod_active",
+                "harmony_mode", "stepseq_mode", "switch_apply_pending")
+COUNTER_FIELDS = ("midi_out_bytes", "midi_drops", "midi_coalesced", "midi_depth_max",
+                  "midi_state_wait_max_us", "midi_in_msgs", "midi_in_errors",
+                  "thru_lat_max_us", "thru_over_bound", "remote_cmds", "remote_lat_max_us",
+                  "serial_frames_ok", "serial_frames_bad")
+INPUT_FIELDS = ("exp_scans", "exp_scan_last_us", "exp_scan_max_us", "exp_presses", "exp_errors",
+                "exp_lat_last_us", "exp_lat_max_us", "exp_levels")
+SWITCH_FIELDS = ("switches", "gap_last_us", "gap_median_us", "gap_worst_us")
+LATENCY_KINDS = ("Latch", "Momentary", "Holding", "Shutter start", "Harmony start",
+                 "StepSeq re-roll")
+MODE_NAMES = ("Latch", "Momentary", "Holding", "Shutter", "Harmony", "StepSeq", "Legacy",
+              "Modulation")
+
+
+def crc8(data) -> int:
+    c = 0
+    for b in data:
+        c ^= b
+        for _ in range(8):
+            c = ((c << 1) ^ 0x07) & 0xFF if c & 0x80 else (c << 1) & 0xFF
+    return c
+
+
+def encode(cmd: int, seq: int, payload: bytes = b"") -> bytes:
+    raw = bytes([cmd, seq]) + payload
+    raw += bytes([crc8(raw)])
+    out = bytearray([END])
+    for b in raw:
+        if b == END:
+            out += bytes([ESC, ESC_END])
+        elif b == ESC:
+            out += bytes([ESC, ESC_ESC])
+        elif b == 0x03:
+            out += bytes([ESC, ESC_INTR])
+        else:
+            out.append(b)
+    out.append(END)
+    return bytes(out)
+
+
+class Decoder:
+    """Incremental frame decoder; REPL text between frames is skipped."""
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.esc = False
+        self.bad = 0
+
+    def feed(self, data: bytes):
+        """Yield (cmd, seq, status, payload) for every complete, valid frame."""
+        for b in data:
+            if b == END:
+                raw, self.buf = bytes(self.buf), bytearray()
+                self.esc = False
+                if len(raw) < 4:
+                    continue
+                if crc8(raw[:-1]) != raw[-1]:
+                    self.bad += 1
+                    continue
+                yield raw[0] & 0x7F, raw[1], raw[2], raw[3:-1]
+                continue
+            if b == ESC:
+                self.esc = True
+                continue
+            if self.esc:
+                self.esc = False
+                b = {ESC_END: END, ESC_ESC: ESC, ESC_INTR: 0x03}.get(b, b)
+            self.buf.append(b)
+
+
+def decode_state(payload: bytes) -> dict:
+    n = len(STATE_FIELDS)
+    d = dict(zip(STATE_FIELDS, payload[:n]))
+    d["pot_time_ms"] = struct.unpack_from("<i", payload, n)[0]
+    return d
+
+
+def decode_counters(payload: bytes) -> dict:
+    return dict(zip(COUNTER_FIELDS, struct.unpack_from("<%dI" % len(COUNTER_FIELDS), payload)))
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class Client:
+    """
+    Request/response over a link with write(bytes) and read() -> bytes (non-blocking).
+    `pump` is called while waiting and lets about `pump_ms` pass.
+    """
+
+    def __init__(self, link, pump=None, pump_ms=5, timeout_ms=2000):
+        self.link = link
+        self.pump_ms = pump_ms
+        self.pump = pump or (lambda: time.sleep(pump_ms / 1000.0))
+        self.timeout_ms = timeout_ms
+        self.dec = Decoder()
+        self.seq = 0
+        self.streamed = []
+        self.params = None
+
+    def request(self, cmd: int, payload: bytes = b"") -> bytes:
+        self.seq = self.seq % 255 + 1          # seq 0 is reserved for streamed frames
+        self.link.write(encode(cmd, self.seq, payload))
+        for _ in range(max(1, self.timeout_ms // self.pump_ms)):
+            for (rcmd, rseq, status, pl) in self.dec.feed(self.link.read()):
+                if rseq == 0 and rcmd == CMD_COUNTERS:
+                    self.streamed.append(decode_counters(pl))
+                elif rcmd == cmd and rseq == self.seq:
+                    if status:
+                        raise ProtocolError(STATUS_TEXT.get(status, str(status)))
+                    return pl
+            self.pump()
+        raise ProtocolError("no response to command 0x%02X" % cmd)
+
+    def hello(self):
+        pl = self.request(CMD_HELLO)
+        return pl[0], pl[1], pl[2:].decode()
+
+    def param_table(self):
+        if self.params is None:
+            _ver, count, _fw = self.hello()
+            self.params = []
+            for idx in range(count):
+                pl = self.request(CMD_PARAM_INFO, bytes([idx]))
+                lo, hi = struct.unpack_from("<ii", pl)
+                self.params.append((pl[8:].decode(), lo, hi))
+        return self.params
+
+    def param_index(self, name: str) -> int:
+        for idx, (pname, _lo, _hi) in enumerate(self.param_table()):
+            if pname == name:
+                return idx
+        raise ProtocolError("unknown parameter " + name)
+
+    def get(self, name: str) -> int:
+        pl = self.request(CMD_PARAM_GET, bytes([self.param_index(name)]))
+        return struct.unpack_from("<i", pl)[0]
+
+    def set(self, name: str, value: int) -> int:
+        pl = self.request(CMD_PARAM_SET, bytes([self.param_index(name)]) + struct.pack("<i", value))
+        return struct.unpack_from("<i", pl)[0]
+
+    def state(self) -> dict:
+        return decode_state(self.request(CMD_STATE))
+
+    def counters(self) -> dict:
+        return decode_counters(self.request(CMD_COUNTERS))
+
+    def stream(self, period_ms: int):
+        self.request(CMD_STREAM, struct.pack("<H", period_ms))
+
+    def trace_info(self, freeze: bool):
+        """(events written, capacity, lost while frozen, frozen)"""
+        pl = self.request(CMD_TRACE_INFO, bytes([1 if freeze else 0]))
+        return struct.unpack_from("<IHIB", pl)
+
+    def trace_dump(self):
+        """Freeze the ring, read it oldest first as [(ticks_us, word)], then let it run again."""
+        written, cap, _lost, _frozen = self.trace_info(True)
+        events = []
+        try:
+            while len(events) < min(written, cap):
+                pl = self.request(CMD_TRACE_READ, struct.pack("<H", len(events)))
+                n = (len(pl) - 2) // 8
+                if n == 0:
+                    break
+                words = struct.unpack_from("<%dI" % (2 * n), pl, 2)
+                events += [(words[2 * k], words[2 * k + 1]) for k in range(n)]
+        finally:
+            self.trace_info(False)
+        return events
+
+    def memory(self):
+        """
+        ({boot_us, boot_free, free_now, engine_mode}, {mode: (engine load us, free after)}).
+        Modes not visited since boot are left out.
+        """
+        boot_us, boot_free, free_now, eng = struct.unpack_from("<IIIB", self.request(CMD_MEMORY))
+        boot = {"boot_us": boot_us, "boot_free": boot_free, "free_now": free_now,
+                "engine_mode": eng if eng != 0xFF else -1}
+        modes = {}
+        for m in range(len(MODE_NAMES)):
+            _m, load_us, free = struct.unpack_from("<Bii", self.request(CMD_MEMORY, bytes([m])))
+            if free >= 0:
+                modes[m] = (load_us, free)
+        return boot, modes
+
+    def inputs(self) -> dict:
+        pl = self.request(CMD_INPUTS)
+        return dict(zip(INPUT_FIELDS, struct.unpack_from("<%dI" % len(INPUT_FIELDS), pl)))
+
+    def switches(self) -> dict:
+        pl = self.request(CMD_SWITCH)
+        return dict(zip(SWITCH_FIELDS, struct.unpack_from("<%dI" % len(SWITCH_FIELDS), pl)))
+
+    def latency(self, kind: int):
+        """(presses measured, last latencies us) of one LATENCY_KINDS entry (probe build)."""
+        pl = self.request(CMD_LATENCY, bytes([kind]))
+        count = struct.unpack_from("<I", pl, 1)[0]
+        n = (len(pl) - 5) // 4
+        return count, list(struct.unpack_from("<%dI" % n, pl, 5))
+
+    def poll_stream(self):
+        for (rcmd, rseq, _status, pl) in self.dec.feed(self.link.read()):
+            if rseq == 0 and rcmd == CMD_COUNTERS:
+                self.streamed.append(decode_counters(pl))
+        out, self.streamed = self.streamed, []
+        return out
+
+
+# =========================================================
+# links
+# =========================================================
+class SerialLink:
+    def __init__(self, port: str):
+        import serial   # pyserial, only needed for a real board
+        self.ser = serial.Serial(port, 115200, timeout=0)
+
+    def write(self, data: bytes):
+        self.ser.write(data)
+
+    def read(self) -> bytes:
+        return self.ser.read(4096)
+
+
+class SimLink:
+    """Host stand-in link (the client runs in lockstep with the virtual clock, see run_sim)."""
+
+    def __init__(self, h):
+        self.h = h
+
+    def write(self, data: bytes):
+        self.h.feed_usb(data)
+
+    def read(self) -> bytes:
+        return self.h.take_usb()
+
+
+# =========================================================
+# CLI
+# =========================================================
+def print_state(st: dict):
+    mode = st["mode"]
+    print("mode=%s layer=%d slot=%s pot_time_ms=%d" % (
+        MODE_NAMES[mode] if mode < len(MODE_NAMES) else mode, st["layer"] + 1,
+        "ABCD"[st["active_slot"]], st["pot_time_ms"]))
+    print("  " + " ".join("%s=%d" % (k, st[k]) for k in STATE_FIELDS[3:]))
+
+
+def session(cli: Client, args):
+    if args.action == "params":
+        for (name, lo, hi) in cli.param_table():
+            print("%-22s %6d   (%d..%d)" % (name, cli.get(name), lo, hi))
+    elif args.action == "get":
+        print(cli.get(args.name))
+    elif args.action == "set":
+        print(cli.set(args.name, int(args.value)))
+    elif args.action == "state":
+        print_state(cli.state())
+    elif args.action == "counters":
+        for k, v in cli.counters().items():
+            print("%-24s %d" % (k, v))
+    elif args.action == "memory":
+        boot, modes = cli.memory()
+        print("boot: init %.1fms, free %d bytes; free now %d bytes" % (
+            boot["boot_us"] / 1000.0, boot["boot_free"], boot["free_now"]))
+        for m, (load_us, free) in sorted(modes.items()):
+            print("  %-11s engine load %8.1fms   free after %7d bytes" % (
+                MODE_NAMES[m], load_us / 1000.0, free))
+    elif args.action == "inputs":
+        st = cli.inputs()
+        for k in INPUT_FIELDS[:-1]:
+            print("%-24s %d" % (k, st[k]))
+        print("%-24s 0x%04X (0 = pressed)" % ("exp_levels", st["exp_levels"]))
+    elif args.action == "switches":
+        st = cli.switches()
+        for k in SWITCH_FIELDS:
+            print("%-24s %d" % (k, st[k]))
+    elif args.action == "latency":
+        for kind, name in enumerate(LATENCY_KINDS):
+            count, lat = cli.latency(kind)
+            lat.sort()
+            if lat:
+                print("%-16s %5d presses, last %d: min %.1fms median %.1fms max %.1fms" % (
+                    name, count, len(lat), lat[0] / 1000.0, lat[len(lat) // 2] / 1000.0,
+                    lat[-1] / 1000.0))
+            else:
+                print("%-16s %5d presses" % (name, count))
+    elif args.action == "stream":
+        cli.stream(args.period)
+        for _ in range(int(args.seconds * 1000) // cli.pump_ms):
+            for c in cli.poll_stream():
+                print(" ".join("%s=%d" % kv for kv in c.items()))
+            cli.pump()
+        cli.stream(0)
+    else:
+        demo(cli)
+
+
+def demo(cli: Client):
+    ver, count, fw = cli.hello()
+    print("protocol v%d, firmware %s, %d parameters" % (ver, fw, count))
+    before = cli.get("SWITCH_MUTE_MS")
+    print("SWITCH_MUTE_MS %d -> %d" % (before, cli.set("SWITCH_MUTE_MS", 120)))
+    print("SHUTTER_MIN_MS set 5000 -> %d (kept <= SHUTTER_MAX_MS)" % cli.set("SHUTTER_MIN_MS", 5000))
+    print("DEBOUNCE_MS set 0 -> %d (clamped)" % cli.set("DEBOUNCE_MS", 0))
+    print_state(cli.state())
+    print("counters: " + " ".join("%s=%d" % kv for kv in cli.counters().items()))
+
+
+def default_scenario(h):
+    """NEO programmed to Harmony, runner started."""
+    from neo_drive import SETTING_HARMONY, program, tap
+    yield from program(h, setting=SETTING_HARMONY)
+    yield from tap(h)
+    yield 200
+
+
+def run_sim(fn, scenario=default_scenario):
+    """
+    Boot NEO/main.py on the stand-in, play `scenario` (driver steps), then call fn(client).
+    The client thread and the virtual clock take turns: every pump() lets 1 ms of
+    firmware time pass. Returns fn's result.
+    """
+    import threading
+    from mpy_host import Host
+    from neo_drive import NEO_MAIN
+
+    h = Host()
+    turn_fw = threading.Semaphore(0)
+    turn_cli = threading.Semaphore(0)
+    state = {"done": False, "error": None, "result": None}
+
+    def pump():
+        turn_fw.release()
+        turn_cli.acquire()
+
+    def client():
+        turn_cli.acquire()
+        try:
+            state["result"] = fn(Client(SimLink(h), pump=pump, pump_ms=1))
+        except Exception as e:     # re-raised after the run
+            state["error"] = e
+        finally:
+            state["done"] = True
+            turn_fw.release()
+
+    def driver(h):
+        yield from scenario(h)
+        th = threading.Thread(target=client, daemon=True)
+        th.start()
+        while not state["done"]:
+            turn_cli.release()
+            turn_fw.acquire()
+            if not state["done"]:
+                yield 1
+        h.until_us = h.us + 1
+
+    h.run(NEO_MAIN, until_ms=3600 * 1000, driver=driver)
+    if state["error"] is not None:
+        raise state["error"]
+    return state["result"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--port", help="serial port of the board (pyserial)")
+    ap.add_argument("--sim", action="store_true", help="run a demo session on the host stand-in")
+    sub = ap.add_subparsers(dest="action")
+    sub.add_parser("params")
+    sub.add_parser("state")
+    sub.add_parser("counters")
+    sub.add_parser("memory")
+    sub.add_parser("inputs")
+    sub.add_parser("switches")
+    sub.add_parser("latency")
+    g = sub.add_parser("get")
+    g.add_argument("name")
+    s = sub.add_parser("set")
+    s.add_argument("name")
+    s.add_argument("value")
+    st = sub.add_parser("stream")
+    st.add_argument("--period", type=int, default=250)
+    st.add_argument("--seconds", type=float, default=10.0)
+    args = ap.parse_args()
+
+    if args.sim:
+        run_sim(lambda cli: session(cli, args))
+        return
+    if not args.port:
+        ap.error("--port is required (or --sim)")
+    session(Client(SerialLink(args.port)), args)
+
+
+if __name__ == "__main__":
+    main()
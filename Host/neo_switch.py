@@ -0,0 +1,93 @@
+# Melatroid - Whammy 4 NEO - preset switch gap check (host stand-in)
+"""
+Switches preset A <-> B repeatedly in Momentary / Holding (double tap) and Shutter
+(remote CC slot) for preset pairs across the families (Detune, Whammy, Harmony) and
+reports the switch gaps the firmware measured (switch -> effect engaged again):
+median and worst per case and overall. Checks that every switch lands on the other slot.
+
+    python Host/neo_switch.py
+    python Host/neo_switch.py --mute 250     # every family muted 250 ms (fixed mute)
+"""
+import argparse
+import statistics
+import sys
+
+from mpy_host import Host
+from neo_drive import (NEO_MAIN, PIN_POT, SETTING_HOLDING, SETTING_MOMENTARY,
+                       SETTING_SHUTTER, program, tap)
+
+SWITCHES = 6
+FAMILY_PARAMS = ("SWITCH_MUTE_DETUNE_MS", "SWITCH_MUTE_WHAMMY_MS", "SWITCH_MUTE_HARMONY_MS")
+
+MODES = (
+    # name, setting, tap ms (double tap needs short taps in Holding)
+    ("Momentary", SETTING_MOMENTARY, 60),
+    ("Holding", SETTING_HOLDING, 40),
+    ("Shutter", SETTING_SHUTTER, 0),
+)
+PAIRS = (
+    # label, preset A, preset B
+    ("Detune/Whammy", 0, 3),
+    ("Whammy/Harmony", 3, 9),
+    ("Harmony/Harmony", 9, 12),
+)
+
+
+def run(setting, tap_ms, preset_a, preset_b, mute_ms=None):
+    h = Host(seed=1)
+    h.set_adc(PIN_POT, 20000)
+    landed = []
+
+    def switch(h):
+        ns = h.ns
+        if tap_ms:
+            yield from tap(h, tap_ms)
+            yield 100
+            yield from tap(h, tap_ms)
+        else:
+            ch = ns["REMOTE_CH"]
+            h.feed_rx(bytes([0xB0 | ch, ns["REMOTE_CC_SLOT"], 0 if ns["active_slot"] else 127]))
+        yield lambda ns: ns["switch_apply_pending"]
+        yield lambda ns: not ns["switch_apply_pending"]
+
+    def driver(h):
+        yield from program(h, preset_a=preset_a, preset_b=preset_b, setting=setting)
+        yield 500
+        for _ in range(SWITCHES):
+            slot = h.ns["active_slot"]
+            yield from switch(h)
+            landed.append(h.ns["active_slot"] == 1 - slot)
+            yield 600
+        h.until_us = h.us + 1
+
+    overrides = {}
+    if mute_ms is not None:
+        overrides = dict((name, mute_ms) for name in FAMILY_PARAMS)
+    ns = h.run(NEO_MAIN, until_ms=3600 * 1000, driver=driver, overrides=overrides)
+    n = min(ns["switch_gap_count"], ns["SWITCH_GAP_HISTORY"])
+    return list(ns["switch_gaps_us"][:n]), all(landed) and len(landed) == SWITCHES
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--mute", type=int, help="override every family mute (ms)")
+    args = ap.parse_args()
+
+    print("%-10s %-16s %6s %10s %10s  %s" % ("mode", "presets", "count", "median ms", "worst ms", "result"))
+    every = []
+    failed = 0
+    for (mode_name, setting, tap_ms) in MODES:
+        for (pair_name, a, b) in PAIRS:
+            gaps, ok = run(setting, tap_ms, a, b, args.mute)
+            every += gaps
+            failed += not ok
+            print("%-10s %-16s %6d %10.1f %10.1f  %s" % (
+                mode_name, pair_name, len(gaps), statistics.median(gaps) / 1000.0,
+                max(gaps) / 1000.0, "ok" if ok else "FAIL: slot did not change"))
+    print("all switches: median %.1fms, worst %.1fms" % (
+        statistics.median(every) / 1000.0, max(every) / 1000.0))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
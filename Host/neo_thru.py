@@ -0,0 +1,109 @@
+# Melatroid - Whammy 4 NEO - MIDI THRU check (host stand-in)
+"""
+Feeds MIDI IN at a given wire load (running status + interleaved realtime clock + a
+short SysEx now and then) while a step engine runs, then checks that THRU forwarded
+every message intact and in order, merged with our own output, and that the THRU
+latency stayed inside MIDI_THRU_BOUND_US. Default loads: 80 % and full (100 %) load.
+
+    python Host/neo_thru.py --seconds 20 --engine harmony --load 80
+
+At 100 % input load nothing we add ever drains from the wire backlog: our TIMING/CONT
+output yields to THRU completely (steps are dropped, newest kept) and THRU adds no
+bytes of its own. A STATE message sent during full load (a footswitch press) still
+adds its 2-3 bytes until the load eases; the run starts the engine before the load.
+"""
+import argparse
+import sys
+
+from mpy_host import Host
+from neo_drift import ENGINES
+from neo_drive import NEO_MAIN, PIN_POT, program, tap
+
+
+SYSEX_EVERY = 50
+SYSEX = bytes([0xF0, 0x7D, 0x01, 0x02, 0xF7])   # non-commercial ID
+
+
+def build_input(seconds, spacing_us):
+    """
+    Running-status CC stream on CH1 with a clock byte inside every 3rd message and a
+    SysEx every SYSEX_EVERY messages (it ends running status: the next CC has a status).
+    """
+    n_bytes = int(seconds * 1000000 // spacing_us)
+    data = bytearray()
+    expect = []
+    val = 0
+    data.append(0xB0)
+    while len(data) < n_bytes:
+        val = (val + 1) & 0x7F
+        if len(expect) % SYSEX_EVERY == SYSEX_EVERY - 1:
+            data += SYSEX + bytes([0xB0])
+            expect.append(SYSEX)
+        if val % 3 == 0:
+            data += bytes([7, 0xF8, val])        # clock between data bytes
+            expect.append(bytes([0xF8]))
+        else:
+            data += bytes([7, val])
+        expect.append(bytes([0xB0, 7, val]))
+    return bytes(data), expect
+
+
+def is_thru(msg):
+    # the input stream is CC7 on CH1 + clock + SysEx; the firmware itself never sends these
+    return msg[0] in (0xF8, 0xF0) or (len(msg) == 3 and msg[0] == 0xB0 and msg[1] == 7)
+
+
+def run(seconds=20.0, engine="harmony", pot_u16=0, load_percent=80):
+    h = Host()
+    h.set_adc(PIN_POT, pot_u16)
+    marks = {}
+    byte_us = h.byte_us()
+    spacing_us = byte_us * 100 // load_percent
+    data, expect = build_input(seconds, spacing_us)
+
+    def driver(h):
+        yield from program(h, setting=ENGINES[engine])
+        if engine != "stepseq":
+            yield from tap(h)
+        yield 500
+        marks["tx0"] = len(h.tx_log)
+        marks["t0"] = h.us
+        h.feed_rx(data, spacing_us)
+        yield int(seconds * 1000) + 1000
+        h.until_us = h.us + 1
+
+    ns = h.run(NEO_MAIN, until_ms=3600 * 1000, driver=driver)
+    out = [m for (_w, m) in h.midi_messages(marks["tx0"])]
+    thru = [d for d in out if is_thru(d)]
+    ok = thru == expect
+    wire_bytes = sum(len(d) for (_w, _s, _e, d) in h.tx_log[marks["tx0"]:])
+    load = 100.0 * wire_bytes * byte_us / (h.us - marks["t0"])
+    return ns, ok, len(expect), len(thru), len(out) - len(thru), load
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--engine", choices=sorted(ENGINES), default="harmony")
+    ap.add_argument("--pot", type=int, default=0)
+    ap.add_argument("--load", type=int, action="append", default=[],
+                    help="MIDI IN wire load in percent (1..100, repeatable, default 80 and 100)")
+    args = ap.parse_args()
+
+    failed = 0
+    for load_in in args.load or [80, 100]:
+        ns, ok, n_exp, n_thru, n_own, load = run(args.seconds, args.engine, args.pot,
+                                                 max(1, min(100, load_in)))
+        msgs, errors, lat_last, lat_max, over = ns["midi_in_stats"]()
+        good = ok and not errors and not over
+        failed += not good
+        print(f"--- MIDI IN load {load_in}%: {'ok' if good else 'FAIL'}")
+        print(f"in={msgs} errors={errors} thru={n_thru}/{n_exp} intact_in_order={ok} own_msgs={n_own}")
+        print(f"MIDI OUT wire load={load:.1f}%")
+        print(f"thru latency max={lat_max}us bound={ns['MIDI_THRU_BOUND_US']}us over_bound={over}")
+        print(f"midi_stats (depth, max depth, drops, coalesced, bytes, state wait max us) = {ns['midi_stats']()}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# Melatroid - Whammy 4 NEO - trace dump decoder
+"""
+Dumps the NEO firmware's RAM trace over USB serial (see TRACE RECORDER in
+RP2040_Zero/NEO/main.py) and reports per-message timing jitter, gaps and
+footswitch -> MIDI response, plus the last CC0 / PC sent (stuck-effect check).
+
+    python Host/neo_trace.py --port /dev/ttyACM0 [--list] [--save dump.json]
+    python Host/neo_trace.py --load dump.json
+    python Host/neo_trace.py --sim                # Harmony run on the host stand-in
+"""
+import argparse
+import json
+import statistics
+
+from neo_serial import MODE_NAMES, Client, SerialLink, run_sim
+
+TICKS_PERIOD = 1 << 30
+
+T_MIDI_OUT = 1
+T_MIDI_IN = 2
+T_SWITCH = 3
+T_MODE = 4
+
+PRIO_NAMES = ("state", "timing", "cont", "thru")
+STATUS_NAMES = {0x80: "NoteOff", 0x90: "NoteOn", 0xA0: "PolyAT", 0xB0: "CC", 0xC0: "PC",
+                0xD0: "ChanAT", 0xE0: "Bend"}
+BYPASS_OFFSET = 17
+
+
+def decode(raw):
+    """[(ticks_us, word)] oldest first -> list of event dicts with unwrapped t_us."""
+    events = []
+    t = 0
+    prev = None
+    for (ticks, word) in raw:
+        if prev is not None:
+            d = (ticks - prev) & (TICKS_PERIOD - 1)
+            t += d
+        prev = ticks
+        kind = word >> 24
+        events.append({
+            "t_us": t,
+            "type": kind & 0x07,
+            "aux": (kind >> 3) & 0x07,
+            "a": (word >> 16) & 0xFF,
+            "b": (word >> 8) & 0xFF,
+            "c": word & 0xFF,
+        })
+    return events
+
+
+def describe(ev) -> str:
+    a, b, c = ev["a"], ev["b"], ev["c"]
+    if ev["type"] in (T_MIDI_OUT, T_MIDI_IN):
+        name = STATUS_NAMES.get(a & 0xF0, "0x%02X" % a) if a < 0xF0 else "0x%02X" % a
+        data = " ".join(str(x) for x in (b, c) if x != 0xFF)
+        where = ("out/" + PRIO_NAMES[ev["aux"]]) if ev["type"] == T_MIDI_OUT else "in"
+        return "MIDI %-12s %-6s ch%-2d %s" % (where, name, (a & 0x0F) + 1, data)
+    if ev["type"] == T_SWITCH:
+        name = ("footswitch", "layer switch")[a] if a < 2 else "expansion switch %d" % (a - 2)
+        return "%s %s (layer %d)" % (name, "down" if b == 0 else "up", c + 1)
+    if ev["type"] == T_MODE:
+        return "sound applied: mode=%s slot=%s effect=%d" % (
+            MODE_NAMES[a] if a < len(MODE_NAMES) else a, "ABCD"[b & 3], c)
+    return "? %r" % (ev,)
+
+
+def message_class(ev) -> str:
+    a = ev["a"]
+    name = STATUS_NAMES.get(a & 0xF0, "0x%02X" % a) if a < 0xF0 else "0x%02X" % a
+    if name == "CC":
+        name = "CC%d" % ev["b"]
+    return "%s/%s" % (name, PRIO_NAMES[ev["aux"]])
+
+
+def report(events):
+    out = [e for e in events if e["type"] == T_MIDI_OUT]
+    if not events:
+        print("trace is empty")
+        return
+    span_ms = (events[-1]["t_us"] - events[0]["t_us"]) / 1000.0
+    print("events=%d span=%.1fms midi_out=%d midi_in=%d switch=%d mode=%d" % (
+        len(events), span_ms, len(out),
+        sum(1 for e in events if e["type"] == T_MIDI_IN),
+        sum(1 for e in events if e["type"] == T_SWITCH),
+        sum(1 for e in events if e["type"] == T_MODE)))
+
+    print("\nper message class (interval between sends):")
+    print("  %-16s %6s %10s %10s %10s %10s" % ("class", "count", "median ms", "jitter ms", "pk-pk ms", "max gap ms"))
+    classes = {}
+    for e in out:
+        classes.setdefault(message_class(e), []).append(e["t_us"])
+    for name in sorted(classes):
+        ts = classes[name]
+        iv = [(b - a) / 1000.0 for a, b in zip(ts, ts[1:])]
+        if not iv:
+            print("  %-16s %6d" % (name, len(ts)))
+            continue
+        med = statistics.median(iv)
+        jitter = statistics.pstdev(iv)
+        print("  %-16s %6d %10.2f %10.2f %10.2f %10.2f" % (
+            name, len(ts), med, jitter, max(iv) - min(iv), max(iv)))
+
+    if len(out) > 1:
+        gaps = [((b["t_us"] - a["t_us"]) / 1000.0, a["t_us"]) for a, b in zip(out, out[1:])]
+        gap, at = max(gaps)
+        print("\nlongest MIDI out silence: %.1fms (after t=%.1fms)" % (gap, (at - events[0]["t_us"]) / 1000.0))
+
+    resp = []
+    for i, e in enumerate(events):
+        if e["type"] == T_SWITCH and e["a"] == 0:
+            for f in events[i + 1:]:
+                if f["type"] == T_MIDI_OUT:
+                    resp.append((f["t_us"] - e["t_us"]) / 1000.0)
+                    break
+                if f["type"] == T_SWITCH:
+                    break
+    if resp:
+        print("footswitch edge -> first MIDI out: n=%d median=%.2fms max=%.2fms" % (
+            len(resp), statistics.median(resp), max(resp)))
+
+    cc0 = [e for e in out if (e["a"] & 0xF0) == 0xB0 and e["b"] == 0]
+    pcs = [e for e in out if (e["a"] & 0xF0) == 0xC0]
+    modes = [e for e in events if e["type"] == T_MODE]
+    print("\nlast state sent:")
+    if cc0:
+        print("  CC0 = %d" % cc0[-1]["c"])
+    if pcs:
+        pc = pcs[-1]["b"]
+        print("  PC  = %d (%s)" % (pc, "bypass" if pc >= BYPASS_OFFSET else "effect"))
+    if modes:
+        print("  " + describe(modes[-1]))
+
+
+def sim_scenario(h):
+    from neo_drive import SETTING_HARMONY, program, tap
+    yield from program(h, setting=SETTING_HARMONY)
+    yield from tap(h)          # runner starts
+    yield 3000
+    yield from tap(h)          # next order
+    yield 2000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--port", help="serial port of the board (pyserial)")
+    ap.add_argument("--sim", action="store_true", help="dump a Harmony run on the host stand-in")
+    ap.add_argument("--load", help="decode a dump saved with --save")
+    ap.add_argument("--save", help="store the raw dump as JSON")
+    ap.add_argument("--list", action="store_true", help="print every event")
+    args = ap.parse_args()
+
+    if args.load:
+        with open(args.load) as f:
+            raw = [tuple(x) for x in json.load(f)]
+    elif args.sim:
+        raw = run_sim(lambda cli: cli.trace_dump(), scenario=sim_scenario)
+    elif args.port:
+        raw = Client(SerialLink(args.port)).trace_dump()
+    else:
+        ap.error("one of --port, --sim or --load is required")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(raw, f)
+
+    events = decode(raw)
+    if args.list:
+        t0 = events[0]["t_us"] if events else 0
+        for e in events:
+            print("%10.3f  %s" % ((e["t_us"] - t0) / 1000.0, describe(e)))
+        print()
+    report(events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Melatroid - Whammy 4 NEO - Harmony runner engine (loaded on demand by main.py)
+"""
+Steps through a preset order (3 built-in modes + HARMONY_USER_ORDERS) at pot tempo,
+one step per due runner lane (LANE SCHEDULER in main.py).
+Imported when Harmony is selected and dropped again when the mode is left.
+The chosen order (harmony_mode) stays in main.py.
+"""
+import __main__ as neo
+
+
+def build_seqs():
+    """
+    Build ALL runner orders once at load as compact bytes.
+    Index = harmony_mode, so start/restart/mode cycling only swap a reference.
+    """
+    down = bytes(range(15, 7, -1))            # 15..8
+    up = bytes(range(8, 16, 1))               # 8..15
+    pingpong = down + bytes(range(9, 15, 1))  # 15..8 + 9..14
+    seqs = [down, up, pingpong]
+
+    max_pc = len(neo.PRESETS) - 1
+    for order in neo.HARMONY_USER_ORDERS:
+        if order:
+            seqs.append(bytes([neo.clamp(pc, 0, max_pc) for pc in order]))
+    return tuple(seqs)
+
+
+SEQS = build_seqs()
+
+seq = SEQS[0]
+seq_len = len(seq)
+
+active = False
+i = 0
+last_pc = 15
+
+
+def select_seq():
+    global seq, seq_len
+    seq = SEQS[neo.harmony_mode % len(SEQS)]
+    seq_len = len(seq)
+
+
+def cycle():
+    neo.harmony_mode = (neo.harmony_mode + 1) % len(SEQS)
+    select_seq()
+    neo.blink_selected_channel(times=neo.harmony_mode + 1, on_ms=60, off_ms=60)
+
+
+def start(now_ms: int, pc: int):
+    global active, i, last_pc
+    select_seq()
+    active = True
+    i = 0
+    last_pc = seq[i]
+    neo.midi_cc(0, 127)               # arm once
+    neo.midi_pc(last_pc)              # initial PC
+    neo.runner_lanes_start(last_pc)
+
+
+def restart(now_ms: int):
+    """
+    Apply the current harmony_mode immediately while keeping CC armed (no CC OFF).
+    """
+    global i, last_pc
+    if not active:
+        return
+    select_seq()
+    i = 0
+    last_pc = seq[i]
+    neo.midi_pc(last_pc)  # immediate new direction start PC
+    neo.runner_lanes_start(last_pc)
+
+
+def step():
+    global i, last_pc
+    i += 1
+    if i >= seq_len:
+        i = 0
+    last_pc = seq[i]
+    neo.lane_set_pc(last_pc)          # PC only (sent by the lane pass)
+
+
+def service(now_ms: int):
+    """Nothing to do between steps."""
+
+
+def stop(pc: int):
+    global active
+    if not active:
+        return
+    active = False
+    neo.runner_lanes_stop()
+    neo.midi_cc(0, 0)
+    neo.midi_pc(neo.pc_bypass(last_pc))
@@ -0,0 +1,103 @@
+# Melatroid - Whammy 4 NEO - Pedal modulation engine (loaded on demand by main.py)
+"""
+Streams the Whammy pedal-position CC from a waveform table (LFO / ramps), one cycle
+per pot_time_ms. Imported when Pedal Modulation is selected and dropped again when
+the mode is left. The chosen waveform (mod_wave) stays in main.py.
+"""
+import math
+import time
+import __main__ as neo
+
+MOD_CC = 11               # Whammy pedal position controller (0 = heel, 127 = toe)
+PARK_VALUE = 0            # pedal position left behind when modulation stops
+TABLE_LEN = 128           # one full cycle per table
+
+# Bandwidth: values go out as MIDI_PRIO_CONT (coalesced + paced by the MIDI scheduler).
+# Only CHANGED values are offered, so slow sweeps cost less.
+
+
+def build_tables():
+    """
+    One bytearray per waveform (values 0..127), built once at load:
+    triangle, sine, ramp up, ramp down, square.
+    """
+    n = TABLE_LEN
+    tri = bytearray(n)
+    sine = bytearray(n)
+    up = bytearray(n)
+    down = bytearray(n)
+    square = bytearray(n)
+    half = n // 2
+    for k in range(n):
+        tri[k] = (k * 127) // half if k < half else ((n - k) * 127) // half
+        sine[k] = int(63.5 - 63.5 * math.cos(2 * math.pi * k / n) + 0.5)
+        up[k] = (k * 127) // (n - 1)
+        down[k] = 127 - up[k]
+        square[k] = 127 if k < half else 0
+    return (tri, sine, up, down, square)
+
+
+TABLES = build_tables()
+WAVE_COUNT = len(TABLES)
+
+table = TABLES[neo.mod_wave % WAVE_COUNT]
+
+active = False
+phase_ms = 0              # position inside the current cycle (0..pot_time_ms)
+last_ms = 0
+last_val = -1
+
+
+def cycle():
+    global table
+    neo.mod_wave = (neo.mod_wave + 1) % WAVE_COUNT
+    table = TABLES[neo.mod_wave]
+    neo.blink_selected_channel(times=neo.mod_wave + 1, on_ms=60, off_ms=60)
+
+
+def start(now_ms: int, pc: int):
+    global active, phase_ms, last_ms, last_val
+    active = True
+    phase_ms = 0
+    last_ms = now_ms
+    last_val = table[0]
+    neo.midi_cc(MOD_CC, last_val)  # start position BEFORE the effect engages
+    neo.midi_cc(0, 127)
+    neo.midi_pc(pc)
+
+
+def service(now_ms: int):
+    """
+    Advance the LFO phase and offer the pedal CC to the scheduler (changes only).
+    """
+    global phase_ms, last_ms, last_val
+    dt = time.ticks_diff(now_ms, last_ms)
+    if dt <= 0:
+        return
+    last_ms = now_ms
+    period = neo.pot_time_ms
+    phase_ms += dt
+    if phase_ms >= period:
+        phase_ms %= period
+
+    val = table[(phase_ms * TABLE_LEN) // period]
+    if val == last_val:
+        return
+    neo.midi_cc_cont(MOD_CC, val)
+    last_val = val
+
+
+def rescale(now_ms: int, old_ms: int, new_ms: int):
+    global phase_ms
+    if active and old_ms > 0:
+        phase_ms = (phase_ms * new_ms) // old_ms
+
+
+def stop(pc: int):
+    global active
+    if not active:
+        return
+    active = False
+    neo.midi_cc(0, 0)
+    neo.midi_pc(neo.pc_bypass(pc))
+    neo.midi_cc(MOD_CC, PARK_VALUE)
@@ -0,0 +1,368 @@
+# Melatroid - Whammy 4 NEO - Step sequencer engine (loaded on demand by main.py)
+"""
+Random permutation of the Harmony presets, stepped at pot tempo (runner lane, LANE
+SCHEDULER in main.py) and mutated live by the pot shape. Pattern bank persisted in STEPSEQ_BANK_FILE.
+Imported when StepSeq is selected and dropped again when the mode is left.
+The playback order (stepseq_mode) stays in main.py.
+"""
+import time
+import micropython
+from micropython import const
+import __main__ as neo
+
+POOL = bytes(range(8, 16))    # Harmony preset PCs 8..15
+LEN = len(POOL)
+base = bytearray(POOL)        # stored random permutation (mutated in place)
+seq = bytearray(max(LEN, 2 * LEN - 2))  # derived playback seq
+seq_len = 0
+
+active = False
+i = 0
+last_pc = 15
+
+# --- Pattern bank (packed bytes, persisted to flash) ---
+# Long-hold (STEPSEQ_CAPTURE_HOLD_MS) => store the pattern that played BEFORE that press
+# Quick second tap (inside DOUBLE_TAP_WINDOW_MS) => recall next stored pattern
+# Recall is applied on the next step boundary (normal step PC only, no extra MIDI) and
+# plays unmutated until the next press; the captured pattern coming back is the feedback.
+# With a bank to recall from, a tap's re-roll waits for that window (like a Latch pending
+# tap), so the first tap of a recall never plays a random pattern.
+# The bank is written to flash between two steps with time to spare, or at stop.
+BANK_FILE = "stepseq_bank.bin"
+BANK_SIZE = 8
+BANK_SAVE_SLACK_US = const(80000)   # next lane deadline at least this far: flash write now
+
+REROLL_NONE = const(0)
+REROLL_HELD = const(1)        # press taken, re-roll waits for the release
+REROLL_WAIT = const(2)        # released, re-roll at reroll_due unless a second tap recalls
+
+bank = []                     # list of bytes(LEN)
+bank_i = -1                   # last recalled bank slot
+pending_bank = -1             # bank slot to load at next step boundary
+bank_playing = False          # recalled pattern running: no live mutation until the next press
+bank_dirty = False            # bank changed, not yet written to flash
+prev_base = bytearray(LEN)    # pattern before the last re-roll
+capture_fired = False
+reroll = REROLL_NONE
+reroll_due = 0                # ms (REROLL_WAIT)
+
+# --- Random source: 16-bit xorshift (7, 9, 8; period 65535) -> byte ring ---
+# service() tops the ring up between steps, so a step only reads bytes.
+# The byte stream depends on the seed only (not on when refills happen):
+# STEPSEQ_SEED != 0 in main.py replays the same patterns every time StepSeq is selected.
+POOL_SIZE = const(64)        # power of 2
+POOL_MASK = const(63)
+POOL_REFILL_AT = const(32)   # top up in idle passes once this many bytes are free
+
+pool = bytearray(POOL_SIZE)
+pool_r = 0                   # next byte to read
+pool_n = 0                   # bytes available
+rng_state = 1
+seed = 0                     # seed this load started from (0 = not seeded yet)
+
+
+@micropython.viper
+def _xs_fill(buf, start: int, count: int, x: int) -> int:
+    """
+    Write count xorshift bytes into the ring from start (wrapping), return the new state.
+    Values never leave 16 bits, so viper and plain Python give the same stream.
+    """
+    p = ptr8(buf)
+    k = start
+    for _ in range(count):
+        x ^= (x << 7) & 0xFFFF
+        x ^= x >> 9
+        x ^= (x << 8) & 0xFFFF
+        p[k] = x & 0xFF
+        k = (k + 1) & POOL_MASK
+    return x
+
+
+def seed_rng(s: int = 0):
+    """
+    Restart the stream from s (1..65535). s = 0 mixes ADC noise (pot LSBs) with the
+    time since boot.
+    """
+    global rng_state, seed, pool_r, pool_n
+    if s == 0:
+        s = time.ticks_us() & 0xFFFF
+        for _ in range(16):
+            s = (((s << 1) | (s >> 15)) & 0xFFFF) ^ (neo.pot.read_u16() & 0x0F)
+    s &= 0xFFFF
+    seed = s if s else 1
+    rng_state = seed
+    pool_r = 0
+    pool_n = 0
+    pool_refill()
+
+
+def pool_refill():
+    global rng_state, pool_n
+    free = POOL_SIZE - pool_n
+    if free:
+        rng_state = _xs_fill(pool, (pool_r + pool_n) & POOL_MASK, free, rng_state)
+        pool_n = POOL_SIZE
+
+
+def rand_below(n: int) -> int:
+    """
+    Unbiased 0..n-1 (n <= 256): mask to the next power of 2, reject values >= n.
+    """
+    global pool_r, pool_n
+    mask = n - 1
+    mask |= mask >> 1
+    mask |= mask >> 2
+    mask |= mask >> 4
+    while True:
+        if pool_n == 0:
+            pool_refill()       # idle refills did not keep up
+        v = pool[pool_r] & mask
+        pool_r = (pool_r + 1) & POOL_MASK
+        pool_n -= 1
+        if v < n:
+            return v
+
+
+def generate_base():
+    base[:] = POOL  # copy (in place)
+    for k in range(LEN - 1, 0, -1):
+        j = rand_below(k + 1)
+        base[k], base[j] = base[j], base[k]
+
+
+def build_seq():
+    """
+    Derive playback order into the preallocated seq (no allocation).
+    """
+    global seq_len
+    n = LEN
+    mode = neo.stepseq_mode
+    if mode == neo.STEPSEQ_MODE_UP:
+        for k in range(n):
+            seq[k] = base[k]
+        seq_len = n
+    elif mode == neo.STEPSEQ_MODE_DOWN:
+        for k in range(n):
+            seq[k] = base[n - 1 - k]
+        seq_len = n
+    else:
+        for k in range(n):
+            seq[k] = base[k]
+        if n >= 2:
+            for k in range(n - 2):
+                seq[n + k] = base[n - 2 - k]
+            seq_len = n + n - 2
+        else:
+            seq_len = n
+
+
+def bank_load():
+    global bank
+    loaded = []
+    try:
+        with open(BANK_FILE, "rb") as f:
+            data = f.read()
+    except OSError:
+        data = b""
+
+    pool_sorted = sorted(POOL)
+    for k in range(0, len(data) - LEN + 1, LEN):
+        pat = data[k:k + LEN]
+        if sorted(pat) == pool_sorted:   # only valid permutations
+            loaded.append(bytes(pat))
+    bank = loaded[-BANK_SIZE:]
+
+
+def bank_save():
+    try:
+        with open(BANK_FILE, "wb") as f:
+            for pat in bank:
+                f.write(pat)
+    except OSError:
+        pass
+
+
+def capture_prev():
+    """
+    Store the pattern that played before the current press (the re-roll
+    already replaced it) and bring it back on the next step boundary.
+    """
+    global bank_i, pending_bank, capture_fired, bank_dirty, reroll
+    capture_fired = True
+    reroll = REROLL_NONE          # a held-back re-roll: the hold stores instead
+    pat = bytes(prev_base)
+    if pat in bank:
+        idx = bank.index(pat)
+    else:
+        if len(bank) >= BANK_SIZE:
+            bank.pop(0)   # drop oldest
+        bank.append(pat)
+        idx = len(bank) - 1
+        bank_dirty = True
+
+    bank_i = idx
+    pending_bank = idx
+
+
+def recall_next():
+    global bank_i, pending_bank
+    if not bank:
+        return
+    bank_i = (bank_i + 1) % len(bank)
+    pending_bank = bank_i
+
+
+def mutate_live():
+    max_swaps = 6
+    swaps = (neo.pot_shape * max_swaps) >> 16  # 0..6
+    if swaps == 0:
+        return
+
+    n = LEN
+    for _ in range(swaps):
+        a = rand_below(n)
+        b = rand_below(n)
+        if a != b:
+            base[a], base[b] = base[b], base[a]
+
+
+def start(now_ms: int, pc: int):
+    """
+    Start StepSeq and ARM CC ON.
+    """
+    global active, i, last_pc, pending_bank, bank_playing, reroll
+    pending_bank = -1
+    bank_playing = False
+    reroll = REROLL_NONE
+    generate_base()
+    build_seq()
+    if seq_len == 0:
+        return
+
+    active = True
+    i = 0
+    last_pc = seq[i]
+
+    neo.midi_cc(0, 127)               # ALWAYS armed while StepSeq running
+    neo.midi_pc(last_pc)
+    neo.runner_lanes_start(last_pc)
+
+
+def service(now_ms: int):
+    global reroll, bank_dirty
+    if reroll == REROLL_WAIT and time.ticks_diff(now_ms, reroll_due) > 0:
+        reroll = REROLL_NONE
+        new_random_pattern(now_ms)
+    if pool_n <= POOL_SIZE - POOL_REFILL_AT:
+        pool_refill()
+    if (bank_dirty and neo.lane_n
+            and time.ticks_diff(neo.lane_due[neo.lane_heap[0]], time.ticks_us()) >= BANK_SAVE_SLACK_US):
+        bank_dirty = False
+        bank_save()
+
+
+def step():
+    global i, last_pc, pending_bank, bank_playing
+    if pending_bank >= 0:
+        # recalled bank pattern takes over exactly on this step boundary
+        base[:] = bank[pending_bank]
+        pending_bank = -1
+        bank_playing = True
+        build_seq()
+        i = 0
+    else:
+        if not bank_playing:
+            mutate_live()
+        build_seq()
+        i += 1
+        if i >= seq_len:
+            i = 0
+
+    last_pc = seq[i]
+    neo.lane_set_pc(last_pc)
+
+
+def stop(pc: int):
+    """
+    Stop StepSeq and DISARM (CC OFF) when leaving the mode.
+    """
+    global active, bank_dirty, reroll
+    if bank_dirty:
+        bank_dirty = False
+        bank_save()
+    reroll = REROLL_NONE
+    if not active:
+        return
+    active = False
+    neo.runner_lanes_stop()
+    neo.midi_cc(0, 0)
+    neo.midi_pc(neo.pc_bypass(last_pc))
+
+
+def new_random_pattern(now_ms: int):
+    """
+    While StepSeq is active and CC is already ON:
+    create a NEW random base permutation, rebuild sequence, and restart immediately
+    without toggling CC.
+    """
+    global i, last_pc, pending_bank, bank_playing
+    if not active:
+        # safety: if somehow not active, start it
+        start(now_ms, 0)
+        return
+
+    pending_bank = -1
+    bank_playing = False
+    generate_base()
+    build_seq()
+    if seq_len == 0:
+        return
+
+    i = 0
+    last_pc = seq[i]
+    neo.midi_pc(last_pc)  # immediate new pattern start
+    neo.runner_lanes_start(last_pc)
+
+
+def on_press(now_ms: int):
+    """
+    Footswitch press while in StepSeq:
+    - quick second tap (inside DOUBLE_TAP_WINDOW_MS) => recall next bank pattern
+    - otherwise => new random pattern (the previous one is kept for capture); with a
+      bank it waits for the release and the double-tap window (see on_release)
+    """
+    global capture_fired, reroll
+    capture_fired = False
+
+    last = neo.last_release_ms
+    if (active and bank and last != 0
+            and time.ticks_diff(now_ms, last) <= neo.DOUBLE_TAP_WINDOW_MS):
+        reroll = REROLL_NONE      # the first tap's re-roll never happened
+        recall_next()
+        return
+
+    prev_base[:] = base
+    if active and bank:
+        reroll = REROLL_HELD
+        return
+    new_random_pattern(now_ms)
+
+
+def on_release(now_ms: int, tap: bool):
+    """
+    Footswitch release while in StepSeq: a held-back re-roll waits out the double-tap
+    window after a tap, a longer press re-rolls now (no recall can follow it).
+    """
+    global reroll, reroll_due
+    if reroll != REROLL_HELD:
+        return
+    if tap:
+        reroll = REROLL_WAIT
+        reroll_due = time.ticks_add(now_ms, neo.DOUBLE_TAP_WINDOW_MS)
+    else:
+        reroll = REROLL_NONE
+        new_random_pattern(now_ms)
+
+
+bank_load()
+seed_rng(neo.STEPSEQ_SEED)
@@ -0,0 +1,143 @@
+# Melatroid - Whammy 4 NEO - access mode (imported by main.py when ACCESS_MODE_ENABLED)
+"""
+Live preset editing on GPIO14 instead of the settings layer.
+ACCESS_SWITCH "button": a short press switches preset A <-> B, held ACCESS_HOLD_MS it is
+access until released. "level": access while the switch is closed.
+In access (runtime_layer LAYER_ACCESS, the Whammy engaged) the footswitch edits a slot:
+a press previews the next preset, holding it scrolls every ACCESS_SCROLL_MS, a double
+click moves to the next edit slot. ACCESS_COMMIT_MS after the last preview the preset
+is stored into the slot, confirmed with ACCESS_CONFIRM_TOGGLES bypass/active pairs, and
+becomes the active slot. Leaving access re-applies the mode's sound.
+"""
+import time
+import __main__ as neo
+
+active = False          # in access
+edit_slot = 0
+preview = 0             # PRESETS index on the Whammy
+pending = False         # preview not stored yet
+changed_at = 0          # last preview (commit timer)
+step_at = 0             # last preview step (scroll timer)
+pressed_at = 0          # last footswitch press (double click), 0 = none
+held = False            # footswitch down since a press in access
+down_at = 0             # GPIO14 press ("button")
+armed = False           # GPIO14 down: short press or access still to be decided
+
+
+def edge(closed: bool, now_ms: int):
+    """Debounced GPIO14 edge (programming done)."""
+    global down_at, armed
+    if neo.ACCESS_SWITCH == "level":
+        if closed:
+            enter()
+        else:
+            leave()
+        return
+    if closed:
+        down_at = now_ms
+        armed = True
+        return
+    if active:
+        leave()
+    elif armed:
+        slot = 1 if neo.active_slot == 0 else 0
+        if neo.stored_preset_index[slot] >= 0:
+            neo.switch_with_mute(slot, neo.mode)
+    armed = False
+
+
+def foot(pressed: bool, now_ms: int):
+    """Debounced footswitch edge while in access."""
+    global pressed_at, held
+    held = pressed
+    if not pressed:
+        return
+    if 0 < time.ticks_diff(now_ms, pressed_at) <= neo.ACCESS_DOUBLE_CLICK_MS:
+        pressed_at = 0
+        show_slot((edit_slot + 1) % neo.ACCESS_SLOTS)
+        return
+    pressed_at = now_ms
+    step(now_ms)
+
+
+def service(now_ms: int):
+    """Every main loop pass (programming done): button hold, scrolling, commit."""
+    if armed and (not active) and time.ticks_diff(now_ms, down_at) >= neo.ACCESS_HOLD_MS:
+        enter()
+    if not active:
+        return
+    if held and time.ticks_diff(now_ms, step_at) >= neo.ACCESS_SCROLL_MS:
+        step(now_ms)
+    if pending and time.ticks_diff(now_ms, changed_at) >= neo.ACCESS_COMMIT_MS:
+        commit()
+
+
+def enter():
+    """Stop what plays, engage the Whammy on the active slot's preset."""
+    global active, pressed_at, held
+    if active:
+        return
+    active = True
+    neo.runtime_layer = neo.LAYER_ACCESS
+    neo.pending_single_tap = False
+    neo.switch_apply_pending = False    # leave() applies the new slot/mode
+    neo.engine_stop()
+    if neo.shutter_active:
+        neo.shutter_stop(neo.current_active_pc())
+        neo.shutter_active = False
+    if neo.RELAY_GATE_ENABLED:
+        neo.relay.park(neo.relay.WET)
+    pressed_at = 0
+    held = False
+    neo.midi_cc(0, 127)
+    show_slot(neo.active_slot)
+
+
+def leave():
+    """Back to performance; an uncommitted preview is dropped."""
+    global active, pending
+    if not active:
+        return
+    active = False
+    pending = False
+    neo.runtime_layer = neo.LAYER_PRESET
+    if neo.RELAY_GATE_ENABLED:
+        neo.relay.park(neo.relay.DRY)
+    neo.apply_current_sound()
+
+
+def show_slot(slot: int):
+    """Edit `slot` from its stored preset (the first one while unset)."""
+    global edit_slot, preview, pending
+    edit_slot = slot
+    idx = neo.stored_preset_index[slot]
+    preview = idx if idx >= 0 else 0
+    pending = False
+    neo.midi_pc(neo.PRESETS[preview][1])
+
+
+def step(now_ms: int):
+    """Preview the next preset."""
+    global preview, pending, changed_at, step_at
+    preview = (preview + 1) % len(neo.PRESETS)
+    neo.midi_pc(neo.PRESETS[preview][1])
+    pending = True
+    changed_at = now_ms
+    step_at = now_ms
+
+
+def commit():
+    """Store the preview into the edit slot and play it (ACCESS_NEXT_SLOT: edit the next)."""
+    global pending, pressed_at
+    pending = False
+    pressed_at = 0
+    neo.stored_preset_index[edit_slot] = preview
+    neo.active_slot = edit_slot
+    pc = neo.PRESETS[preview][1]
+    for _ in range(neo.ACCESS_CONFIRM_TOGGLES):
+        neo.midi_pc(neo.pc_bypass(pc))
+        neo.wait_ms(neo.ACCESS_CONFIRM_MS)
+        neo.midi_pc(pc)
+        neo.wait_ms(neo.ACCESS_CONFIRM_MS)
+    if neo.ACCESS_NEXT_SLOT:
+        show_slot((edit_slot + 1) % neo.ACCESS_SLOTS)
@@ -0,0 +1,112 @@
+# Melatroid - Whammy 4 NEO - relay gate (imported by main.py when RELAY_GATE_ENABLED)
+"""
+Shutter on the A/B relays. One PIO state machine drives A and B as a 2-pin SET group
+(B = RELAY_PIN_A + 1): 1 PIO cycle = 1 us, so every half period and every
+break-before-make gap is exact, whatever the main loop is doing. The CPU only hands
+over a new half period. Outside the gate the relays rest on DRY (WET while access mode
+previews presets, see park()). The importing __main__ defines RELAY_PIN_A, RELAY_B_INVERT,
+RELAY_BBM_US, RELAY_PIO_SM and clamp().
+"""
+from machine import Pin
+import time
+import rp2
+import __main__ as neo
+
+DRY = 0
+WET = 1
+PIO_FREQ = 1000000                              # 1 cycle = 1 us
+BBM_US = neo.clamp(neo.RELAY_BBM_US, 1, 32)     # one instruction's delay field
+
+
+def b_level(b_v01: int) -> int:
+    """B pin level for the raw B state (RELAY_B_INVERT applied)."""
+    return (0 if b_v01 else 1) if neo.RELAY_B_INVERT else b_v01
+
+
+BITS_DRY = DRY | (b_level(1) << 1)
+BITS_GAP = DRY | (b_level(0) << 1)              # A off, B off: break before make
+BITS_WET = WET | (b_level(0) << 1)
+PIO_OVERHEAD = BBM_US + 5                       # cycles per half besides the X countdown
+
+a = Pin(neo.RELAY_PIN_A, Pin.OUT, value=DRY)
+b = Pin(neo.RELAY_PIN_A + 1, Pin.OUT, value=b_level(1))
+
+
+@rp2.asm_pio(set_init=(rp2.PIO.OUT_HIGH if BITS_DRY & 1 else rp2.PIO.OUT_LOW,
+                       rp2.PIO.OUT_HIGH if BITS_DRY & 2 else rp2.PIO.OUT_LOW))
+def gate_pio():
+    # X = half period - PIO_OVERHEAD; a newly pushed value starts with the next WET half
+    wrap_target()
+    pull(noblock)                           # empty FIFO: OSR = X (period kept)
+    mov(x, osr)
+    set(pins, BITS_GAP)         [BBM_US - 1]
+    set(pins, BITS_WET)
+    mov(y, x)                   [2]         # same length as pull + mov of the DRY half
+    label("wet")
+    jmp(y_dec, "wet")
+    set(pins, BITS_GAP)         [BBM_US - 1]
+    set(pins, BITS_DRY)
+    mov(y, x)
+    label("dry")
+    jmp(y_dec, "dry")
+    wrap()
+
+
+sm = rp2.StateMachine(neo.RELAY_PIO_SM)        # (re)configured by start()
+running = False
+x_now = 0
+
+
+def start(half_ms: int):
+    """Start chopping from DRY (first half = WET)."""
+    global running, x_now
+    sm.init(gate_pio, freq=PIO_FREQ, set_base=a)
+    x_now = half_ms * 1000 - PIO_OVERHEAD
+    sm.put(x_now)
+    sm.active(1)
+    running = True
+
+
+def half(half_ms: int):
+    """New half period for the running gate (retried while the TX FIFO is busy)."""
+    global x_now
+    x = half_ms * 1000 - PIO_OVERHEAD
+    if running and x != x_now and sm.tx_fifo() == 0:
+        sm.put(x)
+        x_now = x
+
+
+def stop(keep_wet: bool = False) -> int:
+    """
+    Stop the PIO and hand A/B back to the CPU without a glitch, then settle on DRY
+    (keep_wet: stay WET if stopped in a WET half). Returns the A state it settled in.
+    """
+    global running
+    if not running:
+        return a.value()
+    sm.active(0)
+    running = False
+    a_val = a.value()
+    a.init(Pin.OUT, value=a_val)
+    b.init(Pin.OUT, value=b.value())
+    if a_val == WET:
+        if keep_wet:
+            return WET
+        a(DRY)
+        time.sleep_us(BBM_US)
+    b(b_level(1))       # also finishes a stop inside a gap (A already off)
+    return DRY
+
+
+def park(level: int):
+    """Settle the stopped gate on DRY or WET (break-before-make like the PIO)."""
+    if running or a.value() == level:
+        return
+    if level == WET:
+        b(b_level(0))
+        time.sleep_us(BBM_US)
+        a(WET)
+    else:
+        a(DRY)
+        time.sleep_us(BBM_US)
+        b(b_level(1))
@@ -1,17 +1,51 @@
-# Melatroid - Whammy 4 NEO - Version 2.22
+# Melatroid - Whammy 4 NEO - Version: FW_VERSION below
 
-from machine import UART, Pin, ADC
+from machine import UART, Pin, ADC, SPI, I2C, mem32
+from micropython import const
 import time
-import urandom
+import gc
+import select
+import sys
+from array import array
+
+boot_t0_us = time.ticks_us()   # boot time / heap measured up to the main loop (SER_CMD_MEMORY)
+
+FW_VERSION = b"2.23"           # the one place for the version (Versions.txt, HELLO reply)
 
 # =========================================================
 # MIDI CONFIG
 # =========================================================
 MIDI_UART_ID = 0
 MIDI_TX_PIN = 0
+MIDI_RX_PIN = 1
 MIDI_BAUD = 31250
 TARGET_CH = 3   # 0-based => CH04
 
+# Build flags: const(False) leaves the feature's code out of the compiled firmware
+# (the `if FLAG:` blocks are never compiled), not just unused at run time.
+# Flash + RAM per build profile: python Host/neo_footprint.py
+
+# --- MIDI IN (GPIO1) + THRU/merge ---
+MIDI_IN_ENABLED = const(True)
+MIDI_THRU = True          # forward everything received, merged with our own output
+MIDI_IN_RXBUF = 512       # UART RX ring (bytes) - covers the blocking boot/blink waits
+MIDI_IN_SYSEX_MAX = 64    # longer SysEx is dropped (counted in midi_in_stats())
+
+# Remote control: CC/PC received on REMOTE_CH set mode/slot/engine options (see REMOTE)
+# (needs MIDI_IN_ENABLED)
+REMOTE_ENABLED = const(True)
+REMOTE_CH = 15            # 0-based => CH16
+
+# USB serial control/telemetry protocol (framed binary, see SERIAL PROTOCOL)
+SERIAL_PROTO_ENABLED = const(True)
+
+# Always-on RAM trace of MIDI out/in, footswitch edges and mode changes (see TRACE)
+TRACE_ENABLED = const(True)
+TRACE_LEN = 512           # events kept (8 bytes each)
+
+# Harmony / StepSeq / Modulation modes (see ENGINES); off: eng_*.py need not be uploaded
+ENGINES_ENABLED = const(True)
+
 # --- channel-blink (no CC0, no PC/BYPASS) ---
 BLINK_NOTE = 60       # C-1
 BLINK_VEL = 100
@@ -24,20 +58,71 @@ BLINK_TIMES = 3
 # =========================================================
 PIN_FOOTSW = 4
 PIN_LAYER_SWITCH = 14
-DEBOUNCE_MS = 10
+DEBOUNCE_MS = 10         # 1..2: quantised to one sample per main loop pass (see debounce)
 
 # Tap / Double-Tap
 TAP_MAX_MS = 900
 LAYER2_TAP_MAX_MS = 900
 DOUBLE_TAP_WINDOW_MS = 320
+# Latch: apply the single-tap toggle on release instead of after DOUBLE_TAP_WINDOW_MS;
+# a second tap inside the window undoes it as part of the preset switch
+# (False = wait out the window, no short on/off before a switch)
+LATCH_SPECULATIVE_TAP = True
 
 # Momentary/Holding trigger
 MOMENTARY_HOLD_MS = 100
 
 # re-enter preset programming from Layer 2 via long-hold
 LAYER2_REPROGRAM_HOLD_MS = 2000
-# Prevent effect "blip" during preset switching:
+# Prevent effect "blip" during switching: the NEW preset's bypass PC goes out at the
+# switch (the Whammy loads it while bypassed), the effect engages after the mute.
+# Mode changes mute SWITCH_MUTE_MS, preset switches the time of the new preset's family
+# (starting values: tune on the pedal, read the gaps with Host/neo_serial.py switches)
 SWITCH_MUTE_MS = 250
+SWITCH_MUTE_DETUNE_MS = 100
+SWITCH_MUTE_WHAMMY_MS = 100
+SWITCH_MUTE_HARMONY_MS = 150
+
+# Expansion switches (see EXPANSION SWITCHES), direct slot/mode/preset actions
+EXPANSION_ENABLED = const(True)
+EXP_BUS = None            # None = off, "165" = 74HC165 chain (SPI1), "pcf8574" / "mcp23017" (I2C1)
+EXP_COUNT = 8             # switches on the bus (8 per 74HC165 / PCF8574, 16 per MCP23017)
+EXP_165_SCK = 10          # SPI1 SCK -> CLK of every 74HC165
+EXP_165_MISO = 12         # SPI1 RX  <- QH of the first 74HC165
+EXP_165_LOAD = 9          # SH/LD of every 74HC165 (low pulse = load)
+EXP_165_BAUD = 1000000
+EXP_I2C_SDA = 6
+EXP_I2C_SCL = 7
+EXP_I2C_ADDR = 0x20
+EXP_I2C_FREQ = 400000
+
+# Relay gate (see RELAY GATE, needs feat_relay.py): Shutter chops the audio with the A/B
+# relays, timed by a PIO state machine, while the Whammy stays engaged (no PC toggling)
+RELAY_GATE_ENABLED = const(False)
+RELAY_PIN_A = 2           # A = wet relay, B = RELAY_PIN_A + 1 = bypass relay
+RELAY_B_INVERT = True
+RELAY_BBM_US = 20         # break-before-make gap (1..32)
+RELAY_PIO_SM = 0
+
+# Access mode (see ACCESS MODE, needs feat_access.py): GPIO14 edits the preset slots live
+# from the footswitch instead of toggling the settings layer (mode: boot programming,
+# remote or expansion switches)
+ACCESS_MODE_ENABLED = const(False)
+ACCESS_SWITCH = "button"  # "button": short press = preset A <-> B, held = access; "level": closed = access
+ACCESS_HOLD_MS = 450      # button held this long => access until released
+ACCESS_SCROLL_MS = 350    # footswitch held in access: next preview every ...
+ACCESS_DOUBLE_CLICK_MS = 300  # press -> press: next edit slot
+ACCESS_COMMIT_MS = 2000   # no new preview for this long => stored into the edit slot
+ACCESS_CONFIRM_TOGGLES = 3    # bypass/active PC pairs confirming a stored preset
+ACCESS_CONFIRM_MS = 120
+ACCESS_NEXT_SLOT = False  # after storing, edit the next slot (A then B in one go)
+ACCESS_SLOTS = 2          # 4: preset slots C/D too (double tap A/B <-> D, expansion slot 2/3)
+
+# Latency probe (see LATENCY PROBE): MIDI TX (GPIO0) wired back to LATENCY_PROBE_PIN;
+# footswitch press -> resulting MIDI byte per mode, read with Host/neo_serial.py latency
+# (needs SERIAL_PROTO_ENABLED)
+LATENCY_PROBE_ENABLED = const(False)
+LATENCY_PROBE_PIN = 5
 
 sw = Pin(PIN_FOOTSW, Pin.IN, Pin.PULL_UP)
 layer_sw = Pin(PIN_LAYER_SWITCH, Pin.IN, Pin.PULL_UP)
@@ -55,10 +140,25 @@ HOLD_MAX_MS = 10000
 # (this is per PHASE: ON->OFF or OFF->ON)
 SHUTTER_MIN_MS = 50
 SHUTTER_MAX_MS = 500
+# Hold-to-run: held longer than SHUTTER_HOLD_MS the shutter chops until release, a double
+# tap of shorter presses switches preset A/B (False: each press starts / stops it)
+SHUTTER_HOLD_TO_RUN = False
+SHUTTER_HOLD_MS = 170
+# Gate per shutter phase (1 = effect, 0 = bypass), looped; starts on the first entry (ON).
+# e.g. (1, 1, 0, 1, 0, 0) for a rhythmic chop; an empty pattern falls back to (1, 0)
+SHUTTER_PATTERN = (1, 0)
 
 # Runner (Harmony/StepSeq) step time range (ms)
 HARMONY_STEP_MIN_MS = 50
 HARMONY_STEP_MAX_MS = 500
+# Shutter chop over a running Harmony/StepSeq: chop phase in % of the runner step
+# (0 = off, e.g. 50 = two chop phases per step, 37 = drifting against the steps);
+# a chop phase is never shorter than SHUTTER_MIN_MS
+RUNNER_CHOP_PERCENT = 0
+
+# Pedal modulation (LFO/ramp) full-cycle period range (ms)
+MOD_PERIOD_MIN_MS = 200
+MOD_PERIOD_MAX_MS = 8000
 
 POT_READ_INTERVAL_MS = 40
 POT_SHAPE_READ_INTERVAL_MS = 60
@@ -75,18 +175,179 @@ def clamp(v, lo, hi):
     return lo if v < lo else hi if v > hi else v
 
 
-def map_u16_expo(raw_u16: int, lo: int, hi: int, k_percent: int = 450) -> int:
+# =========================================================
+# POT CALIBRATION (pot_cal.json: Hardware_Test_Midi_Access.py TEST_MODE "pot", or the
+# end-stop gesture: footswitch held at power-up)
+# =========================================================
+# Breakpoints raw reading -> knob position over the live travel: both end stops are
+# reachable on a worn pot and the taper is straightened. Readings that move less than
+# hyst_u16 (the ADC noise peak-to-peak) are held, the end stops always get through.
+# No file: raw readings, no hysteresis.
+# The breakpoints are folded into a table at load (POT_LUT_LEN entries, 512 u16 apart,
+# linear in between), so a read costs one lookup however many breakpoints there are.
+POT_CAL_FILE = "pot_cal.json"
+POT_LUT_SHIFT = const(9)
+POT_LUT_MASK = const(511)
+POT_LUT_LEN = const(129)                 # (65536 >> POT_LUT_SHIFT) + 1
+POT_CAL_END_MARGIN_U16 = 512             # gesture: end stops moved inwards (ADC noise)
+POT_CAL_MIN_SPAN_U16 = 16384             # gesture: shorter sweep is not stored
+POT_CAL_TIMEOUT_MS = 30000               # gesture: switch still down -> give up
+POT_CAL_CENTRE_PERCENT = 3               # gesture: release this close to mid-sweep = centre
+
+pot_cal_raw = None        # array("H") ascending raw breakpoints (None = uncalibrated)
+pot_cal_pos = None        # array("H") knob position per breakpoint
+pot_cal_lut = None        # array("H") position at raw i << POT_LUT_SHIFT
+pot_hyst_u16 = 0
+_pot_held_u16 = -1
+
+
+def lut_lookup(lut, x: int) -> int:
+    """Value at x (0..65535) of a POT_LUT_LEN table, linear between the entries."""
+    i = x >> POT_LUT_SHIFT
+    a = lut[i]
+    return a + (((lut[i + 1] - a) * (x & POT_LUT_MASK)) >> POT_LUT_SHIFT)
+
+
+def pot_cal_valid(raw, pos) -> bool:
+    if len(raw) < 2 or len(raw) != len(pos):
+        return False
+    for i in range(len(raw)):
+        if not (0 <= raw[i] <= 65535 and 0 <= pos[i] <= 65535):
+            return False
+        if i and raw[i] <= raw[i - 1]:
+            return False
+    return True
+
+
+def pot_cal_build(raw, pos):
+    """
+    Table from the breakpoints. The end zones reach to the next table entry, so every
+    reading at or beyond an end breakpoint gives exactly its position.
+    """
+    global pot_cal_raw, pot_cal_pos, pot_cal_lut
+    lut = array("H", bytes(2 * POT_LUT_LEN))
+    n = len(raw)
+    j = 1
+    for i in range(POT_LUT_LEN):
+        x = i << POT_LUT_SHIFT
+        if x - POT_LUT_MASK <= raw[0]:
+            v = pos[0]
+        elif x + POT_LUT_MASK >= raw[n - 1]:
+            v = pos[n - 1]
+        else:
+            while x > raw[j]:
+                j += 1
+            p0 = pos[j - 1]
+            v = p0 + (x - raw[j - 1]) * (pos[j] - p0) // (raw[j] - raw[j - 1])
+        lut[i] = v
+    pot_cal_raw = array("H", raw)
+    pot_cal_pos = array("H", pos)
+    pot_cal_lut = lut
+
+
+def pot_cal_load():
+    global pot_hyst_u16
+    try:
+        import json
+        with open(POT_CAL_FILE) as f:
+            cal = json.load(f)
+        raw = cal["raw"]
+        pos = cal["pos"]
+        hyst = int(cal.get("hyst_u16", 0))
+        if not pot_cal_valid(raw, pos):
+            return
+    except (OSError, ValueError, KeyError, TypeError):
+        return
+    pot_cal_build(raw, pos)
+    pot_hyst_u16 = clamp(hyst, 0, 8192)
+
+
+def pot_cal_save(raw, pos) -> bool:
+    try:
+        import json
+        with open(POT_CAL_FILE, "w") as f:
+            json.dump({"version": 1, "raw": list(raw), "pos": list(pos),
+                       "hyst_u16": pot_hyst_u16}, f)
+    except OSError:
+        return False
+    pot_cal_build(raw, pos)
+    return True
+
+
+def pot_cal_gesture():
     """
-    Exponential-ish curve without floats.
-    raw_u16: 0..65535
-    k_percent: 100..800 typical
-      higher => more resolution at short times (more "log-like")
+    Footswitch held at power-up: turn the pot to both end stops, release the switch to
+    store. Released with the knob on its centre mark (within POT_CAL_CENTRE_PERCENT of
+    the sweep from mid-sweep), the centre is stored as well; otherwise the inner
+    breakpoints of an existing table are moved along with the new end stops. A blink pair starts it, BLINK_TIMES blinks
+    confirm, one long blink = nothing stored (sweep too short, timeout, flash error).
     """
-    x = raw_u16  # 0..65535
-    y_quad = (x * x) >> 16        # 0..65535 (quadratic curve)
-    y = (y_quad * k_percent + x * (1000 - k_percent)) // 1000
+    blink_selected_channel(times=2)
+    lo = 65535
+    hi = 0
+    raw = 0
+    t0 = time.ticks_ms()
+    up_since = -1
+    while True:
+        now = time.ticks_ms()
+        raw = pot.read_u16()
+        if raw < lo:
+            lo = raw
+        if raw > hi:
+            hi = raw
+        if sw.value() == 0:
+            up_since = -1
+        elif up_since < 0:
+            up_since = now
+        elif time.ticks_diff(now, up_since) >= DEBOUNCE_MS:
+            break
+        if time.ticks_diff(now, t0) > POT_CAL_TIMEOUT_MS:
+            blink_selected_channel(times=1, on_ms=600)
+            return
+        wait_ms(POT_READ_INTERVAL_MS)
+
+    lo += POT_CAL_END_MARGIN_U16
+    hi -= POT_CAL_END_MARGIN_U16
     span = hi - lo
-    return lo + (y * span) // 65535
+    if span < POT_CAL_MIN_SPAN_U16:
+        blink_selected_channel(times=1, on_ms=600)
+        return
+    old_r = pot_cal_raw
+    flip = pot_cal_pos is not None and pot_cal_pos[0] > pot_cal_pos[len(pot_cal_pos) - 1]
+    if abs(raw - (lo + hi) // 2) <= span * POT_CAL_CENTRE_PERCENT // 100:
+        cal_r = [lo, raw, hi]
+        cal_p = [0, 32768, 65535]
+    elif old_r is not None and len(old_r) > 2:
+        r0 = old_r[0]
+        d = old_r[len(old_r) - 1] - r0
+        cal_r = [lo + (r - r0) * span // d for r in old_r]
+        cal_p = list(pot_cal_pos)
+        flip = False                      # positions kept as they are
+    else:
+        cal_r = [lo, hi]
+        cal_p = [0, 65535]
+    if flip:
+        cal_p = [65535 - p for p in cal_p]
+    if pot_cal_valid(cal_r, cal_p) and pot_cal_save(cal_r, cal_p):
+        blink_selected_channel()
+    else:
+        blink_selected_channel(times=1, on_ms=600)
+
+
+def pot_read_u16() -> int:
+    """Pot position 0..65535 through the calibration table (raw reading without one)."""
+    global _pot_held_u16
+    raw = pot.read_u16()
+    if pot_cal_lut is not None:
+        raw = lut_lookup(pot_cal_lut, raw)
+    if pot_hyst_u16:
+        if 0 < raw < 65535 and _pot_held_u16 >= 0 and abs(raw - _pot_held_u16) < pot_hyst_u16:
+            return _pot_held_u16
+        _pot_held_u16 = raw
+    return raw
+
+
+pot_cal_load()
 
 
 # Forward declaration for mode constants (used in update_pot_time_ms)
@@ -97,9 +358,45 @@ MODE_SHUTTER = 3
 MODE_HARMONY = 4
 MODE_STEPSEQ = 5
 MODE_LEGACY = 6
+MODE_MODULATION = 7
 mode = MODE_LATCH
 
 
+# Pot position -> time curve of the current mode, precomputed like the calibration table
+# (ms << 8 per entry); rebuilt when the mode or a time range changes.
+pot_curve_lut = array("I", bytes(4 * POT_LUT_LEN))
+pot_curve_mode = -1       # mode the table holds (-1 = rebuild)
+pot_curve_lo = 1000
+pot_curve_hi = 1000
+
+
+def pot_curve_build(m: int):
+    """
+    Exponential-ish curve without floats, per mode: y = (x^2 * k + x * (1000 - k)) / 1000,
+    higher k => more resolution at short times (more "log-like").
+    """
+    global pot_curve_mode, pot_curve_lo, pot_curve_hi
+    if m == MODE_SHUTTER:
+        lo, hi, k = SHUTTER_MIN_MS, SHUTTER_MAX_MS, 550
+    elif m == MODE_HOLDING or m == MODE_LEGACY:
+        lo, hi, k = HOLD_MIN_MS, HOLD_MAX_MS, 350
+    elif m == MODE_HARMONY or m == MODE_STEPSEQ:
+        lo, hi, k = HARMONY_STEP_MIN_MS, HARMONY_STEP_MAX_MS, 600
+    elif m == MODE_MODULATION:
+        lo, hi, k = MOD_PERIOD_MIN_MS, MOD_PERIOD_MAX_MS, 500
+    else:
+        lo, hi, k = 1000, 1000, 0
+    span = hi - lo
+    lut = pot_curve_lut
+    for i in range(POT_LUT_LEN):
+        x = i << POT_LUT_SHIFT
+        y = (((x * x) >> 16) * k + x * (1000 - k)) // 1000
+        lut[i] = (lo << 8) + ((y * span) << 8) // 65535
+    pot_curve_mode = m
+    pot_curve_lo = lo
+    pot_curve_hi = hi
+
+
 def update_pot_time_ms(now_ms: int):
     """
     - MODE_HOLDING => 500..10000ms (expo-ish)
@@ -107,6 +404,7 @@ def update_pot_time_ms(now_ms: int):
     - MODE_SHUTTER => 50..500ms    (expo-ish, more resolution at fast end)
     - MODE_HARMONY => 50..500ms    (expo-ish, more resolution at fast end)
     - MODE_STEPSEQ => 50..500ms    (expo-ish, more resolution at fast end)
+    - MODE_MODULATION => 200..8000ms full LFO cycle (expo-ish)
     - others: keep 1000ms
     """
     global pot_time_ms, _last_pot_read_ms, mode
@@ -114,27 +412,62 @@ def update_pot_time_ms(now_ms: int):
         return
     _last_pot_read_ms = now_ms
 
-    raw = pot.read_u16()  # 0..65535
+    raw = pot_read_u16()  # 0..65535
+    if REMOTE_ENABLED:
+        raw = remote_pot_raw(raw)         # remote tempo until the pot moves
+    old_ms = pot_time_ms
 
-    if mode == MODE_SHUTTER:
-        pot_time_ms = map_u16_expo(raw, SHUTTER_MIN_MS, SHUTTER_MAX_MS, k_percent=550)
-        pot_time_ms = clamp(pot_time_ms, SHUTTER_MIN_MS, SHUTTER_MAX_MS)
+    if mode != pot_curve_mode:
+        pot_curve_build(mode)
+    pot_time_ms = clamp(lut_lookup(pot_curve_lut, raw) >> 8, pot_curve_lo, pot_curve_hi)
 
-    elif mode == MODE_HOLDING:
-        pot_time_ms = map_u16_expo(raw, HOLD_MIN_MS, HOLD_MAX_MS, k_percent=350)
-        pot_time_ms = clamp(pot_time_ms, HOLD_MIN_MS, HOLD_MAX_MS)
+    if pot_time_ms != old_ms:
+        rescale_engine_deadlines(now_ms, old_ms, pot_time_ms)
 
-    elif mode == MODE_LEGACY:
-        # NEW: Legacy uses the same pot range as Holding for CC OFF delay
-        pot_time_ms = map_u16_expo(raw, HOLD_MIN_MS, HOLD_MAX_MS, k_percent=350)
-        pot_time_ms = clamp(pot_time_ms, HOLD_MIN_MS, HOLD_MAX_MS)
 
-    elif mode == MODE_HARMONY or mode == MODE_STEPSEQ:
-        pot_time_ms = map_u16_expo(raw, HARMONY_STEP_MIN_MS, HARMONY_STEP_MAX_MS, k_percent=600)
-        pot_time_ms = clamp(pot_time_ms, HARMONY_STEP_MIN_MS, HARMONY_STEP_MAX_MS)
+# =========================================================
+# STEP SCHEDULER (drift-free)
+# =========================================================
+# Engines advance from their PREVIOUS deadline (not from "now"), so loop lateness
+# never accumulates into tempo drift. Whole periods missed by a late loop are
+# skipped (no burst of catch-up steps); after STEP_CATCHUP_MAX missed periods
+# the schedule re-anchors to "now".
+# Deadlines are ticks (ticks_us for the lanes, ticks_ms elsewhere; one unit per call):
+# ticks_add / ticks_diff only, so the wrap (2**30 ticks) never shows.
+STEP_CATCHUP_MAX = 4
+
+
+def sched_next(deadline: int, now: int, period: int) -> int:
+    deadline = time.ticks_add(deadline, period)
+    late = time.ticks_diff(now, deadline)
+    if late >= 0:
+        missed = late // period + 1
+        if missed > STEP_CATCHUP_MAX:
+            return time.ticks_add(now, period)
+        deadline = time.ticks_add(deadline, missed * period)
+    return deadline
+
+
+def sched_rescale(deadline: int, now: int, old_ms: int, new_ms: int) -> int:
+    """
+    Pot moved: keep the current phase, scale only the REMAINING part of the step.
+    Split so a remaining time in us times new_ms stays a small int.
+    """
+    remaining = time.ticks_diff(deadline, now)
+    if remaining <= 0 or old_ms <= 0:
+        return deadline
+    q = remaining // old_ms
+    return time.ticks_add(now, q * new_ms + (remaining - q * old_ms) * new_ms // old_ms)
+
 
-    else:
-        pot_time_ms = 1000
+def rescale_engine_deadlines(now_ms: int, old_ms: int, new_ms: int):
+    # scaling the remaining times keeps the deadline order: the lane heap stays valid
+    now_us = time.ticks_us()
+    for k in range(lane_n):
+        lane = lane_heap[k]
+        lane_due[lane] = sched_rescale(lane_due[lane], now_us, old_ms, new_ms)
+    if engine is not None and engine_mode == MODE_MODULATION:
+        engine.rescale(now_ms, old_ms, new_ms)
 
 
 def update_pot_shape(now_ms: int):
@@ -145,7 +478,188 @@ def update_pot_shape(now_ms: int):
     if time.ticks_diff(now_ms, _last_pot_shape_read_ms) < POT_SHAPE_READ_INTERVAL_MS:
         return
     _last_pot_shape_read_ms = now_ms
-    pot_shape = pot.read_u16()  # 0..65535
+    pot_shape = pot_read_u16()  # 0..65535
+
+
+# =========================================================
+# LANE SCHEDULER (Shutter chop, runner step - also both at once)
+# =========================================================
+# Every timed engine is a lane with its own deadline (ticks_us), period (% of
+# pot_time_ms) and pattern. A min-heap of lane numbers ordered by deadline: the next due lane is the
+# root, a step re-sorts it in O(log lanes); fixed arrays, no allocation in a pass.
+# The lanes only change the output state (lane_pc, lane_gate); a pass sends ONE program
+# change for what all lanes due in it decided: gate on -> lane_pc, gate off -> its bypass.
+# A runner step behind a closed gate sends nothing (the preset comes with the next ON).
+LANE_GATE = const(0)      # shutter chop: SHUTTER_PATTERN over lane_pc
+LANE_RUNNER = const(1)    # Harmony / StepSeq step (engine.step)
+LANE_COUNT = const(2)
+LANE_IDLE = const(0xFF)
+LOOP_SPIN_US = 300        # sleep_ms(1) may wake this late: closer deadlines are waited out
+
+lane_due = array("i", [0] * LANE_COUNT)     # ticks_us deadline per lane
+lane_pct = array("H", [100] * LANE_COUNT)   # period in % of pot_time_ms
+lane_heap = bytearray(LANE_COUNT)           # lane numbers, min-heap on lane_due
+lane_at = bytearray([LANE_IDLE] * LANE_COUNT)   # heap index per lane
+lane_n = 0
+
+shutter_pattern = bytes(SHUTTER_PATTERN) or b"\x01\x00"   # empty: plain ON/OFF chop
+lane_pc = 0               # preset the output follows
+lane_gate = True          # True: lane_pc, False: its bypass PC
+lane_gate_i = 0           # position in shutter_pattern
+lane_dirty = False        # output state changed in this pass
+
+
+def _lane_swap(i: int, j: int):
+    a = lane_heap[i]
+    b = lane_heap[j]
+    lane_heap[i] = b
+    lane_heap[j] = a
+    lane_at[b] = i
+    lane_at[a] = j
+
+
+def _lane_up(i: int):
+    while i:
+        p = (i - 1) >> 1
+        if time.ticks_diff(lane_due[lane_heap[i]], lane_due[lane_heap[p]]) >= 0:
+            return
+        _lane_swap(i, p)
+        i = p
+
+
+def _lane_down(i: int):
+    while True:
+        c = 2 * i + 1
+        if c >= lane_n:
+            return
+        if c + 1 < lane_n and time.ticks_diff(lane_due[lane_heap[c + 1]], lane_due[lane_heap[c]]) < 0:
+            c += 1
+        if time.ticks_diff(lane_due[lane_heap[c]], lane_due[lane_heap[i]]) >= 0:
+            return
+        _lane_swap(i, c)
+        i = c
+
+
+def lane_start(lane: int, due: int, pct: int = 100):
+    """Arm (or re-arm) a lane with its first deadline."""
+    global lane_n
+    lane_due[lane] = due
+    lane_pct[lane] = pct
+    i = lane_at[lane]
+    if i == LANE_IDLE:
+        i = lane_n
+        lane_heap[i] = lane
+        lane_at[lane] = i
+        lane_n += 1
+    _lane_up(i)
+    _lane_down(lane_at[lane])
+
+
+def lane_stop(lane: int):
+    global lane_n
+    i = lane_at[lane]
+    if i == LANE_IDLE:
+        return
+    lane_at[lane] = LANE_IDLE
+    lane_n -= 1
+    if i < lane_n:
+        last = lane_heap[lane_n]
+        lane_heap[i] = last
+        lane_at[last] = i
+        _lane_up(i)
+        _lane_down(lane_at[last])
+
+
+def _chop_period(pct: int) -> int:
+    """Chop phase in us: pct of pot_time_ms, no shorter than a Shutter phase."""
+    return max(SHUTTER_MIN_MS * 1000, pot_time_ms * 10 * pct)
+
+
+def lane_period(lane: int) -> int:
+    """Period in us."""
+    if lane == LANE_GATE:
+        return _chop_period(lane_pct[lane])
+    return max(1, pot_time_ms * 10 * lane_pct[lane])
+
+
+def lane_set_pc(pc: int):
+    """Runner step: the output follows pc (sent at the end of the pass if the gate is on)."""
+    global lane_pc, lane_dirty
+    lane_pc = pc
+    if lane_gate:
+        lane_dirty = True
+
+
+def _lane_gate_step():
+    global lane_gate, lane_gate_i, lane_dirty
+    lane_gate_i += 1
+    if lane_gate_i >= len(shutter_pattern):
+        lane_gate_i = 0
+    gate = shutter_pattern[lane_gate_i] != 0
+    if gate != lane_gate:
+        lane_gate = gate
+        lane_dirty = True
+
+
+def gate_lane_start(pc: int, pct: int):
+    """Chop lane from now on pc, gate ON (the caller sent pc)."""
+    global lane_pc, lane_gate, lane_gate_i
+    lane_pc = pc
+    lane_gate = True
+    lane_gate_i = 0
+    lane_start(LANE_GATE, time.ticks_add(time.ticks_us(), _chop_period(pct)), pct)
+
+
+def runner_lanes_start(pc: int):
+    """
+    Runner lane from a first step on pc (sent by the engine just now), plus the chop
+    lane with RUNNER_CHOP_PERCENT. Engine start / restart / new pattern.
+    """
+    global lane_pc
+    lane_pc = pc
+    lane_start(LANE_RUNNER, time.ticks_add(time.ticks_us(), pot_time_ms * 1000))
+    if RUNNER_CHOP_PERCENT:
+        gate_lane_start(pc, RUNNER_CHOP_PERCENT)
+    else:
+        lane_stop(LANE_GATE)
+
+
+def runner_lanes_stop():
+    lane_stop(LANE_RUNNER)
+    lane_stop(LANE_GATE)
+
+
+def lane_service(now_us: int):
+    """Run every due lane, then send the combined output once."""
+    global lane_dirty
+    while lane_n:
+        lane = lane_heap[0]
+        if time.ticks_diff(now_us, lane_due[lane]) < 0:
+            break
+        if lane == LANE_GATE:
+            _lane_gate_step()
+        else:
+            engine.step()
+        if lane_at[lane] == 0:                # still armed (a step may stop its lane)
+            lane_due[lane] = sched_next(lane_due[lane], now_us, lane_period(lane))
+            _lane_down(0)
+    if lane_dirty:
+        lane_dirty = False
+        midi_pc(lane_pc if lane_gate else pc_bypass(lane_pc), MIDI_PRIO_TIMING)
+
+
+def loop_idle():
+    """
+    End of a main loop pass: sleep 1 ms, or - a lane due sooner than 1 ms + LOOP_SPIN_US -
+    wait exactly up to its deadline (sleep_us busy-waits on the RP2040), so a step does
+    not wait for the next ms tick plus a whole pass.
+    """
+    if lane_n:
+        left = time.ticks_diff(lane_due[lane_heap[0]], time.ticks_us())
+        if 0 < left <= 1000 + LOOP_SPIN_US:
+            time.sleep_us(left)
+            return
+    time.sleep_ms(1)
 
 
 # =========================================================
@@ -171,6 +685,14 @@ PRESETS = [
     ("Harmony: 2nd/3rd", 16),
 ]
 
+# Preset family per PC (switch mute: SWITCH_MUTE_FAMILY names the timing parameter)
+FAMILY_DETUNE = 0
+FAMILY_WHAMMY = 1
+FAMILY_HARMONY = 2
+PRESET_FAMILY = bytes([FAMILY_DETUNE if pc < 2 else FAMILY_WHAMMY if pc < 8 else FAMILY_HARMONY
+                       for _, pc in PRESETS])
+SWITCH_MUTE_FAMILY = ("SWITCH_MUTE_DETUNE_MS", "SWITCH_MUTE_WHAMMY_MS", "SWITCH_MUTE_HARMONY_MS")
+
 # SETTINGS PCs are used ONLY for display/scroll feedback
 SETTINGS = [
     ("Mode: Latch (default ON)", 0),              # idx 0
@@ -182,10 +704,23 @@ SETTINGS = [
     ("Mode: Change Preset 1      ", 5),           # idx 6
     ("Mode: Change Preset 2      ", 6),           # idx 7
     ("Mode: Legacy  No Presets   ", 7),           # idx 8
+    ("Mode: Pedal Modulation     ", 10),          # idx 9
 ]
 
 BYPASS_OFFSET = 17
 
+# SETTINGS index -> mode (-1: not a mode; used by remote control)
+SETTING_MODES = (MODE_LATCH, MODE_MOMENTARY, MODE_HOLDING, MODE_SHUTTER, MODE_HARMONY,
+                 MODE_STEPSEQ, -1, -1, MODE_LEGACY, MODE_MODULATION)
+ENGINE_MODES = (MODE_HARMONY, MODE_STEPSEQ, MODE_MODULATION)
+
+
+def mode_available(m: int) -> bool:
+    """
+    False for the engine modes in a build without ENGINES_ENABLED.
+    """
+    return ENGINES_ENABLED or m not in ENGINE_MODES
+
 # =========================================================
 # STARTUP ANIMATION CONFIG
 # =========================================================
@@ -207,13 +742,18 @@ STARTUP_FIXED_PC_ORDER2 = [
 # =========================================================
 # MIDI
 # =========================================================
-uart = UART(MIDI_UART_ID, baudrate=MIDI_BAUD, tx=Pin(MIDI_TX_PIN))
+if MIDI_IN_ENABLED:
+    uart = UART(MIDI_UART_ID, baudrate=MIDI_BAUD, tx=Pin(MIDI_TX_PIN), rx=Pin(MIDI_RX_PIN),
+                rxbuf=MIDI_IN_RXBUF, timeout=0)
+else:
+    uart = UART(MIDI_UART_ID, baudrate=MIDI_BAUD, tx=Pin(MIDI_TX_PIN))
 
 # =========================================================
 # RUNTIME LAYERS (GPIO14 controls this)
 # =========================================================
 LAYER_PRESET = 0   # Layer 1: performance
 LAYER_EFFECT = 1   # Layer 2: SETTINGS menu
+LAYER_ACCESS = 2   # preset editing (ACCESS_MODE_ENABLED, feat_access.py)
 
 runtime_layer = LAYER_PRESET
 
@@ -223,27 +763,492 @@ stage = 0
 programming_done = False
 
 
-def midi_pc(pc: int):
+# =========================================================
+# TRACE RECORDER (fixed RAM ring, no allocation)
+# =========================================================
+# One event = ticks_us + one packed word: kind << 24 | a << 16 | b << 8 | c
+# kind: low 3 bits = type, bits 3..5 = aux (MIDI out: priority class)
+if TRACE_ENABLED:
+    TRACE_MIDI_OUT = 1        # a, b, c = status, d1, d2 (d2 0xFF => 2-byte message)
+    TRACE_MIDI_IN = 2         # a, b, c = status, d1, d2 (same; realtime bytes are not traced)
+    TRACE_SWITCH = 3          # a = 0 footswitch / 1 layer switch, b = level, c = runtime_layer
+    TRACE_MODE = 4            # a = mode, b = active_slot, c = effect_enabled (sound applied)
+
+    _trace_t = array("I", [0] * TRACE_LEN)
+    _trace_e = array("I", [0] * TRACE_LEN)
+    trace_count = 0           # events ever written (ring position = trace_count % TRACE_LEN)
+    trace_frozen = False      # set while dumping; events meanwhile are counted as lost
+    trace_lost = 0
+
+    def trace(kind: int, a: int, b: int, c: int):
+        global trace_count, trace_lost
+        if trace_frozen:
+            trace_lost += 1
+            return
+        k = trace_count % TRACE_LEN
+        _trace_t[k] = time.ticks_us()
+        _trace_e[k] = (kind << 24) | ((a & 0xFF) << 16) | ((b & 0xFF) << 8) | (c & 0xFF)
+        trace_count += 1
+
+    def trace_oldest() -> int:
+        """
+        Absolute index of the oldest event still in the ring.
+        """
+        return trace_count - TRACE_LEN if trace_count > TRACE_LEN else 0
+
+
+# =========================================================
+# MIDI OUTPUT SCHEDULER (priority classes + wire budget)
+# =========================================================
+# MIDI_PRIO_STATE  : PC/CC0 state changes (preset, effect on/off, bypass, blink)
+#                    -> always written at once; drops queued TIMING steps it supersedes
+# MIDI_PRIO_TIMING : runner/shutter step PCs
+#                    -> written at once while the window budget allows, else queued (FIFO)
+# MIDI_PRIO_CONT   : continuous CC streams (pedal modulation)
+#                    -> one pending value per CC (a newer value replaces the older one),
+#                       paced to MIDI_CONT_BUDGET_PERCENT of the wire, paused after state changes
+#
+# Wire: 10 bits/byte => MIDI_BAUD // 10 bytes/s, accounted per MIDI_WINDOW_MS window.
+# TIMING/CONT never fill more than (window - reserve) and are held back while the modelled
+# wire backlog exceeds MIDI_BACKLOG_MAX_US, so STATE waits at most about one window of
+# wire time behind them (measured: midi_stat_state_wait_max_us).
+# Running status is used on output (realtime bytes keep it, SysEx/system common clear it).
+MIDI_PRIO_STATE = 0
+MIDI_PRIO_TIMING = 1
+MIDI_PRIO_CONT = 2
+MIDI_PRIO_THRU = 3      # forwarded MIDI IN traffic (written at once, counted in the budget)
+
+MIDI_BYTE_US = (10 * 1000000) // MIDI_BAUD                          # 320us per byte
+MIDI_WINDOW_MS = 10
+MIDI_WINDOW_BYTES = ((MIDI_BAUD // 10) * MIDI_WINDOW_MS) // 1000    # 31 bytes
+MIDI_STATE_RESERVE_BYTES = 6                                        # 2 state messages
+MIDI_BACKLOG_MAX_US = MIDI_STATE_RESERVE_BYTES * MIDI_BYTE_US
+MIDI_TIMING_QUEUE_LEN = 8
+
+MIDI_TX_RUNNING_STATUS = True
+MIDI_TX_RS_REFRESH_MS = 1000     # resend the status byte at least this often
+
+MIDI_CONT_SLOTS = 4
+MIDI_CONT_BUDGET_PERCENT = 40
+MIDI_CONT_GAP_MS = -(-(3 * 1000 * 100) // ((MIDI_BAUD // 10) * MIDI_CONT_BUDGET_PERCENT))
+MIDI_CONT_GUARD_MS = 3
+
+_midi_tx2 = bytearray(2)
+_midi_tx3 = bytearray(3)
+_midi_tx2_data = memoryview(_midi_tx2)[1:]   # data-only views for running status
+_midi_tx3_data = memoryview(_midi_tx3)[1:]
+_midi_tx_running = 0
+_midi_tx_running_at = 0
+
+_midi_tq = bytearray(MIDI_TIMING_QUEUE_LEN * 3)   # status, d1, d2 (0xFF => 2-byte message)
+_midi_tq_head = 0
+_midi_tq_count = 0
+
+_midi_cont_cc = bytearray(MIDI_CONT_SLOTS)
+_midi_cont_val = bytearray(MIDI_CONT_SLOTS)
+_midi_cont_pending = bytearray(MIDI_CONT_SLOTS)
+_midi_cont_used = 0
+_midi_cont_next_at = 0
+
+midi_win_start = 0
+midi_win_bytes = 0
+midi_state_sent_at = 0
+midi_wire_free_us = 0     # modelled time when the UART has shifted out everything written
+
+# instrumentation (see midi_stats())
+midi_stat_bytes = 0
+midi_stat_drops = 0
+midi_stat_coalesced = 0
+midi_stat_depth_max = 0
+midi_stat_state_wait_max_us = 0
+
+
+def _midi_window(now_ms: int):
+    global midi_win_start, midi_win_bytes
+    if time.ticks_diff(now_ms, midi_win_start) >= MIDI_WINDOW_MS:
+        midi_win_start = now_ms
+        midi_win_bytes = 0
+
+
+def _midi_emit(buf, data, prio: int, n: int = 0) -> int:
+    """
+    The ONLY place where MIDI bytes hit the UART (running status, budget, wire model).
+    data: preallocated view of buf[1:] (None => always send buf as is).
+    n: send only the first n bytes of buf (0 => all; SysEx in its preallocated buffer).
+    Returns the modelled wire wait (us) in front of these bytes.
+    """
+    global midi_win_bytes, midi_stat_bytes, midi_wire_free_us, midi_stat_state_wait_max_us
+    global _midi_tx_running, _midi_tx_running_at
+    st = buf[0]
+    if TRACE_ENABLED:
+        m = n or len(buf)
+        trace(TRACE_MIDI_OUT | (prio << 3), st, buf[1] if m > 1 else 0xFF, buf[2] if m > 2 else 0xFF)
+    now_ms = time.ticks_ms()
+    if st < 0xF0:
+        # THRU skips the refresh: it must not add bytes to a fully loaded input stream
+        if (MIDI_TX_RUNNING_STATUS and data is not None and st == _midi_tx_running
+                and (prio == MIDI_PRIO_THRU
+                     or time.ticks_diff(now_ms, _midi_tx_running_at) < MIDI_TX_RS_REFRESH_MS)):
+            buf = data
+        else:
+            _midi_tx_running = st
+            _midi_tx_running_at = now_ms
+    elif st < 0xF8:
+        _midi_tx_running = 0      # SysEx / system common end running status
+    if n == 0:
+        n = len(buf)
+
+    now_us = time.ticks_us()
+    wait = time.ticks_diff(midi_wire_free_us, now_us)
+    if wait < 0:
+        wait = 0
+    if prio == MIDI_PRIO_STATE and wait > midi_stat_state_wait_max_us:
+        midi_stat_state_wait_max_us = wait
+    midi_wire_free_us = time.ticks_add(now_us, wait + n * MIDI_BYTE_US)
+
+    if n < len(buf):
+        uart.write(buf, n)
+    else:
+        uart.write(buf)
+    midi_win_bytes += n
+    midi_stat_bytes += n
+    return wait
+
+
+def _midi_write(status: int, d1: int, d2: int, prio: int):
+    # d2 < 0 => 2-byte message
+    if d2 < 0:
+        buf = _midi_tx2
+        data = _midi_tx2_data
+    else:
+        buf = _midi_tx3
+        data = _midi_tx3_data
+        buf[2] = d2
+    buf[0] = status
+    buf[1] = d1
+    _midi_emit(buf, data, prio)
+
+
+def _midi_room(n: int) -> bool:
+    """
+    May a TIMING/CONT message of n bytes go out now?
+    """
+    if midi_win_bytes + n > MIDI_WINDOW_BYTES - MIDI_STATE_RESERVE_BYTES:
+        return False
+    # the backlog WITH these bytes: at full THRU load it never drains, so this caps
+    # what our TIMING/CONT output can ever add in front of forwarded bytes
+    return (time.ticks_diff(midi_wire_free_us, time.ticks_us()) + n * MIDI_BYTE_US
+            <= MIDI_BACKLOG_MAX_US)
+
+
+def _midi_tq_push(status: int, d1: int, d2: int):
+    global _midi_tq_head, _midi_tq_count, midi_stat_drops, midi_stat_depth_max
+    if _midi_tq_count >= MIDI_TIMING_QUEUE_LEN:
+        # queue full: the oldest step is superseded by this newer one
+        _midi_tq_head = (_midi_tq_head + 1) % MIDI_TIMING_QUEUE_LEN
+        _midi_tq_count -= 1
+        midi_stat_drops += 1
+    k = ((_midi_tq_head + _midi_tq_count) % MIDI_TIMING_QUEUE_LEN) * 3
+    _midi_tq[k] = status
+    _midi_tq[k + 1] = d1
+    _midi_tq[k + 2] = 0xFF if d2 < 0 else d2
+    _midi_tq_count += 1
+    if _midi_tq_count > midi_stat_depth_max:
+        midi_stat_depth_max = _midi_tq_count
+
+
+def _midi_cont_set(cc: int, val: int):
+    global _midi_cont_used, midi_stat_coalesced, midi_stat_drops
+    for k in range(_midi_cont_used):
+        if _midi_cont_cc[k] == cc:
+            if _midi_cont_pending[k]:
+                midi_stat_coalesced += 1
+            _midi_cont_val[k] = val
+            _midi_cont_pending[k] = 1
+            return
+    if _midi_cont_used >= MIDI_CONT_SLOTS:
+        midi_stat_drops += 1
+        return
+    k = _midi_cont_used
+    _midi_cont_cc[k] = cc
+    _midi_cont_val[k] = val
+    _midi_cont_pending[k] = 1
+    _midi_cont_used += 1
+
+
+def _midi_cont_cancel(cc: int):
+    for k in range(_midi_cont_used):
+        if _midi_cont_cc[k] == cc:
+            _midi_cont_pending[k] = 0
+
+
+def midi_send(status: int, d1: int, d2: int, prio: int):
+    global midi_state_sent_at, _midi_tq_count, midi_stat_drops
+    now = time.ticks_ms()
+    _midi_window(now)
+
+    if prio == MIDI_PRIO_STATE:
+        if _midi_tq_count:
+            midi_stat_drops += _midi_tq_count   # stale steps must not follow a state change
+            _midi_tq_count = 0
+        if (status & 0xF0) == 0xB0:
+            _midi_cont_cancel(d1)              # keep order vs. a pending stream value
+        _midi_write(status, d1, d2, prio)
+        midi_state_sent_at = now
+
+    elif prio == MIDI_PRIO_TIMING:
+        n = 2 if d2 < 0 else 3
+        if _midi_tq_count == 0 and _midi_room(n):
+            _midi_write(status, d1, d2, prio)
+        else:
+            _midi_tq_push(status, d1, d2)
+
+    else:
+        _midi_cont_set(d1, d2)
+
+
+def midi_service(now_ms: int):
+    """
+    Drain queued TIMING steps, then paced CONT values, within the window budget.
+    Called once per main-loop pass.
+    """
+    global _midi_tq_head, _midi_tq_count, _midi_cont_next_at
+    _midi_window(now_ms)
+
+    while _midi_tq_count:
+        k = _midi_tq_head * 3
+        d2 = _midi_tq[k + 2]
+        if d2 == 0xFF:
+            d2 = -1
+        if not _midi_room(2 if d2 < 0 else 3):
+            return
+        _midi_write(_midi_tq[k], _midi_tq[k + 1], d2, MIDI_PRIO_TIMING)
+        _midi_tq_head = (_midi_tq_head + 1) % MIDI_TIMING_QUEUE_LEN
+        _midi_tq_count -= 1
+
+    if _midi_cont_used == 0:
+        return
+    if time.ticks_diff(now_ms, _midi_cont_next_at) < 0:
+        return
+    if time.ticks_diff(now_ms, midi_state_sent_at) < MIDI_CONT_GUARD_MS:
+        return
+    if not _midi_room(3):
+        return
+    for k in range(_midi_cont_used):
+        if _midi_cont_pending[k]:
+            _midi_cont_pending[k] = 0
+            _midi_write(0xB0 | TARGET_CH, _midi_cont_cc[k], _midi_cont_val[k], MIDI_PRIO_CONT)
+            _midi_cont_next_at = time.ticks_add(now_ms, MIDI_CONT_GAP_MS)
+            return
+
+
+def midi_stats():
+    """
+    (queue depth, max depth, drops, coalesced, bytes sent, max STATE wire wait us)
+    """
+    return (_midi_tq_count, midi_stat_depth_max, midi_stat_drops,
+            midi_stat_coalesced, midi_stat_bytes, midi_stat_state_wait_max_us)
+
+
+def midi_pc(pc: int, prio: int = MIDI_PRIO_STATE):
     # Legacy blocks ONLY in Layer 1 (performance) after programming is done.
     # Layer 2 stays unchanged and may send PC for scrolling feedback.
     if programming_done and (runtime_layer == LAYER_PRESET) and (mode == MODE_LEGACY):
         return
-    uart.write(bytes([0xC0 | TARGET_CH, pc & 0x7F]))
+    midi_send(0xC0 | TARGET_CH, pc & 0x7F, -1, prio)
+
 
+def midi_cc(cc: int, val: int, prio: int = MIDI_PRIO_STATE):
+    midi_send(0xB0 | TARGET_CH, cc & 0x7F, val & 0x7F, prio)
 
-def midi_cc(cc: int, val: int):
-    uart.write(bytes([0xB0 | TARGET_CH, cc & 0x7F, val & 0x7F]))
+
+def midi_cc_cont(cc: int, val: int):
+    midi_send(0xB0 | TARGET_CH, cc & 0x7F, val & 0x7F, MIDI_PRIO_CONT)
 
 
 def midi_note_on(note: int, vel: int):
-    uart.write(bytes([0x90 | TARGET_CH, note & 0x7F, vel & 0x7F]))
+    midi_send(0x90 | TARGET_CH, note & 0x7F, vel & 0x7F, MIDI_PRIO_STATE)
 
 
 def midi_note_off(note: int):
     # robust: Note-Off as Note-On with velocity 0
-    uart.write(bytes([0x90 | TARGET_CH, note & 0x7F, 0]))
+    midi_send(0x90 | TARGET_CH, note & 0x7F, 0, MIDI_PRIO_STATE)
     # optional extra "true note off" for compatibility
-    uart.write(bytes([0x80 | TARGET_CH, note & 0x7F, 0]))
+    midi_send(0x80 | TARGET_CH, note & 0x7F, 0, MIDI_PRIO_STATE)
+
+
+# =========================================================
+# MIDI IN (zero-allocation parser) + THRU/merge
+# =========================================================
+# - running status, system common, SysEx (up to MIDI_IN_SYSEX_MAX bytes)
+# - realtime bytes (F8..FF) are legal anywhere, even inside a message: forwarded at once
+# - channel/system messages are forwarded only when COMPLETE, always with their status
+#   byte, so THRU never splits one of our messages and we never split one of theirs
+#
+# THRU latency bound: a byte waits at most one main-loop pass for midi_in_poll() plus the
+# wire backlog in front of it. THRU bytes count against the MIDI window budget and our
+# TIMING/CONT output only goes out while the backlog WITH it stays under
+# MIDI_BACKLOG_MAX_US, so at full input load (where nothing drains) it yields to THRU
+# completely; THRU itself adds no bytes (no running status refresh, SysEx as received).
+# The bound holds up to 100 % input load; only a STATE message sent during full load
+# (a footswitch press) adds its 2-3 bytes until the load eases (Host/neo_thru.py).
+MIDI_THRU_BOUND_US = 4000
+
+midi_in_msgs = 0
+midi_in_errors = 0         # stray data, unterminated / oversized SysEx
+midi_thru_lat_last_us = 0
+midi_thru_lat_max_us = 0
+midi_thru_over_bound = 0
+
+if MIDI_IN_ENABLED:
+    _min_rx = bytearray(32)
+    _min_msg = bytearray(3)
+    _min_out1 = bytearray(1)
+    _min_out2 = bytearray(2)
+    _min_msg_data = memoryview(_min_msg)[1:]
+    _min_out2_data = memoryview(_min_out2)[1:]
+    _min_sysex = bytearray(MIDI_IN_SYSEX_MAX)
+    _min_sysex_len = -1        # -1 => not inside SysEx
+    _min_running = 0           # running status (0 => none)
+    _min_need = 0              # data bytes expected for the current message
+    _min_have = 0
+    _min_prev_poll_us = 0      # bytes read now arrived after this time
+
+    def _midi_data_len(status: int) -> int:
+        if status < 0xF0:
+            return 1 if 0xC0 <= status < 0xE0 else 2
+        if status == 0xF2:
+            return 2
+        if status == 0xF1 or status == 0xF3:
+            return 1
+        return 0
+
+    def _midi_thru(buf, data, arrived_us: int, n: int = 0):
+        global midi_thru_lat_last_us, midi_thru_lat_max_us, midi_thru_over_bound
+        if not MIDI_THRU:
+            return
+        wait = _midi_emit(buf, data, MIDI_PRIO_THRU, n)
+        lat = time.ticks_diff(time.ticks_us(), arrived_us) + wait
+        midi_thru_lat_last_us = lat
+        if lat > midi_thru_lat_max_us:
+            midi_thru_lat_max_us = lat
+        if lat > MIDI_THRU_BOUND_US:
+            midi_thru_over_bound += 1
+
+    def _midi_in_complete(arrived_us: int):
+        global midi_in_msgs
+        midi_in_msgs += 1
+        n = 1 + _min_need
+        if TRACE_ENABLED:
+            trace(TRACE_MIDI_IN, _min_msg[0], _min_msg[1] if n > 1 else 0xFF,
+                  _min_msg[2] if n > 2 else 0xFF)
+        if REMOTE_ENABLED and (_min_msg[0] & 0x0F) == REMOTE_CH and _min_msg[0] < 0xF0:
+            remote_on_message(_min_msg[0] & 0xF0, _min_msg[1], _min_msg[2] if n == 3 else 0,
+                              arrived_us)
+        if n == 1:
+            _min_out1[0] = _min_msg[0]
+            _midi_thru(_min_out1, None, arrived_us)
+        elif n == 2:
+            _min_out2[0] = _min_msg[0]
+            _min_out2[1] = _min_msg[1]
+            _midi_thru(_min_out2, _min_out2_data, arrived_us)
+        else:
+            _midi_thru(_min_msg, _min_msg_data, arrived_us)
+
+    def _midi_in_byte(b: int, arrived_us: int):
+        global _min_sysex_len, _min_running, _min_need, _min_have, midi_in_errors
+
+        if b >= 0xF8:
+            # realtime: single byte, may sit inside any other message
+            _min_out1[0] = b
+            _midi_thru(_min_out1, None, arrived_us)
+            return
+
+        if b >= 0x80:
+            if _min_sysex_len >= 0:
+                if b == 0xF7 and _min_sysex_len < MIDI_IN_SYSEX_MAX:
+                    _min_sysex[_min_sysex_len] = 0xF7
+                    if MIDI_THRU:
+                        _midi_thru(_min_sysex, None, arrived_us, _min_sysex_len + 1)
+                else:
+                    midi_in_errors += 1       # too long or cut off by another status
+                _min_sysex_len = -1
+                if b == 0xF7:
+                    return
+
+            if b == 0xF0:
+                _min_sysex[0] = 0xF0
+                _min_sysex_len = 1
+                _min_running = 0
+                _min_need = 0
+                return
+            if b == 0xF7:
+                midi_in_errors += 1           # EOX without SysEx
+                return
+
+            _min_running = b if b < 0xF0 else 0   # system common cancels running status
+            _min_msg[0] = b
+            _min_need = _midi_data_len(b)
+            _min_have = 0
+            if _min_need == 0:
+                _midi_in_complete(arrived_us)
+            return
+
+        # data byte
+        if _min_sysex_len >= 0:
+            if _min_sysex_len < MIDI_IN_SYSEX_MAX - 1:
+                _min_sysex[_min_sysex_len] = b
+            _min_sysex_len += 1
+            return
+
+        if _min_have >= _min_need:
+            if _min_running == 0:
+                midi_in_errors += 1           # stray data byte
+                return
+            _min_msg[0] = _min_running        # running status: new message, same status
+            _min_need = _midi_data_len(_min_running)
+            _min_have = 0
+
+        _min_msg[1 + _min_have] = b
+        _min_have += 1
+        if _min_have == _min_need:
+            _midi_in_complete(arrived_us)
+
+    def midi_in_poll():
+        """
+        Read whatever the UART holds (non-blocking) and run it through the parser.
+        """
+        global _min_prev_poll_us
+        now_us = time.ticks_us()
+        arrived_us = _min_prev_poll_us
+        _min_prev_poll_us = now_us
+        avail = uart.any()
+        while avail:
+            n = uart.readinto(_min_rx, avail if avail < len(_min_rx) else len(_min_rx))
+            if not n:
+                return
+            for k in range(n):
+                _midi_in_byte(_min_rx[k], arrived_us)
+            avail = uart.any()
+
+
+def midi_in_stats():
+    """
+    (messages, errors, last thru latency us, max thru latency us, count over bound)
+    """
+    return (midi_in_msgs, midi_in_errors, midi_thru_lat_last_us,
+            midi_thru_lat_max_us, midi_thru_over_bound)
+
+
+def wait_ms(ms: int):
+    """
+    Blocking wait (boot animation, blinks, confirms) that keeps MIDI IN/THRU alive.
+    """
+    end = time.ticks_add(time.ticks_ms(), ms)
+    while time.ticks_diff(end, time.ticks_ms()) > 0:
+        if MIDI_IN_ENABLED:
+            midi_in_poll()
+        time.sleep_ms(1)
 
 
 def pc_bypass(pc: int):
@@ -266,11 +1271,11 @@ def send_bypass_pc_only(pc: int):
 
 def confirm_saved_preset_pc_only(pc: int):
     midi_pc(pc)                 # ON
-    time.sleep_ms(70)
+    wait_ms(70)
     midi_pc(pc_bypass(pc))      # OFF (bypass)
-    time.sleep_ms(40)
+    wait_ms(40)
     blink_selected_channel(times=10, on_ms=80, off_ms=40)
-    time.sleep_ms(50)
+    wait_ms(50)
     midi_pc(pc_bypass(pc))      # end in bypass
 
 
@@ -280,157 +1285,594 @@ def blink_selected_channel(times=BLINK_TIMES, on_ms=BLINK_ON_MS, off_ms=BLINK_OF
     No CC0, no ProgramChange, no bypass tricks.
     """
     midi_note_off(BLINK_NOTE)
-    time.sleep_ms(80)
+    wait_ms(80)
     for _ in range(times):
         midi_note_on(BLINK_NOTE, BLINK_VEL)
-        time.sleep_ms(on_ms)
+        wait_ms(on_ms)
         midi_note_off(BLINK_NOTE)
-        time.sleep_ms(off_ms)
+        wait_ms(off_ms)
 
 
 # =========================================================
-# SHUTTER MIDI (PC-only toggling, CC0 only at start/stop)
+# REMOTE CONTROL (incoming CC/PC on REMOTE_CH)
 # =========================================================
-def shutter_start(pc: int):
-    midi_cc(0, 127)
-    midi_pc(pc)
-
-
-def shutter_on_phase(pc: int):
-    midi_pc(pc)
-
-
-def shutter_off_phase(pc: int):
-    midi_pc(pc_bypass(pc))
-
-
-def shutter_stop(pc: int):
-    midi_cc(0, 0)
-    midi_pc(pc_bypass(pc))
+# The parser only records the wish (plain ints, no allocation); remote_apply() runs it
+# in the main loop at a safe point: programming done, Layer 1, footswitch up, no
+# single-tap decision pending. Mode/slot changes use switch_with_mute() and also wait
+# for a running switch mute to end; engine options apply right away.
+#   PC n                 => mode of SETTINGS index n (Layer 2 order; 6/7 ignored)
+#   CC REMOTE_CC_MODE    => same as PC
+#   CC REMOTE_CC_SLOT    => 0..63 preset A, 64..127 preset B
+#   CC REMOTE_CC_HARMONY => harmony_mode (0..HARMONY_MODE_COUNT-1)
+#   CC REMOTE_CC_STEPSEQ => stepseq_mode (0..2), takes effect on the next step
+#   CC REMOTE_CC_TEMPO   => virtual pot position (0..127) until the pot is moved
+remote_cmds = 0
+remote_lat_last_us = 0            # command arrival -> first resulting byte on the wire
+remote_lat_max_us = 0
+
+if REMOTE_ENABLED:
+    REMOTE_CC_MODE = 20
+    REMOTE_CC_SLOT = 21
+    REMOTE_CC_HARMONY = 22
+    REMOTE_CC_STEPSEQ = 23
+    REMOTE_CC_TEMPO = 24
+    REMOTE_POT_TAKEOVER_U16 = 2048    # pot movement that hands tempo back to the pot
+
+    remote_pending = False
+    remote_want_mode = -1
+    remote_want_slot = -1
+    remote_want_harmony = -1
+    remote_want_stepseq = -1
+    remote_want_tempo = -1
+    remote_cmd_us = 0                 # arrival of the oldest unapplied command
+
+    remote_tempo_raw = -1             # virtual pot value (-1 => physical pot)
+    remote_tempo_pot_ref = 0          # pot reading when the remote tempo took over
+
+    def remote_on_message(kind: int, d1: int, d2: int, arrived_us: int):
+        global remote_pending, remote_want_mode, remote_want_slot, remote_want_harmony
+        global remote_want_stepseq, remote_want_tempo, remote_cmd_us, remote_cmds
+
+        if kind == 0xC0:
+            cc = REMOTE_CC_MODE
+            d2 = d1
+        elif kind == 0xB0:
+            cc = d1
+        else:
+            return
+
+        if cc == REMOTE_CC_MODE:
+            if (d2 >= len(SETTING_MODES) or SETTING_MODES[d2] < 0
+                    or not mode_available(SETTING_MODES[d2])):
+                return
+            remote_want_mode = SETTING_MODES[d2]
+        elif cc == REMOTE_CC_SLOT:
+            remote_want_slot = 1 if d2 >= 64 else 0
+        elif ENGINES_ENABLED and cc == REMOTE_CC_HARMONY:
+            if d2 >= HARMONY_MODE_COUNT:
+                return
+            remote_want_harmony = d2
+        elif ENGINES_ENABLED and cc == REMOTE_CC_STEPSEQ:
+            if d2 > STEPSEQ_MODE_PINGPONG:
+                return
+            remote_want_stepseq = d2
+        elif cc == REMOTE_CC_TEMPO:
+            remote_want_tempo = d2
+        else:
+            return
+
+        if not remote_pending:
+            remote_pending = True
+            remote_cmd_us = arrived_us
+        remote_cmds += 1
+
+    def remote_pot_raw(raw: int) -> int:
+        """
+        Pot reading as seen by update_pot_time_ms(): the remote tempo wins until the pot moves.
+        """
+        global remote_tempo_raw
+        if remote_tempo_raw < 0:
+            return raw
+        if abs(raw - remote_tempo_pot_ref) > REMOTE_POT_TAKEOVER_U16:
+            remote_tempo_raw = -1
+            return raw
+        return remote_tempo_raw
+
+    def remote_apply(now_ms: int):
+        global remote_pending, remote_want_mode, remote_want_slot, remote_want_harmony
+        global remote_want_stepseq, remote_want_tempo, remote_lat_last_us, remote_lat_max_us
+        global remote_tempo_raw, remote_tempo_pot_ref, harmony_mode, stepseq_mode
+        global _last_pot_read_ms
+
+        now_us = time.ticks_us()
+        wait = time.ticks_diff(midi_wire_free_us, now_us)
+        lat = time.ticks_diff(now_us, remote_cmd_us) + (wait if wait > 0 else 0)
+        remote_lat_last_us = lat
+        if lat > remote_lat_max_us:
+            remote_lat_max_us = lat
+
+        if remote_want_tempo >= 0:
+            remote_tempo_raw = (remote_want_tempo * 65535) // 127
+            remote_tempo_pot_ref = pot_read_u16()
+            remote_want_tempo = -1
+            _last_pot_read_ms = time.ticks_add(now_ms, -POT_READ_INTERVAL_MS)
+            update_pot_time_ms(now_ms)
+
+        if remote_want_harmony >= 0:
+            harmony_mode = remote_want_harmony
+            remote_want_harmony = -1
+            if ENGINES_ENABLED and engine_active(MODE_HARMONY):
+                engine.restart(now_ms)      # running runner jumps to the new order at once
+
+        if remote_want_stepseq >= 0:
+            stepseq_mode = remote_want_stepseq  # next step rebuilds the playback order
+            remote_want_stepseq = -1
+
+        if switch_apply_pending and (remote_want_mode >= 0 or remote_want_slot >= 0):
+            return                          # stay pending until the running switch is applied
+        remote_pending = False
+
+        new_mode = mode if remote_want_mode < 0 else remote_want_mode
+        new_slot = active_slot if remote_want_slot < 0 else remote_want_slot
+        remote_want_mode = -1
+        remote_want_slot = -1
+        if new_slot != active_slot and stored_preset_index[new_slot] < 0:
+            new_slot = active_slot
+        if new_mode != mode or new_slot != active_slot:
+            switch_with_mute(new_slot, new_mode)
+
+    def remote_stats():
+        """
+        (commands received, last latency us, max latency us, remote tempo active)
+        """
+        return (remote_cmds, remote_lat_last_us, remote_lat_max_us, remote_tempo_raw >= 0)
 
 
 # =========================================================
-# HARMONY RUNNER (3 MODES)
+# SERIAL PROTOCOL (USB CDC, framed binary)
 # =========================================================
-HARMONY_MODE_DOWN = 0     # 15 -> 8
-HARMONY_MODE_UP = 1       # 8 -> 15
-HARMONY_MODE_PINGPONG = 2 # 15 -> 8 -> 15 -> ...
-
-harmony_mode = HARMONY_MODE_DOWN  # default (top->down)
-
-
-def build_harmony_seq(hmode: int):
-    down = list(range(15, 7, -1))   # 15..8
-    up = list(range(8, 16, 1))      # 8..15
-    if hmode == HARMONY_MODE_DOWN:
-        return down
-    elif hmode == HARMONY_MODE_UP:
-        return up
-    else:
-        return down + list(range(9, 15, 1))  # 9..14
-
-
-harmony_seq = build_harmony_seq(harmony_mode)
-
-harmony_active = False
-harmony_i = 0
-harmony_next_step_at = 0
-harmony_last_pc = 15
+# Frames are SLIP-like: END ... END, with END/ESC/0x03 escaped so Ctrl-C (0x03) on the
+# REPL never shows up inside a frame. Bytes between frames (REPL noise) are ignored.
+#   request:  cmd, seq, payload..., crc8
+#   response: cmd | 0x80, seq, status, payload..., crc8   (seq 0 => streamed)
+# All ints little endian. Host client: Host/neo_serial.py
+if SERIAL_PROTO_ENABLED:
+    SERIAL_VERSION = 1
+    SERIAL_END = 0xC0
+    SERIAL_ESC = 0xDB
+    SERIAL_ESC_END = 0xDC
+    SERIAL_ESC_ESC = 0xDD
+    SERIAL_ESC_INTR = 0xDE      # escaped 0x03
+    SERIAL_FRAME_MAX = 64       # unescaped bytes per frame
+    SERIAL_RX_PER_PASS = 16     # bytes handled per main-loop pass (never stalls the engines)
+
+    SER_CMD_HELLO = 0x01        # -> version, param count, firmware version text
+    SER_CMD_PARAM_INFO = 0x02   # idx -> lo i32, hi i32, name
+    SER_CMD_PARAM_GET = 0x03    # idx -> value i32
+    SER_CMD_PARAM_SET = 0x04    # idx, value i32 -> applied value i32
+    SER_CMD_STATE = 0x05        # -> state bytes (see serial_state)
+    SER_CMD_COUNTERS = 0x06     # -> u32 counters (see serial_counters)
+    SER_CMD_STREAM = 0x07       # period_ms u16 (0 = off) -> counters pushed with seq 0
+    SER_CMD_TRACE_INFO = 0x08   # freeze u8 -> events written u32, capacity u16, lost u32, frozen u8
+    SER_CMD_TRACE_READ = 0x09   # offset u16 (0 = oldest) -> offset u16, up to 6 x (t u32, word u32)
+    SER_CMD_MEMORY = 0x0A       # -> boot us u32, boot free u32, free now u32, engine mode u8
+                                # mode u8 -> mode u8, engine load us i32, free after i32 (-1 = not yet)
+    SER_CMD_INPUTS = 0x0B       # -> expansion_stats() as u32, debounced switch levels u32
+    SER_CMD_SWITCH = 0x0C       # -> switch_gap_stats() as u32
+    SER_CMD_LATENCY = 0x0D      # kind u8 -> kind u8, presses u32, last LAT_HISTORY latencies u32
+    SERIAL_TRACE_PER_FRAME = 6
+
+    SER_OK = 0
+    SER_ERR_CMD = 1
+    SER_ERR_INDEX = 2
+    SER_ERR_LEN = 3
+
+    # Writable timing parameters: (global name, lo, hi, partner index)
+    # partner: the other end of a range; a _MIN never goes above its _MAX and vice versa.
+    SERIAL_PARAMS = (
+        ("DEBOUNCE_MS", 1, 50, -1),
+        ("TAP_MAX_MS", 100, 2000, -1),
+        ("DOUBLE_TAP_WINDOW_MS", 100, 1000, -1),
+        ("MOMENTARY_HOLD_MS", 20, 1000, -1),
+        ("SWITCH_MUTE_MS", 0, 1000, -1),
+        ("HOLD_MIN_MS", 50, 30000, 6),
+        ("HOLD_MAX_MS", 50, 30000, 5),
+        ("SHUTTER_MIN_MS", 10, 2000, 8),
+        ("SHUTTER_MAX_MS", 10, 2000, 7),
+        ("HARMONY_STEP_MIN_MS", 10, 2000, 10),
+        ("HARMONY_STEP_MAX_MS", 10, 2000, 9),
+        ("MOD_PERIOD_MIN_MS", 50, 30000, 12),
+        ("MOD_PERIOD_MAX_MS", 50, 30000, 11),
+        ("SWITCH_MUTE_DETUNE_MS", 0, 1000, -1),
+        ("SWITCH_MUTE_WHAMMY_MS", 0, 1000, -1),
+        ("SWITCH_MUTE_HARMONY_MS", 0, 1000, -1),
+        ("RUNNER_CHOP_PERCENT", 0, 400, -1),          # next runner start
+    )
+
+    _ser_poll = select.poll()
+    _ser_poll.register(sys.stdin, select.POLLIN)
+    _ser_in = sys.stdin.buffer
+    _ser_out = sys.stdout.buffer
+    _ser_b1 = bytearray(1)
+
+    _ser_rx = bytearray(SERIAL_FRAME_MAX)
+    _ser_rx_len = 0
+    _ser_rx_esc = False
+    _ser_rx_over = False
+
+    _ser_pl = bytearray(SERIAL_FRAME_MAX)          # response being built (unescaped)
+    _ser_tx = bytearray(2 * SERIAL_FRAME_MAX + 2)  # escaped frame
+    _ser_tx_mv = memoryview(_ser_tx)
+
+    serial_stream_ms = 0
+    serial_next_stream_at = 0
+    serial_frames_ok = 0
+    serial_frames_bad = 0
+
+    def _crc8_table():
+        t = bytearray(256)
+        for i in range(256):
+            c = i
+            for _ in range(8):
+                c = ((c << 1) ^ 0x07) & 0xFF if c & 0x80 else (c << 1) & 0xFF
+            t[i] = c
+        return bytes(t)
+
+    SERIAL_CRC8 = _crc8_table()
+
+    def _crc8(buf, n: int) -> int:
+        c = 0
+        for k in range(n):
+            c = SERIAL_CRC8[c ^ buf[k]]
+        return c
+
+    def _ser_put32(k: int, v: int) -> int:
+        _ser_pl[k] = v & 0xFF
+        _ser_pl[k + 1] = (v >> 8) & 0xFF
+        _ser_pl[k + 2] = (v >> 16) & 0xFF
+        _ser_pl[k + 3] = (v >> 24) & 0xFF
+        return k + 4
+
+    def _ser_get32(buf, k: int) -> int:
+        v = buf[k] | (buf[k + 1] << 8) | (buf[k + 2] << 16) | (buf[k + 3] << 24)
+        return v - (1 << 32) if v & 0x80000000 else v
+
+    def _ser_send(n: int):
+        """
+        Escape _ser_pl[:n] + crc into one frame and write it.
+        """
+        _ser_pl[n] = _crc8(_ser_pl, n)
+        m = 0
+        _ser_tx[m] = SERIAL_END
+        m += 1
+        for k in range(n + 1):
+            b = _ser_pl[k]
+            if b == SERIAL_END:
+                _ser_tx[m] = SERIAL_ESC
+                _ser_tx[m + 1] = SERIAL_ESC_END
+                m += 2
+            elif b == SERIAL_ESC:
+                _ser_tx[m] = SERIAL_ESC
+                _ser_tx[m + 1] = SERIAL_ESC_ESC
+                m += 2
+            elif b == 0x03:
+                _ser_tx[m] = SERIAL_ESC
+                _ser_tx[m + 1] = SERIAL_ESC_INTR
+                m += 2
+            else:
+                _ser_tx[m] = b
+                m += 1
+        _ser_tx[m] = SERIAL_END
+        _ser_out.write(_ser_tx_mv[:m + 1])
+
+    def serial_param_set(idx: int, v: int) -> int:
+        global pot_curve_mode
+        name, lo, hi, partner = SERIAL_PARAMS[idx]
+        v = clamp(v, lo, hi)
+        if partner >= 0:
+            other = globals()[SERIAL_PARAMS[partner][0]]
+            v = min(v, other) if partner > idx else max(v, other)
+        globals()[name] = v
+        pot_curve_mode = -1               # time ranges feed the pot curve table
+        return v
+
+    def serial_state(k: int) -> int:
+        """
+        mode, layer, slot, programming_done, stage, effect_enabled, shutter, harmony,
+        stepseq, modulation, harmony_mode, stepseq_mode, switch pending, pot_time_ms u32
+        """
+        for v in (mode, runtime_layer, active_slot, programming_done, stage, effect_enabled,
+                  shutter_active, engine_active(MODE_HARMONY), engine_active(MODE_STEPSEQ),
+                  engine_active(MODE_MODULATION),
+                  harmony_mode, stepseq_mode, switch_apply_pending):
+            _ser_pl[k] = int(v)
+            k += 1
+        return _ser_put32(k, pot_time_ms)
+
+    def serial_counters(k: int) -> int:
+        """
+        MIDI out bytes, drops, coalesced, max queue depth, max STATE wait us,
+        MIDI in msgs, in errors, max THRU latency us, THRU over bound,
+        remote cmds, max remote latency us, serial frames ok, serial frames bad
+        """
+        for v in (midi_stat_bytes, midi_stat_drops, midi_stat_coalesced, midi_stat_depth_max,
+                  midi_stat_state_wait_max_us, midi_in_msgs, midi_in_errors,
+                  midi_thru_lat_max_us, midi_thru_over_bound, remote_cmds, remote_lat_max_us,
+                  serial_frames_ok, serial_frames_bad):
+            k = _ser_put32(k, v)
+        return k
+
+    def _ser_frame(n: int):
+        global serial_frames_ok, serial_frames_bad, serial_stream_ms, serial_next_stream_at
+        global _last_pot_read_ms, trace_frozen
+        if n < 3 or _crc8(_ser_rx, n - 1) != _ser_rx[n - 1]:
+            serial_frames_bad += 1
+            return
+        serial_frames_ok += 1
+        cmd = _ser_rx[0]
+        n -= 3                          # payload length
+        _ser_pl[0] = cmd | 0x80
+        _ser_pl[1] = _ser_rx[1]
+        _ser_pl[2] = SER_OK
+        k = 3
+
+        if cmd == SER_CMD_HELLO:
+            _ser_pl[3] = SERIAL_VERSION
+            _ser_pl[4] = len(SERIAL_PARAMS)
+            k = 5
+            for c in FW_VERSION:
+                _ser_pl[k] = c
+                k += 1
+
+        elif cmd == SER_CMD_PARAM_INFO or cmd == SER_CMD_PARAM_GET or cmd == SER_CMD_PARAM_SET:
+            idx = _ser_rx[2] if n >= 1 else 255
+            if idx >= len(SERIAL_PARAMS):
+                _ser_pl[2] = SER_ERR_INDEX
+            elif cmd == SER_CMD_PARAM_INFO:
+                name, lo, hi, _partner = SERIAL_PARAMS[idx]
+                k = _ser_put32(_ser_put32(k, lo), hi)
+                for c in name:
+                    _ser_pl[k] = ord(c)
+                    k += 1
+            elif cmd == SER_CMD_PARAM_GET:
+                k = _ser_put32(k, globals()[SERIAL_PARAMS[idx][0]])
+            elif n != 5:
+                _ser_pl[2] = SER_ERR_LEN
+            else:
+                k = _ser_put32(k, serial_param_set(idx, _ser_get32(_ser_rx, 3)))
+                # ranges may have moved: re-read the pot on the next pass
+                _last_pot_read_ms = time.ticks_add(time.ticks_ms(), -POT_READ_INTERVAL_MS)
 
+        elif cmd == SER_CMD_STATE:
+            k = serial_state(k)
 
-def harmony_rebuild_seq():
-    global harmony_seq
-    harmony_seq = build_harmony_seq(harmony_mode)
+        elif cmd == SER_CMD_COUNTERS:
+            k = serial_counters(k)
 
+        elif TRACE_ENABLED and cmd == SER_CMD_TRACE_INFO:
+            if n != 1:
+                _ser_pl[2] = SER_ERR_LEN
+            else:
+                trace_frozen = bool(_ser_rx[2])
+                k = _ser_put32(k, trace_count)
+                _ser_pl[k] = TRACE_LEN & 0xFF
+                _ser_pl[k + 1] = TRACE_LEN >> 8
+                k = _ser_put32(k + 2, trace_lost)
+                _ser_pl[k] = int(trace_frozen)
+                k += 1
+
+        elif TRACE_ENABLED and cmd == SER_CMD_TRACE_READ:
+            if n != 2:
+                _ser_pl[2] = SER_ERR_LEN
+            else:
+                off = _ser_rx[2] | (_ser_rx[3] << 8)
+                _ser_pl[3] = _ser_rx[2]
+                _ser_pl[4] = _ser_rx[3]
+                k = 5
+                i = trace_oldest() + off
+                for _ in range(SERIAL_TRACE_PER_FRAME):
+                    if i >= trace_count:
+                        break
+                    j = i % TRACE_LEN
+                    k = _ser_put32(_ser_put32(k, _trace_t[j]), _trace_e[j])
+                    i += 1
+
+        elif cmd == SER_CMD_MEMORY:
+            if n == 0:
+                k = _ser_put32(_ser_put32(_ser_put32(k, boot_init_us), boot_mem_free), gc.mem_free())
+                _ser_pl[k] = engine_mode & 0xFF
+                k += 1
+            elif n != 1:
+                _ser_pl[2] = SER_ERR_LEN
+            elif _ser_rx[2] >= len(engine_load_us):
+                _ser_pl[2] = SER_ERR_INDEX
+            else:
+                m = _ser_rx[2]
+                _ser_pl[3] = m
+                k = _ser_put32(_ser_put32(4, engine_load_us[m]), engine_mem_free[m])
+
+        elif EXPANSION_ENABLED and cmd == SER_CMD_INPUTS:
+            for v in expansion_stats():
+                k = _ser_put32(k, v)
+            k = _ser_put32(k, exp_db[0])
+
+        elif cmd == SER_CMD_SWITCH:
+            for v in switch_gap_stats():
+                k = _ser_put32(k, v)
+
+        elif LATENCY_PROBE_ENABLED and cmd == SER_CMD_LATENCY:
+            if n != 1:
+                _ser_pl[2] = SER_ERR_LEN
+            elif _ser_rx[2] >= len(LAT_KINDS):
+                _ser_pl[2] = SER_ERR_INDEX
+            else:
+                m = _ser_rx[2]
+                _ser_pl[3] = m
+                k = _ser_put32(4, lat_count[m])
+                for j in range(min(lat_count[m], LAT_HISTORY)):
+                    k = _ser_put32(k, lat_us[m * LAT_HISTORY + j])
+
+        elif cmd == SER_CMD_STREAM:
+            if n != 2:
+                _ser_pl[2] = SER_ERR_LEN
+            else:
+                serial_stream_ms = _ser_rx[2] | (_ser_rx[3] << 8)
+                serial_next_stream_at = time.ticks_ms()
 
-def cycle_harmony_mode():
-    global harmony_mode
-    harmony_mode = (harmony_mode + 1) % 3
-    blink_selected_channel(times=harmony_mode + 1, on_ms=60, off_ms=60)
+        else:
+            _ser_pl[2] = SER_ERR_CMD
+
+        _ser_send(k)
+
+    def _ser_byte(b: int):
+        global _ser_rx_len, _ser_rx_esc, _ser_rx_over
+        if b == SERIAL_END:
+            if _ser_rx_len and not _ser_rx_over:
+                _ser_frame(_ser_rx_len)
+            _ser_rx_len = 0
+            _ser_rx_esc = False
+            _ser_rx_over = False
+            return
+        if b == SERIAL_ESC:
+            _ser_rx_esc = True
+            return
+        if _ser_rx_esc:
+            _ser_rx_esc = False
+            if b == SERIAL_ESC_END:
+                b = SERIAL_END
+            elif b == SERIAL_ESC_ESC:
+                b = SERIAL_ESC
+            elif b == SERIAL_ESC_INTR:
+                b = 0x03
+        if _ser_rx_len >= SERIAL_FRAME_MAX:
+            _ser_rx_over = True
+            return
+        _ser_rx[_ser_rx_len] = b
+        _ser_rx_len += 1
+
+    def serial_poll(now_ms: int):
+        """
+        Handle up to SERIAL_RX_PER_PASS received bytes, then the counter stream.
+        """
+        global serial_next_stream_at
+        for _ in range(SERIAL_RX_PER_PASS):
+            ready = False
+            for _ev in _ser_poll.ipoll(0):
+                ready = True
+            if not ready:
+                break
+            if not _ser_in.readinto(_ser_b1):
+                break
+            _ser_byte(_ser_b1[0])
+
+        if serial_stream_ms and time.ticks_diff(now_ms, serial_next_stream_at) >= 0:
+            serial_next_stream_at = sched_next(serial_next_stream_at, now_ms, serial_stream_ms)
+            _ser_pl[0] = SER_CMD_COUNTERS | 0x80
+            _ser_pl[1] = 0
+            _ser_pl[2] = SER_OK
+            _ser_send(serial_counters(3))
 
 
-def harmony_start(now_ms: int):
-    global harmony_active, harmony_i, harmony_next_step_at, harmony_last_pc
-    harmony_rebuild_seq()
-    harmony_active = True
-    harmony_i = 0
-    harmony_last_pc = harmony_seq[harmony_i]
-    midi_cc(0, 127)               # arm once
-    midi_pc(harmony_last_pc)      # initial PC
-    harmony_next_step_at = time.ticks_add(now_ms, pot_time_ms)
+# =========================================================
+# RELAY GATE (feat_relay.py, only in builds with RELAY_GATE_ENABLED)
+# =========================================================
+# Shutter runs on the A/B relays instead of toggling the preset: the Whammy is engaged
+# at the start, the PIO chops wet/dry with pot_time_ms halves, stop settles on dry.
+if RELAY_GATE_ENABLED:
+    import feat_relay as relay
 
 
-def harmony_restart(now_ms: int):
-    """
-    Apply new harmony_mode immediately while keeping CC armed (no CC OFF).
-    """
-    global harmony_active, harmony_i, harmony_next_step_at, harmony_last_pc
-    if not harmony_active:
-        return
-    harmony_rebuild_seq()
-    harmony_i = 0
-    harmony_last_pc = harmony_seq[harmony_i]
-    midi_pc(harmony_last_pc)  # immediate new direction start PC
-    harmony_next_step_at = time.ticks_add(now_ms, pot_time_ms)
+# =========================================================
+# ACCESS MODE (feat_access.py, only in builds with ACCESS_MODE_ENABLED)
+# =========================================================
+# GPIO14 edges go to access.edge() instead of the layer flip-flop; in access
+# (runtime_layer LAYER_ACCESS) the footswitch edges go to access.foot() and every Layer 1
+# action (modes, engines, lanes, remote, expansion) waits until access is left.
+if ACCESS_MODE_ENABLED:
+    import feat_access as access
 
 
-def harmony_step(now_ms: int):
-    global harmony_i, harmony_next_step_at, harmony_last_pc
-    harmony_i = (harmony_i + 1) % len(harmony_seq)
-    harmony_last_pc = harmony_seq[harmony_i]
-    midi_pc(harmony_last_pc)      # PC only
-    harmony_next_step_at = time.ticks_add(now_ms, pot_time_ms)
+# =========================================================
+# SHUTTER MIDI (PC-only toggling, CC0 only at start/stop)
+# =========================================================
+def shutter_start(pc: int):
+    midi_cc(0, 127)
+    midi_pc(pc)
+    if RELAY_GATE_ENABLED:
+        relay.start(pot_time_ms)
+    else:
+        gate_lane_start(pc, 100)
 
 
-def harmony_stop():
-    global harmony_active
-    if not harmony_active:
-        return
-    harmony_active = False
+def shutter_stop(pc: int):
+    if RELAY_GATE_ENABLED:
+        relay.stop()
+    else:
+        lane_stop(LANE_GATE)
     midi_cc(0, 0)
-    midi_pc(pc_bypass(harmony_last_pc))
+    midi_pc(pc_bypass(pc))
 
 
 # =========================================================
-# STEP SEQUENCER (random pattern)
+# ENGINES (Harmony / StepSeq / Modulation, loaded on demand)
 # =========================================================
+# The engines live in eng_harmony.py / eng_stepseq.py / eng_modulation.py (upload them next
+# to main.py). Only the engine of the selected mode is imported; leaving the mode drops the
+# module from sys.modules so gc can reclaim its tables, bank and run state.
+#
+# Engine module API:
+#   active                          True while running
+#   start(now_ms, pc) / stop(pc)    arm + first step / disarm + bypass PC
+#                                   (Harmony / StepSeq: + runner lanes start / stop)
+#   step()                          Harmony / StepSeq: runner lane due, next step
+#   service(now_ms)                 every main loop pass while active (work between steps)
+#   rescale(now_ms, old_ms, new_ms) Modulation: keep the phase when the pot tempo changes
+#                                   (lane deadlines are rescaled in main.py)
+#   harmony: cycle(), restart(now_ms)   stepseq: on_press(now_ms), on_release(now_ms, tap),
+#                                       capture_prev(), capture_fired
+#                                       modulation: cycle()
+#
+# The user's choices below stay here so they survive an unload.
+HARMONY_MODE_DOWN = 0     # 15 -> 8
+HARMONY_MODE_UP = 1       # 8 -> 15
+HARMONY_MODE_PINGPONG = 2 # 15 -> 8 -> 15 -> ...
+
+# Optional user-defined runner orders. Each entry becomes one extra harmony_mode
+# after PINGPONG (cycled by short tap like the built-in ones).
+# Any preset PCs 0..16, any length >= 1, e.g.:
+#   HARMONY_USER_ORDERS = [
+#       [8, 10, 12, 14, 16],
+#       [0, 15, 2, 13, 4, 11, 6, 9],
+#   ]
+HARMONY_USER_ORDERS = []
+HARMONY_MODE_COUNT = 3 + len([o for o in HARMONY_USER_ORDERS if o])
+
+harmony_mode = HARMONY_MODE_DOWN  # default (top->down)
+
 STEPSEQ_MODE_DOWN = 0
 STEPSEQ_MODE_UP = 1
 STEPSEQ_MODE_PINGPONG = 2
 
 stepseq_mode = STEPSEQ_MODE_DOWN
+STEPSEQ_CAPTURE_HOLD_MS = 1000  # long-hold => store the pattern that played before the press
+STEPSEQ_SEED = 0                # 0 = random (ADC noise + boot time), 1..65535 = repeatable patterns
 
-STEPSEQ_POOL = list(range(8, 16))     # Harmony preset PCs 8..15
-stepseq_base = STEPSEQ_POOL[:]        # stored random permutation
-stepseq_seq = []                      # derived playback seq
-
-stepseq_active = False
-stepseq_i = 0
-stepseq_next_step_at = 0
-stepseq_last_pc = 15
+MOD_WAVE_TRIANGLE = 0
+MOD_WAVE_SINE = 1
+MOD_WAVE_RAMP_UP = 2
+MOD_WAVE_RAMP_DOWN = 3
+MOD_WAVE_SQUARE = 4
 
+mod_wave = MOD_WAVE_TRIANGLE
+mod_started_on_press = False
 
-def stepseq_generate_base():
-    global stepseq_base
-    arr = STEPSEQ_POOL[:]  # copy
-    for i in range(len(arr) - 1, 0, -1):
-        j = urandom.getrandbits(16) % (i + 1)
-        arr[i], arr[j] = arr[j], arr[i]
-    stepseq_base = arr
+engine = None             # loaded engine module (None for the plain modes)
+engine_name = None
+engine_mode = -1          # mode the loaded engine / last measurement belongs to
 
-
-def stepseq_build_seq():
-    global stepseq_seq
-    base = stepseq_base
-    if stepseq_mode == STEPSEQ_MODE_UP:
-        stepseq_seq = base[:]
-    elif stepseq_mode == STEPSEQ_MODE_DOWN:
-        stepseq_seq = base[::-1]
-    else:
-        if len(base) >= 2:
-            stepseq_seq = base + base[-2:0:-1]
-        else:
-            stepseq_seq = base[:]
+# Per-mode footprint (read via SER_CMD_MEMORY): engine import + gc time, free heap after
+engine_load_us = array("i", [-1] * 8)
+engine_mem_free = array("i", [-1] * 8)
 
 
 def stepseq_cycle_mode():
@@ -439,84 +1881,43 @@ def stepseq_cycle_mode():
     blink_selected_channel(times=stepseq_mode + 1, on_ms=60, off_ms=60)
 
 
-def stepseq_mutate_live():
-    global stepseq_base
-    max_swaps = 6
-    swaps = (pot_shape * max_swaps) >> 16  # 0..6
-    if swaps == 0:
-        return
-
-    n = len(stepseq_base)
-    for _ in range(swaps):
-        i = urandom.getrandbits(16) % n
-        j = urandom.getrandbits(16) % n
-        if i != j:
-            stepseq_base[i], stepseq_base[j] = stepseq_base[j], stepseq_base[i]
-
-
-def stepseq_start(now_ms: int):
-    """
-    Start StepSeq and ARM CC ON.
-    """
-    global stepseq_active, stepseq_i, stepseq_next_step_at, stepseq_last_pc
-    stepseq_generate_base()
-    stepseq_build_seq()
-    if not stepseq_seq:
-        return
-
-    stepseq_active = True
-    stepseq_i = 0
-    stepseq_last_pc = stepseq_seq[stepseq_i]
-
-    midi_cc(0, 127)               # ALWAYS armed while StepSeq running
-    midi_pc(stepseq_last_pc)
-    stepseq_next_step_at = time.ticks_add(now_ms, pot_time_ms)
-
-
-def stepseq_step(now_ms: int):
-    global stepseq_i, stepseq_next_step_at, stepseq_last_pc
-    stepseq_mutate_live()
-    stepseq_build_seq()
-
-    stepseq_i = (stepseq_i + 1) % len(stepseq_seq)
-    stepseq_last_pc = stepseq_seq[stepseq_i]
-    midi_pc(stepseq_last_pc)
-    stepseq_next_step_at = time.ticks_add(now_ms, pot_time_ms)
-
-
-def stepseq_stop():
-    """
-    Stop StepSeq and DISARM (CC OFF) when leaving the mode.
-    """
-    global stepseq_active
-    if not stepseq_active:
-        return
-    stepseq_active = False
-    midi_cc(0, 0)
-    midi_pc(pc_bypass(stepseq_last_pc))
-
-
-def stepseq_new_random_pattern(now_ms: int):
-    """
-    While StepSeq is active and CC is already ON:
-    create a NEW random base permutation, rebuild sequence, and restart immediately
-    without toggling CC.
-    """
-    global stepseq_i, stepseq_next_step_at, stepseq_last_pc
-    if not stepseq_active:
-        # safety: if somehow not active, start it
-        stepseq_start(now_ms)
-        return
-
-    stepseq_generate_base()
-    stepseq_build_seq()
-    if not stepseq_seq:
-        return
-
-    stepseq_i = 0
-    stepseq_last_pc = stepseq_seq[stepseq_i]
-    midi_pc(stepseq_last_pc)  # immediate new pattern start
-    stepseq_next_step_at = time.ticks_add(now_ms, pot_time_ms)
+if ENGINES_ENABLED:
+    ENGINE_MODULES = {
+        MODE_HARMONY: "eng_harmony",
+        MODE_STEPSEQ: "eng_stepseq",
+        MODE_MODULATION: "eng_modulation",
+    }
+
+    def engine_select(m: int):
+        """
+        Load the engine of mode m (nothing for the plain modes) and drop the previous one.
+        Call with the old engine already stopped. Mode changes only, never in the step path.
+        """
+        global engine, engine_name, engine_mode
+        if m == engine_mode:
+            return
+        engine_mode = m
+        t0 = time.ticks_us()
+        name = ENGINE_MODULES.get(m)
+        if name != engine_name:
+            if engine_name is not None:
+                engine = None
+                del sys.modules[engine_name]
+            engine_name = name
+            if name is not None:
+                engine = __import__(name)
+        gc.collect()
+        engine_load_us[m] = time.ticks_diff(time.ticks_us(), t0)
+        engine_mem_free[m] = gc.mem_free()
+
+
+def engine_active(m: int) -> bool:
+    return engine is not None and engine_mode == m and engine.active
+
+
+def engine_stop():
+    if engine is not None:
+        engine.stop(current_active_pc())
 
 
 # =========================================================
@@ -530,14 +1931,14 @@ def startup_sequence():
         order = STARTUP_FIXED_PC_ORDER if direction > 0 else reversed(STARTUP_FIXED_PC_ORDER)
         for pc in order:
             midi_pc(pc_bypass(pc))
-            time.sleep_ms(STARTUP_STEP_MS)
+            wait_ms(STARTUP_STEP_MS)
         direction = -direction
 
     for _ in range(STARTUP_PASSES):
         order = STARTUP_FIXED_PC_ORDER2 if direction > 0 else reversed(STARTUP_FIXED_PC_ORDER2)
         for pc in order:
             midi_pc(pc_bypass(pc))
-            time.sleep_ms(STARTUP_STEP_MS)
+            wait_ms(STARTUP_STEP_MS)
         direction = -direction
 
     midi_cc(0, 0)
@@ -553,7 +1954,7 @@ scan_paused = False
 last_scan_step_ms = 0
 selection_index = 0
 
-stored_preset_index = [-1, -1]   # preset A, preset B
+stored_preset_index = [-1] * (ACCESS_SLOTS if ACCESS_MODE_ENABLED else 2)   # preset A, B (C, D)
 
 # --- Reprogram staging ---
 reprog_active = False
@@ -577,10 +1978,8 @@ holding_armed = False
 holding_off_at = 0
 holding_wait_release = False
 
-# Shutter runtime (MIDI: Active <-> Bypass)
+# Shutter runtime (MIDI: Active <-> Bypass on the gate lane, see LANE SCHEDULER)
 shutter_active = False
-shutter_phase_on = False
-shutter_next_toggle_at = 0
 
 # Layer 2 selection freeze
 selected_setting_index = 0
@@ -589,21 +1988,161 @@ selected_setting_index = 0
 switch_mute_until = 0
 switch_apply_pending = False
 
+# Switch gaps: switch -> effect engaged again (read via SER_CMD_SWITCH)
+SWITCH_GAP_HISTORY = 16
+switch_started_us = 0
+switch_gaps_us = array("i", [0] * SWITCH_GAP_HISTORY)   # ring of the last gaps
+switch_gap_count = 0
+switch_gap_max_us = 0
+
+# =========================================================
+# LATENCY PROBE (only in builds with LATENCY_PROBE_ENABLED)
+# =========================================================
+# Pin IRQs stamp (ticks_us) the first footswitch edge of a press and the first start bit
+# on the looped-back MIDI TX line after the main loop took the press; + one byte time
+# = the resulting byte has arrived. Includes debounce, tap/double-tap windows, mute and
+# the MIDI queue. One ring per kind (LAT_KINDS), read via SER_CMD_LATENCY.
+if LATENCY_PROBE_ENABLED:
+    LAT_KINDS = ("Latch", "Momentary", "Holding", "Shutter start", "Harmony start",
+                 "StepSeq re-roll")
+    LAT_HISTORY = 12
+    LAT_TIMEOUT_US = 2000000       # press without a resulting byte is dropped
+    LAT_PASS_MS = 5                # slack over the debounce for the pass that takes the press
+    LAT_BYTE_US = 10 * 1000000 // MIDI_BAUD
+
+    LAT_IDLE = 0
+    LAT_PRESSED = 1                # edge stamped, main loop has not taken the press yet
+    LAT_ARMED = 2                  # press taken, waiting for the first start bit
+    LAT_ARRIVED = 3
+
+    lat_us = array("i", [0] * (len(LAT_KINDS) * LAT_HISTORY))
+    lat_count = array("I", [0] * len(LAT_KINDS))
+    lat_state = LAT_IDLE
+    lat_kind = 0
+    lat_press_us = 0
+    lat_arrive_us = 0
+
+    def _lat_press_irq(pin):
+        global lat_state, lat_press_us
+        if lat_state == LAT_IDLE:
+            lat_press_us = time.ticks_us()
+            lat_state = LAT_PRESSED
+
+    def _lat_loop_irq(pin):
+        global lat_state, lat_arrive_us
+        if lat_state == LAT_ARMED:
+            lat_arrive_us = time.ticks_us()
+            lat_state = LAT_ARRIVED
+
+    def latency_probe_arm():
+        """
+        Debounced press in the main loop: keep the stamp for a measured kind.
+        """
+        global lat_state, lat_kind
+        if lat_state != LAT_PRESSED:
+            return
+        # debounce = 4 samples DEBOUNCE_MS / 3 apart (+ bounce within the press): older is a
+        # stray edge (release bounce) from before this press
+        if time.ticks_diff(time.ticks_us(), lat_press_us) > (2 * DEBOUNCE_MS + LAT_PASS_MS) * 1000:
+            lat_state = LAT_IDLE
+            return
+        kind = -1
+        if programming_done and runtime_layer == LAYER_PRESET and not switch_apply_pending:
+            if mode == MODE_LATCH or mode == MODE_MOMENTARY or mode == MODE_HOLDING:
+                kind = mode                 # kinds 0..2 follow the mode numbers
+            elif mode == MODE_SHUTTER and not shutter_active:
+                kind = 3
+            elif mode == MODE_HARMONY and not engine_active(MODE_HARMONY):
+                kind = 4
+            elif mode == MODE_STEPSEQ:
+                kind = 5
+        if kind < 0:
+            lat_state = LAT_IDLE
+            return
+        lat_kind = kind
+        lat_state = LAT_ARMED
+
+    def latency_probe_release():
+        """
+        Debounced release: an edge stamped since (release bounce) is not a press.
+        """
+        global lat_state
+        if lat_state == LAT_PRESSED:
+            lat_state = LAT_IDLE
+
+    def latency_probe_service():
+        global lat_state
+        if lat_state == LAT_ARRIVED:
+            k = lat_count[lat_kind]
+            lat_us[lat_kind * LAT_HISTORY + k % LAT_HISTORY] = (
+                time.ticks_diff(lat_arrive_us, lat_press_us) + LAT_BYTE_US)
+            lat_count[lat_kind] = k + 1
+            lat_state = LAT_IDLE
+        elif (lat_state != LAT_IDLE
+              and time.ticks_diff(time.ticks_us(), lat_press_us) > LAT_TIMEOUT_US):
+            lat_state = LAT_IDLE
+
+    sw.irq(_lat_press_irq, Pin.IRQ_FALLING, hard=True)
+    lat_loop_pin = Pin(LATENCY_PROBE_PIN, Pin.IN)
+    lat_loop_pin.irq(_lat_loop_irq, Pin.IRQ_FALLING, hard=True)
+
 # =========================================================
 # SWITCH STATE / TAP STATE (debounce)
 # =========================================================
-stable_sw = sw.value()
-last_sw = stable_sw
-last_change = time.ticks_ms()
+# All inputs come from ONE read of the SIO GPIO_IN register (bit n = GPIOn) and are
+# debounced together by a 2-bit vertical counter per bit: an input flips after 4
+# consecutive samples that differ from its debounced level. Samples are DEBOUNCE_MS / 3
+# apart on a ticks_us deadline advanced like a lane (sched_next), so 1 ms passes give
+# the exact mean spacing (e.g. 3, 3, 4 ms for 10 ms). A sample needs a main loop pass:
+# below DEBOUNCE_MS = 3 every pass samples and the debounce is 4 passes (~4 ms).
+# The expansion bus (if any) is scanned on the same tick into its own bank.
+SIO_GPIO_IN = 0xD0000004
+SW_BIT = 1 << PIN_FOOTSW
+LAYER_BIT = 1 << PIN_LAYER_SWITCH
+INPUT_MASK = SW_BIT | LAYER_BIT
+
+# bank = [debounced levels (pull-up: 0 = pressed), counter bit 0, counter bit 1]
+db_gpio = array("i", [mem32[SIO_GPIO_IN] & INPUT_MASK, 0, 0])
+db_sample_at = time.ticks_us()   # next sample due
+
+
+def debounce_bank(db, sample: int) -> int:
+    """
+    One vertical-counter step for every bit of a bank; returns the bits that flipped.
+    """
+    delta = sample ^ db[0]
+    c1 = (db[2] ^ db[1]) & delta
+    c0 = ~db[1] & delta
+    flipped = delta & ~(c0 | c1)
+    db[0] ^= flipped
+    db[1] = c0
+    db[2] = c1
+    return flipped
+
+
+def inputs_sample(now_us: int) -> int:
+    """
+    Sample all inputs at once; returns the GPIO bits whose debounced level flipped
+    (0 = none). Expansion switch presses are queued by expansion_scan().
+    """
+    global db_sample_at
+    if time.ticks_diff(now_us, db_sample_at) < 0:
+        return 0
+    db_sample_at = sched_next(db_sample_at, now_us, DEBOUNCE_MS * 1000 // 3)
+    if EXPANSION_ENABLED and EXP_BUS is not None:
+        expansion_scan()
+    return debounce_bank(db_gpio, mem32[SIO_GPIO_IN] & INPUT_MASK)
+
+
+stable_sw = 1 if db_gpio[0] & SW_BIT else 0
 press_start_ms = 0
 
-stable_layer = layer_sw.value()
-last_layer = stable_layer
-last_layer_change = time.ticks_ms()
+stable_layer = 1 if db_gpio[0] & LAYER_BIT else 0
 
 pending_single_tap = False
 pending_single_tap_deadline = 0
 last_release_ms = 0
+tap_speculated = False      # Latch toggle of the pending tap already applied
 
 # long-hold guard so it triggers once per hold
 layer2_long_hold_fired = False
@@ -612,6 +2151,151 @@ layer2_long_hold_fired = False
 press_layer = LAYER_PRESET
 
 
+# =========================================================
+# EXPANSION SWITCHES (74HC165 chain on SPI1 / PCF8574 / MCP23017 on I2C1)
+# =========================================================
+# One bulk transfer per input sample, debounced like the GPIO inputs (own bank).
+# Switch k = bit k of the bytes read, byte 0 first (pull-ups: pressed = 0):
+#   74HC165: byte 0 = chip whose QH drives MISO, bit 7 = its input H
+#   PCF8574: P0..P7        MCP23017: GPA0..7 = 0..7, GPB0..7 = 8..15
+# A press (Layer 1, programming done) queues its action; the main loop applies it at
+# the same safe point as remote commands, through switch_with_mute().
+#   ("slot", 0|1)  preset A / B     ("mode", MODE_...)  mode     ("preset", i)  PRESETS[i]
+#                                                                 into the active slot
+#   ("slot", 2|3)  preset C / D (access mode with ACCESS_SLOTS = 4)
+if EXPANSION_ENABLED:
+    EXP_ACTIONS = (
+        ("slot", 0),
+        ("slot", 1),
+        ("mode", MODE_LATCH),
+        ("mode", MODE_SHUTTER),
+        ("mode", MODE_HARMONY),
+        ("mode", MODE_STEPSEQ),
+        ("mode", MODE_MODULATION),
+        ("mode", MODE_LEGACY),
+    )
+    EXP_BYTES = (EXP_COUNT + 7) // 8
+    EXP_MASK = (1 << EXP_COUNT) - 1
+    MCP23017_GPPUA = 0x0C     # pull-ups A/B
+    MCP23017_GPIOA = 0x12     # port A/B levels
+
+    exp_buf = bytearray(EXP_BYTES)
+    exp_db = array("i", [EXP_MASK, 0, 0])      # all released
+    exp_seen_us = array("I", [0] * EXP_COUNT)  # scan that first saw a switch change (latency start)
+    exp_pending = -1                           # switch whose action waits for the safe point
+    exp_pending_us = 0
+
+    exp_scans = 0
+    exp_scan_last_us = 0
+    exp_scan_max_us = 0
+    exp_presses = 0
+    exp_errors = 0
+    exp_lat_last_us = 0
+    exp_lat_max_us = 0
+
+    exp_spi = None
+    exp_load = None
+    exp_i2c = None
+    if EXP_BUS == "165":
+        exp_load = Pin(EXP_165_LOAD, Pin.OUT, value=1)
+        exp_spi = SPI(1, baudrate=EXP_165_BAUD, polarity=0, phase=0,
+                      sck=Pin(EXP_165_SCK), miso=Pin(EXP_165_MISO))
+    elif EXP_BUS is not None:
+        exp_i2c = I2C(1, sda=Pin(EXP_I2C_SDA), scl=Pin(EXP_I2C_SCL), freq=EXP_I2C_FREQ)
+        try:
+            if EXP_BUS == "mcp23017":
+                exp_i2c.writeto_mem(EXP_I2C_ADDR, MCP23017_GPPUA, b"\xff\xff")  # IODIR = inputs at reset
+            else:
+                exp_i2c.writeto(EXP_I2C_ADDR, b"\xff" * EXP_BYTES)  # quasi-bidirectional: high = input
+        except OSError:
+            exp_errors += 1
+
+    def expansion_scan():
+        """
+        Bulk-read all expansion switches, debounce them, queue the action of a new press.
+        """
+        global exp_scans, exp_scan_last_us, exp_scan_max_us, exp_errors
+        global exp_pending, exp_pending_us, exp_presses
+        t0 = time.ticks_us()
+        try:
+            if exp_spi is not None:
+                exp_load(0)            # parallel load
+                exp_load(1)
+                exp_spi.readinto(exp_buf, 0xFF)
+            elif EXP_BUS == "mcp23017":
+                exp_i2c.readfrom_mem_into(EXP_I2C_ADDR, MCP23017_GPIOA, exp_buf)
+            else:
+                exp_i2c.readfrom_into(EXP_I2C_ADDR, exp_buf)
+        except OSError:
+            exp_errors += 1
+            return
+        v = 0
+        for k in range(EXP_BYTES - 1, -1, -1):
+            v = (v << 8) | exp_buf[k]
+        v &= EXP_MASK
+
+        starting = (v ^ exp_db[0]) & ~(exp_db[1] | exp_db[2])
+        flipped = debounce_bank(exp_db, v)
+        if starting or flipped:
+            for k in range(EXP_COUNT):
+                bit = 1 << k
+                if starting & bit:
+                    exp_seen_us[k] = t0
+                if flipped & bit:
+                    pressed = not (exp_db[0] & bit)
+                    if TRACE_ENABLED:
+                        trace(TRACE_SWITCH, 2 + k, 0 if pressed else 1, runtime_layer)
+                    if (pressed and k < len(EXP_ACTIONS) and EXP_ACTIONS[k] is not None
+                            and programming_done and runtime_layer == LAYER_PRESET):
+                        exp_pending = k
+                        exp_pending_us = exp_seen_us[k]
+                        exp_presses += 1
+
+        exp_scans += 1
+        exp_scan_last_us = time.ticks_diff(time.ticks_us(), t0)
+        if exp_scan_last_us > exp_scan_max_us:
+            exp_scan_max_us = exp_scan_last_us
+
+    def expansion_apply(now_ms: int):
+        """
+        Run the queued expansion action (main loop safe point, no switch pending).
+        Latency: first scan that saw the switch move -> action's MIDI on the wire.
+        """
+        global exp_pending, exp_lat_last_us, exp_lat_max_us
+        kind, arg = EXP_ACTIONS[exp_pending]
+        exp_pending = -1
+        new_slot = active_slot
+        new_mode = mode
+        if kind == "slot":
+            if stored_preset_index[arg] < 0:
+                return
+            new_slot = arg
+        elif kind == "mode":
+            if not mode_available(arg):
+                return
+            new_mode = arg
+        elif kind == "preset":
+            if stored_preset_index[active_slot] == arg:
+                return
+            stored_preset_index[active_slot] = clamp(arg, 0, len(PRESETS) - 1)
+        if kind != "preset" and new_slot == active_slot and new_mode == mode:
+            return
+        switch_with_mute(new_slot, new_mode)
+
+        now_us = time.ticks_us()
+        wait = time.ticks_diff(midi_wire_free_us, now_us)
+        exp_lat_last_us = time.ticks_diff(now_us, exp_pending_us) + (wait if wait > 0 else 0)
+        if exp_lat_last_us > exp_lat_max_us:
+            exp_lat_max_us = exp_lat_last_us
+
+    def expansion_stats():
+        """
+        (scans, last scan us, max scan us, presses, bus errors, last latency us, max latency us)
+        """
+        return (exp_scans, exp_scan_last_us, exp_scan_max_us, exp_presses, exp_errors,
+                exp_lat_last_us, exp_lat_max_us)
+
+
 # =========================================================
 # HELPERS
 # =========================================================
@@ -624,13 +2308,16 @@ def current_active_pc():
 
 def apply_current_sound():
     global momentary_engaged, holding_armed, holding_off_at, holding_wait_release
-    global shutter_active, shutter_phase_on, shutter_next_toggle_at
-    global harmony_active, harmony_next_step_at
+    global shutter_active
     global legacy_momentary_engaged, legacy_off_at
 
-    # stop transient engines cleanly
-    harmony_stop()
-    stepseq_stop()
+    if TRACE_ENABLED:
+        trace(TRACE_MODE, mode, active_slot, effect_enabled)
+
+    # stop transient engines cleanly, then load the engine of the (new) mode
+    engine_stop()
+    if ENGINES_ENABLED:
+        engine_select(mode)
 
     # stop shutter cleanly if it was running
     if shutter_active:
@@ -641,7 +2328,6 @@ def apply_current_sound():
 
     # Legacy behavior
     if mode == MODE_LEGACY:
-        legacy_off_at = 0
         legacy_off_at = 0
         legacy_momentary_engaged = True  
         midi_cc(0, 127)
@@ -651,11 +2337,6 @@ def apply_current_sound():
         holding_wait_release = False
 
         shutter_active = False
-        shutter_phase_on = False
-        shutter_next_toggle_at = 0
-
-        harmony_active = False
-        harmony_next_step_at = 0
         return
 
     # If leaving Legacy: ensure CC OFF and clear timer
@@ -674,16 +2355,16 @@ def apply_current_sound():
         midi_cc(0, 127)
         midi_pc(pc_bypass(pc))
 
-    elif mode == MODE_HARMONY:
+    elif ENGINES_ENABLED and mode == MODE_HARMONY:
         midi_cc(0, 127)
         midi_pc(pc_bypass(pc))
 
-    elif mode == MODE_STEPSEQ:
+    elif ENGINES_ENABLED and mode == MODE_STEPSEQ:
         midi_cc(0, 127)
-        stepseq_start(time.ticks_ms())
+        engine.start(time.ticks_ms(), pc)
 
     else:
-        send_effect_off(pc)
+        send_effect_off(pc)     # also Modulation: the engine starts on the first press
 
     # reset transient states (not StepSeq's internal running; that's handled above)
     momentary_engaged = False
@@ -692,11 +2373,6 @@ def apply_current_sound():
     holding_wait_release = False
 
     shutter_active = False
-    shutter_phase_on = False
-    shutter_next_toggle_at = 0
-
-    harmony_active = False
-    harmony_next_step_at = 0
 
 
 def show_boot_scan_item():
@@ -715,35 +2391,65 @@ def show_settings_layer_scan_item():
     send_effect_off(pc)
 
 
-def start_preset_switch_with_mute():
-    global active_slot, switch_mute_until, switch_apply_pending
-    global momentary_engaged, holding_armed, holding_off_at, holding_wait_release
-    global shutter_active, shutter_phase_on, shutter_next_toggle_at
-    global harmony_active, harmony_next_step_at
-    global legacy_momentary_engaged, legacy_off_at
+def other_slot() -> int:
+    """
+    Double-tap target: the other preset of A/B (access mode with ACCESS_SLOTS = 4:
+    A/B -> D, C/D -> A); -1 while that slot has no preset.
+    """
+    if ACCESS_MODE_ENABLED and ACCESS_SLOTS > 2:
+        slot = 3 if active_slot < 2 else 0
+    else:
+        slot = 1 - active_slot
+    return slot if stored_preset_index[slot] >= 0 else -1
+
 
+def start_preset_switch_with_mute():
     if mode == MODE_LEGACY:
         return
-    if stored_preset_index[0] < 0 or stored_preset_index[1] < 0:
+    slot = other_slot()
+    if slot < 0:
         return
+    switch_with_mute(slot, mode)
 
-    harmony_stop()
-    stepseq_stop()
+
+def switch_with_mute(new_slot: int, new_mode: int, rearm: bool = False):
+    """
+    Glitch-free slot/mode change: stop engines, pre-stage the new preset bypassed, mute
+    (preset family time, SWITCH_MUTE_MS on a mode change), then the main loop runs
+    apply_current_sound() with the new state.
+    Latch -> Latch with the effect on switches the PC directly (no gap);
+    rearm also re-sends CC0 ON there (the Whammy was left OFF by a speculative tap).
+    """
+    global mode, active_slot, switch_mute_until, switch_apply_pending, switch_started_us
+    global momentary_engaged, holding_armed, holding_off_at, holding_wait_release
+    global shutter_active
+    global legacy_momentary_engaged, legacy_off_at
+
+    engine_stop()
 
     # stop shutter if running
     if shutter_active:
         pc = current_active_pc()
         shutter_stop(pc)
 
-    pc_now = current_active_pc()
-    if mode == MODE_LATCH and effect_enabled:
-        active_slot = 1 - active_slot
+    if mode == MODE_LATCH and new_mode == MODE_LATCH and effect_enabled:
+        active_slot = new_slot
         pc_new = current_active_pc()
+        if rearm:
+            midi_cc(0, 127)
         midi_pc(pc_new)
+        switch_gap_note(0)
         return
 
-    send_bypass_pc_only(pc_now)
-    active_slot = 1 - active_slot
+    if mode == MODE_LEGACY and legacy_momentary_engaged:
+        midi_cc(0, 0)      # Legacy has no PC to bypass with
+    mode_change = new_mode != mode
+    active_slot = new_slot
+    mode = new_mode
+    pc_new = current_active_pc()
+    send_bypass_pc_only(pc_new)     # pre-stage: the Whammy loads it while bypassed
+    mute_ms = SWITCH_MUTE_MS if mode_change else switch_mute_ms(pc_new)
+    switch_started_us = time.ticks_us()
 
     momentary_engaged = False
     holding_armed = False
@@ -751,20 +2457,38 @@ def start_preset_switch_with_mute():
     holding_wait_release = False
 
     shutter_active = False
-    shutter_phase_on = False
-    shutter_next_toggle_at = 0
-
-    harmony_active = False
-    harmony_next_step_at = 0
 
     # leaving legacy-like state
     legacy_momentary_engaged = False
     legacy_off_at = 0
 
-    switch_mute_until = time.ticks_add(time.ticks_ms(), SWITCH_MUTE_MS)
+    switch_mute_until = time.ticks_add(time.ticks_ms(), mute_ms)
     switch_apply_pending = True
 
 
+def switch_mute_ms(pc: int) -> int:
+    return globals()[SWITCH_MUTE_FAMILY[PRESET_FAMILY[pc]]]
+
+
+def switch_gap_note(gap_us: int):
+    global switch_gap_count, switch_gap_max_us
+    switch_gaps_us[switch_gap_count % SWITCH_GAP_HISTORY] = gap_us
+    switch_gap_count += 1
+    if gap_us > switch_gap_max_us:
+        switch_gap_max_us = gap_us
+
+
+def switch_gap_stats():
+    """
+    (switches, last gap us, median of the last SWITCH_GAP_HISTORY gaps us, worst gap us)
+    """
+    n = min(switch_gap_count, SWITCH_GAP_HISTORY)
+    if n == 0:
+        return (0, 0, 0, 0)
+    last = switch_gaps_us[(switch_gap_count - 1) % SWITCH_GAP_HISTORY]
+    return (switch_gap_count, last, sorted(switch_gaps_us[:n])[n // 2], switch_gap_max_us)
+
+
 def on_single_tap_layer1():
     global effect_enabled
     if mode == MODE_LEGACY:
@@ -781,6 +2505,22 @@ def on_double_tap_layer1():
     start_preset_switch_with_mute()
 
 
+def undo_speculative_tap_and_switch():
+    """
+    Double tap after the first tap was already applied (LATCH_SPECULATIVE_TAP):
+    restore effect_enabled and let the preset switch carry the correction.
+    Effect was ON -> CC0 ON rides with the new PC; effect was OFF -> the switch
+    bypasses anyway. Without a second preset the old sound is simply re-sent.
+    """
+    global effect_enabled
+    effect_enabled = not effect_enabled
+    slot = other_slot()
+    if slot < 0:
+        apply_current_sound()
+        return
+    switch_with_mute(slot, mode, True)
+
+
 def restart_single_preset_programming(slot: int):
     """
     Reprogram only preset slot 0 or 1, then return to performance immediately.
@@ -791,14 +2531,12 @@ def restart_single_preset_programming(slot: int):
     global shutter_active
     global reprog_active, reprog_temp, stored_preset_index, reprog_target_slot
     global legacy_momentary_engaged, legacy_off_at
-    global stepseq_active
 
     pending_single_tap = False
     legacy_momentary_engaged = False
     legacy_off_at = 0
 
-    harmony_stop()
-    stepseq_stop()
+    engine_stop()
 
     # stop shutter if running
     if shutter_active:
@@ -819,8 +2557,6 @@ def restart_single_preset_programming(slot: int):
     programming_done = False
     layer2_long_hold_fired = True
 
-    stepseq_active = False
-
     blink_selected_channel()
     show_boot_scan_item()
 
@@ -858,6 +2594,8 @@ def apply_scanned_setting_and_exit():
         mode = MODE_STEPSEQ
     elif idx == 8:
         mode = MODE_LEGACY
+    elif idx == 9:
+        mode = MODE_MODULATION
     else:
         mode = MODE_LATCH
 
@@ -876,18 +2614,15 @@ def restart_preset_programming():
     global scan_paused, last_scan_step_ms
     global pending_single_tap, layer2_long_hold_fired
     global momentary_engaged, holding_armed, holding_off_at
-    global shutter_active, shutter_phase_on, shutter_next_toggle_at
+    global shutter_active
     global reprog_active, reprog_temp, stored_preset_index, reprog_target_slot
-    global harmony_active, harmony_next_step_at
     global legacy_momentary_engaged, legacy_off_at
-    global stepseq_active
 
     pending_single_tap = False
     legacy_momentary_engaged = False
     legacy_off_at = 0
 
-    harmony_stop()
-    stepseq_stop()
+    engine_stop()
 
     # stop shutter if running
     if shutter_active:
@@ -912,13 +2647,6 @@ def restart_preset_programming():
     holding_off_at = 0
 
     shutter_active = False
-    shutter_phase_on = False
-    shutter_next_toggle_at = 0
-
-    harmony_active = False
-    harmony_next_step_at = 0
-
-    stepseq_active = False
 
     blink_selected_channel()
     show_boot_scan_item()
@@ -942,6 +2670,18 @@ def exit_effect_layer():
 # =========================================================
 # BOOT
 # =========================================================
+gc.collect()
+boot_init_us = time.ticks_diff(time.ticks_us(), boot_t0_us)   # import -> startup animation
+boot_mem_free = gc.mem_free()
+
+if sw.value() == 0:
+    pot_cal_gesture()     # footswitch held at power-up: pot end-stop calibration
+    # the debouncer was seeded at import with the switch held: its release is not a press
+    db_gpio[0] = mem32[SIO_GPIO_IN] & INPUT_MASK
+    db_gpio[1] = 0
+    db_gpio[2] = 0
+    stable_sw = 1 if db_gpio[0] & SW_BIT else 0
+    stable_layer = 1 if db_gpio[0] & LAYER_BIT else 0
 startup_sequence()
 midi_cc(0, 0)
 show_boot_scan_item()
@@ -952,6 +2692,14 @@ show_boot_scan_item()
 try:
     while True:
         now = time.ticks_ms()
+        now_us = time.ticks_us()   # lanes and debounce; human-scale timers stay on ms
+        if MIDI_IN_ENABLED:
+            midi_in_poll()
+        midi_service(now)
+        if SERIAL_PROTO_ENABLED:
+            serial_poll(now)
+        if LATENCY_PROBE_ENABLED:
+            latency_probe_service()
         update_pot_time_ms(now)
         update_pot_shape(now)
 
@@ -959,29 +2707,50 @@ try:
         if switch_apply_pending and time.ticks_diff(now, switch_mute_until) >= 0:
             switch_apply_pending = False
             apply_current_sound()
+            switch_gap_note(time.ticks_diff(time.ticks_us(), switch_started_us))
 
-        # ----- Read layer switch with debounce (GPIO14 toggles layer) -----
-        rawL = layer_sw.value()
-        if rawL != last_layer:
-            last_layer = rawL
-            last_layer_change = now
+        # Remote CC/PC (MIDI IN) at a safe point (Layer 1, switch up, no tap pending)
+        if (REMOTE_ENABLED and remote_pending and programming_done
+                and runtime_layer == LAYER_PRESET and stable_sw == 1 and (not pending_single_tap)):
+            remote_apply(now)
+
+        # Expansion switch action at the same safe point, after a running switch applied
+        if (EXPANSION_ENABLED and exp_pending >= 0 and programming_done
+                and runtime_layer == LAYER_PRESET and stable_sw == 1 and (not pending_single_tap)
+                and (not switch_apply_pending)):
+            expansion_apply(now)
 
-        if time.ticks_diff(now, last_layer_change) >= DEBOUNCE_MS and stable_layer != last_layer:
-            stable_layer = last_layer
+        # ----- Inputs: one GPIO snapshot, all switches debounced together -----
+        flipped = inputs_sample(now_us)
+
+        # Layer switch (GPIO14 toggles layer)
+        if flipped & LAYER_BIT:
+            stable_layer = 1 if db_gpio[0] & LAYER_BIT else 0
+            if TRACE_ENABLED:
+                trace(TRACE_SWITCH, 1, stable_layer, runtime_layer)
             pending_single_tap = False
 
+            if ACCESS_MODE_ENABLED:
+                if programming_done:
+                    access.edge(stable_layer == 0, now)
             # ✅ FLIP-FLOP TOGGLE: physical position is ignored
-            if runtime_layer == LAYER_PRESET:
+            elif runtime_layer == LAYER_PRESET:
                 enter_effect_layer()
             else:
                 exit_effect_layer()
 
+        # Access mode: GPIO14 hold -> access, footswitch scroll, commit after ACCESS_COMMIT_MS
+        if ACCESS_MODE_ENABLED and programming_done:
+            access.service(now)
+
         # Resolve delayed single-tap (Layer1 Latch + Layer2 apply)
         if pending_single_tap and time.ticks_diff(now, pending_single_tap_deadline) >= 0:
             pending_single_tap = False
             if programming_done:
                 if runtime_layer == LAYER_PRESET:
-                    on_single_tap_layer1()
+                    if not tap_speculated:
+                        on_single_tap_layer1()
+                    tap_speculated = False
                 else:
                     scan_paused = True
                     apply_scanned_setting_and_exit()
@@ -1007,6 +2776,14 @@ try:
             momentary_engaged = False
             holding_off_at = 0
 
+        # Shutter hold-to-run: held past SHUTTER_HOLD_MS => chop until release
+        if (SHUTTER_HOLD_TO_RUN and programming_done and runtime_layer == LAYER_PRESET
+                and mode == MODE_SHUTTER and stable_sw == 0 and press_layer == LAYER_PRESET
+                and (not shutter_active) and (not switch_apply_pending)
+                and time.ticks_diff(now, press_start_ms) > SHUTTER_HOLD_MS):
+            shutter_active = True
+            shutter_start(current_active_pc())
+
         # =========================================================
         # LEGACY delayed OFF (NEW)
         # =========================================================
@@ -1021,46 +2798,50 @@ try:
         # TOGGLE ENGINES STEP
         # =========================================================
 
-        # Shutter toggling (runs while shutter_active)
-        if programming_done and runtime_layer == LAYER_PRESET and mode == MODE_SHUTTER and shutter_active:
-            if time.ticks_diff(now, shutter_next_toggle_at) >= 0:
-                pc = current_active_pc()
-                if shutter_phase_on:
-                    shutter_off_phase(pc)
-                    shutter_phase_on = False
-                else:
-                    shutter_on_phase(pc)
-                    shutter_phase_on = True
-                shutter_next_toggle_at = time.ticks_add(now, pot_time_ms)
+        # Shutter on the relays (runs while shutter_active)
+        if (RELAY_GATE_ENABLED and programming_done and runtime_layer == LAYER_PRESET
+                and mode == MODE_SHUTTER and shutter_active):
+            relay.half(pot_time_ms)     # PIO times the halves, hand over pot changes
+
+        # Lanes: Shutter chop, Harmony / StepSeq steps (one PC per pass)
+        if lane_n and programming_done and runtime_layer == LAYER_PRESET:
+            lane_service(now_us)
 
-        # Harmony runner stepping (runs while harmony_active)
-        if programming_done and runtime_layer == LAYER_PRESET and mode == MODE_HARMONY and harmony_active:
-            if time.ticks_diff(now, harmony_next_step_at) >= 0:
-                harmony_step(now)
+        # Harmony / StepSeq / Modulation (loaded engine, work between steps while active;
+        # StepSeq is started by apply_current_sound)
+        if (ENGINES_ENABLED and programming_done and runtime_layer == LAYER_PRESET
+                and engine is not None and engine_mode == mode and engine.active):
+            engine.service(now)
 
-        # StepSeq runner stepping (ALWAYS runs while in StepSeq mode; started by apply_current_sound)
-        if programming_done and runtime_layer == LAYER_PRESET and mode == MODE_STEPSEQ and stepseq_active:
-            if time.ticks_diff(now, stepseq_next_step_at) >= 0:
-                stepseq_step(now)
+            # StepSeq long-hold => store the pattern that played before this press
+            if (mode == MODE_STEPSEQ and stable_sw == 0 and press_layer == LAYER_PRESET
+                    and (not engine.capture_fired)
+                    and time.ticks_diff(now, press_start_ms) >= STEPSEQ_CAPTURE_HOLD_MS):
+                engine.capture_prev()
 
         # Layer 2 long-hold => restart preset programming (stages 0+1)
         if programming_done and runtime_layer == LAYER_EFFECT and stable_sw == 0:
             if (press_layer == LAYER_EFFECT) and (not layer2_long_hold_fired) and time.ticks_diff(now, press_start_ms) >= LAYER2_REPROGRAM_HOLD_MS:
                 restart_preset_programming()
 
-        # ----- Read footswitch with debounce -----
-        raw = sw.value()
-        if raw != last_sw:
-            last_sw = raw
-            last_change = now
+        # ----- Footswitch (debounced above) -----
+        if flipped & SW_BIT:
+            stable_sw = 1 if db_gpio[0] & SW_BIT else 0
+            if TRACE_ENABLED:
+                trace(TRACE_SWITCH, 0, stable_sw, runtime_layer)
 
-        if time.ticks_diff(now, last_change) >= DEBOUNCE_MS and stable_sw != last_sw:
-            stable_sw = last_sw
+            # Access: preview / scroll / next edit slot (no Layer 1 press or release)
+            if ACCESS_MODE_ENABLED and runtime_layer == LAYER_ACCESS:
+                if stable_sw == 0:
+                    press_layer = LAYER_ACCESS      # still held after access: no Layer 1 hold
+                access.foot(stable_sw == 0, now)
 
             # =========================
             # PRESS
             # =========================
-            if stable_sw == 0:
+            elif stable_sw == 0:
+                if LATENCY_PROBE_ENABLED:
+                    latency_probe_arm()
                 press_start_ms = now
                 press_layer = runtime_layer
 
@@ -1100,35 +2881,42 @@ try:
                         holding_wait_release = False
                         pending_single_tap = False
 
-                    # Shutter / Harmony / StepSeq special handling
-                    elif runtime_layer == LAYER_PRESET and (not switch_apply_pending) and mode in (MODE_SHUTTER, MODE_HARMONY, MODE_STEPSEQ):
+                    # Shutter / Harmony / StepSeq / Modulation special handling
+                    elif runtime_layer == LAYER_PRESET and (not switch_apply_pending) and mode in (MODE_SHUTTER, MODE_HARMONY, MODE_STEPSEQ, MODE_MODULATION):
 
                         # --- SHUTTER: toggle start/stop on press ---
                         if mode == MODE_SHUTTER:
-                            if shutter_active:
+                            if SHUTTER_HOLD_TO_RUN:
+                                pass        # hold-to-run: starts once held past SHUTTER_HOLD_MS
+                            elif shutter_active:
                                 pc = current_active_pc()
                                 shutter_stop(pc)
                                 shutter_active = False
-                                shutter_phase_on = False
-                                shutter_next_toggle_at = 0
                             else:
                                 shutter_active = True
-                                shutter_phase_on = True
                                 pc = current_active_pc()
                                 shutter_start(pc)
-                                shutter_next_toggle_at = time.ticks_add(now, pot_time_ms)
                             pending_single_tap = False
 
                         # --- HARMONY: start on press if not running; do NOT stop on press ---
-                        elif mode == MODE_HARMONY:
-                            if not harmony_active:
-                                harmony_start(now)
+                        elif ENGINES_ENABLED and mode == MODE_HARMONY:
+                            if not engine_active(MODE_HARMONY):
+                                engine.start(now, current_active_pc())
                             pending_single_tap = False
 
                         # --- STEPSEQ: do NOT toggle CC/effect.
-                        #     Instead: create a NEW random pattern immediately.
-                        elif mode == MODE_STEPSEQ:
-                            stepseq_new_random_pattern(now)
+                        #     Instead: create a NEW random pattern (at once, or after the
+                        #     recall window with a bank) or recall the next bank pattern
+                        #     on a quick second tap.
+                        elif ENGINES_ENABLED and mode == MODE_STEPSEQ:
+                            engine.on_press(now)
+                            pending_single_tap = False
+
+                        # --- MODULATION: start on press if not running (release decides the rest) ---
+                        elif ENGINES_ENABLED and mode == MODE_MODULATION:
+                            mod_started_on_press = not engine_active(MODE_MODULATION)
+                            if mod_started_on_press:
+                                engine.start(now, current_active_pc())
                             pending_single_tap = False
 
                     # freeze Layer 2 selection while pressing
@@ -1165,18 +2953,22 @@ try:
                             mode = MODE_STEPSEQ
                         elif selection_index == 8:
                             mode = MODE_LEGACY
+                        elif selection_index == 9:
+                            mode = MODE_MODULATION
                         else:
                             mode = MODE_LATCH
 
+                        if ENGINES_ENABLED:
+                            engine_select(mode)
                         if mode == MODE_LATCH:
                             send_effect_on(0)
                         elif mode == MODE_LEGACY:
                             legacy_momentary_engaged = False
                             legacy_off_at = 0
                             midi_cc(0, 0)
-                        elif mode == MODE_STEPSEQ:
+                        elif ENGINES_ENABLED and mode == MODE_STEPSEQ:
                             midi_cc(0, 127)
-                            stepseq_start(now)
+                            engine.start(now, 0)
                         else:
                             send_effect_off(0)
 
@@ -1184,6 +2976,8 @@ try:
             # RELEASE
             # =========================
             else:
+                if LATENCY_PROBE_ENABLED:
+                    latency_probe_release()
                 press_dur = time.ticks_diff(now, press_start_ms)
 
                 if programming_done:
@@ -1236,29 +3030,62 @@ try:
                                         last_release_ms = now
                                     pending_single_tap = False
 
-                            elif mode in (MODE_SHUTTER, MODE_HARMONY, MODE_STEPSEQ):
-                                # Shutter: nothing on release
-                                if mode == MODE_HARMONY and harmony_active:
+                            elif mode in (MODE_SHUTTER, MODE_HARMONY, MODE_STEPSEQ, MODE_MODULATION):
+                                # Shutter: nothing on release; hold-to-run: stop, or a tap
+                                # (double tap switches preset slot)
+                                if mode == MODE_SHUTTER:
+                                    if SHUTTER_HOLD_TO_RUN and shutter_active:
+                                        shutter_stop(current_active_pc())
+                                        shutter_active = False
+                                        last_release_ms = 0
+                                    elif SHUTTER_HOLD_TO_RUN and press_dur <= SHUTTER_HOLD_MS:
+                                        if time.ticks_diff(now, last_release_ms) <= DOUBLE_TAP_WINDOW_MS:
+                                            last_release_ms = 0
+                                            on_double_tap_layer1()
+                                        else:
+                                            last_release_ms = now
+
+                                elif ENGINES_ENABLED and mode == MODE_HARMONY and engine_active(MODE_HARMONY):
                                     if press_dur < MOMENTARY_HOLD_MS:
-                                        cycle_harmony_mode()
-                                        harmony_restart(now)
+                                        engine.cycle()
+                                        engine.restart(now)
                                     else:
-                                        harmony_stop()
+                                        engine.stop(current_active_pc())
 
-                                # StepSeq: NOTHING on release now
-                                elif mode == MODE_STEPSEQ:
-                                    pass
+                                # StepSeq: short tap arms the bank recall window
+                                elif ENGINES_ENABLED and mode == MODE_STEPSEQ:
+                                    if press_dur <= TAP_MAX_MS and (not engine.capture_fired):
+                                        last_release_ms = now
+                                    else:
+                                        last_release_ms = 0
+                                    engine.on_release(now, last_release_ms != 0)
 
-                            # LATCH logic stays unchanged
+                                # Modulation: short tap => next waveform, long press => stop
+                                elif ENGINES_ENABLED and mode == MODE_MODULATION and engine_active(MODE_MODULATION) and (not mod_started_on_press):
+                                    if press_dur < MOMENTARY_HOLD_MS:
+                                        engine.cycle()
+                                    else:
+                                        engine.stop(current_active_pc())
+
+                            # LATCH: single tap toggles, double tap switches preset
                             if mode == MODE_LATCH:
                                 if press_dur <= LAYER2_TAP_MAX_MS:
                                     if pending_single_tap and time.ticks_diff(now, last_release_ms) <= DOUBLE_TAP_WINDOW_MS:
                                         pending_single_tap = False
-                                        on_double_tap_layer1()
+                                        if tap_speculated:
+                                            tap_speculated = False
+                                            undo_speculative_tap_and_switch()
+                                        else:
+                                            on_double_tap_layer1()
                                     else:
+                                        # the window stays open either way: it still decides
+                                        # double tap vs. single tap and holds remote/expansion
                                         pending_single_tap = True
                                         last_release_ms = now
                                         pending_single_tap_deadline = time.ticks_add(now, DOUBLE_TAP_WINDOW_MS)
+                                        tap_speculated = LATCH_SPECULATIVE_TAP
+                                        if tap_speculated:
+                                            on_single_tap_layer1()
                             else:
                                 pending_single_tap = False
 
@@ -1341,6 +3168,9 @@ try:
             if (not scan_paused) and time.ticks_diff(now, last_scan_step_ms) >= SCAN_INTERVAL_MS_BOOT:
                 last_scan_step_ms = now
                 selection_index = (selection_index + 1) % len(SETTINGS)
+                if not ENGINES_ENABLED:
+                    while SETTING_MODES[selection_index] in ENGINE_MODES:
+                        selection_index = (selection_index + 1) % len(SETTINGS)
                 show_settings_layer_scan_item()
 
         # =========================
@@ -1352,9 +3182,12 @@ try:
                 selection_index = (selection_index + scan_direction) % len(PRESETS)
             else:
                 selection_index = (selection_index + scan_direction) % len(SETTINGS)
+                if not ENGINES_ENABLED:
+                    while SETTING_MODES[selection_index] in ENGINE_MODES:
+                        selection_index = (selection_index + scan_direction) % len(SETTINGS)
             show_boot_scan_item()
 
-        time.sleep_ms(1)
+        loop_idle()
 
 except KeyboardInterrupt:
     pass
@@ -0,0 +1,171 @@
+# Melatroid - Whammy 4 - switch bounce analysis (RP2040 + PC)
+"""
+Groups raw switch edges into bursts (one press, release or glitch each) and recommends
+the shortest safe debounce per switch. The same code runs on the board
+(Hardware_Test_Midi_Access.py, TEST_MODE = "bounce", upload this file next to it) and
+on the PC for a captured log of its "E <gpio> <level> <t_us>" lines:
+
+    python bounce_analysis.py capture.txt [--quiet-ms 20] [--margin 25]
+
+A burst ends after QUIET_US without an edge. Per burst: bounce duration (first to last
+edge), edge count and the longest gap between two of its edges. A debouncer that wants
+the input stable for DEBOUNCE_MS (NEO: 4 samples DEBOUNCE_MS * 1000 // 3 us apart on a
+ticks_us deadline, test scripts: time since the last change) never takes a bounce for a
+switch action as long as DEBOUNCE_MS is longer than every such gap (and every glitch),
+so the recommendation is the worst of them + MARGIN_PERCENT, rounded up to whole ms.
+On NEO a recommendation of 1..2 ms means every main loop pass samples: the debounce is
+then 4 passes (~4 ms), not DEBOUNCE_MS.
+"""
+
+QUIET_US = 20000
+MARGIN_PERCENT = 25
+
+PRESS = 0       # pull-up: settles low
+RELEASE = 1     # settles high
+GLITCH = 2      # edges that settle back on the old level
+KIND_NAMES = ("press", "release", "glitch")
+
+TICKS_PERIOD = 1 << 30   # ticks_us wrap on the RP2040
+
+
+def ticks_diff(later: int, earlier: int) -> int:
+    d = (later - earlier) & (TICKS_PERIOD - 1)
+    return d - TICKS_PERIOD if d >= TICKS_PERIOD // 2 else d
+
+
+def percentile(sorted_vals, p: int) -> int:
+    """Nearest-rank percentile of an ascending list (0 for an empty one)."""
+    n = len(sorted_vals)
+    if n == 0:
+        return 0
+    k = (p * n + 99) // 100 - 1
+    return sorted_vals[min(max(k, 0), n - 1)]
+
+
+class BounceAnalyzer:
+    """Feed edges in time order with feed(); settle() closes bursts that went quiet."""
+
+    def __init__(self, quiet_us=QUIET_US, margin_percent=MARGIN_PERCENT):
+        self.quiet_us = quiet_us
+        self.margin_percent = margin_percent
+        self.open = {}      # gpio -> [first_t, last_t, edges, max_gap_us, last level]
+        self.level = {}     # gpio -> settled level after the last closed burst
+        self.bursts = {}    # (gpio, kind) -> [(duration_us, max_gap_us, edges)]
+        self.edges = 0
+
+    def feed(self, gpio: int, level: int, t_us: int):
+        self.edges += 1
+        b = self.open.get(gpio)
+        if b is not None and ticks_diff(t_us, b[1]) > self.quiet_us:
+            self._close(gpio)
+            b = None
+        if b is None:
+            self.open[gpio] = [t_us, t_us, 1, 0, level]
+            return
+        gap = ticks_diff(t_us, b[1])
+        if gap > b[3]:
+            b[3] = gap
+        b[1] = t_us
+        b[2] += 1
+        b[4] = level
+
+    def settle(self, now_us: int):
+        for gpio in [g for g, b in self.open.items() if ticks_diff(now_us, b[1]) > self.quiet_us]:
+            self._close(gpio)
+
+    def finish(self):
+        for gpio in list(self.open):
+            self._close(gpio)
+
+    def _close(self, gpio: int):
+        first, last, edges, max_gap, level = self.open.pop(gpio)
+        old = self.level.get(gpio, 1 - level)
+        kind = GLITCH if level == old else (PRESS if level == 0 else RELEASE)
+        self.level[gpio] = level
+        duration = ticks_diff(last, first)
+        if kind == GLITCH and edges == 2:
+            max_gap = duration          # a single pulse: its width is what a debouncer sees
+        self.bursts.setdefault((gpio, kind), []).append((duration, max_gap, edges))
+
+    def count(self, gpio: int, kind: int) -> int:
+        return len(self.bursts.get((gpio, kind), ()))
+
+    def gpios(self):
+        return sorted(set(g for g, _k in self.bursts))
+
+    def worst_gap_us(self, gpio: int) -> int:
+        worst = 0
+        for kind in (PRESS, RELEASE, GLITCH):
+            for _d, gap, _e in self.bursts.get((gpio, kind), ()):
+                if gap > worst:
+                    worst = gap
+        return worst
+
+    def recommend_ms(self, gpio: int) -> int:
+        """
+        Shortest safe DEBOUNCE_MS for this switch (worst gap + margin, whole ms, >= 1).
+        NEO quantises 1..2 to one sample per main loop pass (debounce = 4 passes).
+        """
+        us = self.worst_gap_us(gpio) * (100 + self.margin_percent) // 100
+        return max(1, (us + 999) // 1000)
+
+    def report(self):
+        """Report lines: bounce duration distribution per switch and direction + advice."""
+        lines = ["=== BOUNCE (%d edges, burst ends after %d us quiet) ===" % (
+            self.edges, self.quiet_us)]
+        overall = 0
+        for gpio in self.gpios():
+            for kind in (PRESS, RELEASE, GLITCH):
+                bursts = self.bursts.get((gpio, kind), ())
+                if not bursts:
+                    continue
+                durations = sorted(d for d, _g, _e in bursts)
+                edges = max(e for _d, _g, e in bursts)
+                gap = max(g for _d, g, _e in bursts)
+                lines.append("GPIO%d %-7s n=%d bounce us p50=%d p95=%d p99=%d max=%d"
+                             " | edges max=%d gap max=%dus" % (
+                                 gpio, KIND_NAMES[kind], len(bursts), percentile(durations, 50),
+                                 percentile(durations, 95), percentile(durations, 99),
+                                 durations[-1], edges, gap))
+            ms = self.recommend_ms(gpio)
+            overall = max(overall, ms)
+            lines.append("GPIO%d min safe debounce: %d ms (worst gap %d us + %d %%)" % (
+                gpio, ms, self.worst_gap_us(gpio), self.margin_percent))
+        if overall:
+            lines.append("=> DEBOUNCE_MS >= %d (one value for all switches in NEO)" % overall)
+        return lines
+
+
+def parse_edge(line: str):
+    """(gpio, level, t_us) from an "E <gpio> <level> <t_us>" log line, else None."""
+    parts = line.split()
+    if len(parts) != 4 or parts[0] != "E":
+        return None
+    try:
+        return int(parts[1]), int(parts[2]), int(parts[3])
+    except ValueError:
+        return None
+
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser(description="switch bounce analysis of a captured edge log")
+    ap.add_argument("capture", help="serial log of Hardware_Test_Midi_Access.py (TEST_MODE bounce)")
+    ap.add_argument("--quiet-ms", type=float, default=QUIET_US / 1000.0,
+                    help="quiet time that ends a burst (default %(default)s)")
+    ap.add_argument("--margin", type=int, default=MARGIN_PERCENT,
+                    help="safety margin in %% on the worst gap (default %(default)s)")
+    args = ap.parse_args()
+    an = BounceAnalyzer(int(args.quiet_ms * 1000), args.margin)
+    with open(args.capture, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            edge = parse_edge(line)
+            if edge is not None:
+                an.feed(*edge)
+    an.finish()
+    for line in an.report():
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# Melatroid - Whammy 4 - pot ADC noise and linearity profile (RP2040 + PC)
+"""
+Profiles the pot from blocks of back-to-back ADC reads taken at known knob positions
+(0 %, 25 %, ... of the travel) and derives the pot filter parameters and a calibration
+table. The same code runs on the board (Hardware_Test_Midi_Access.py, TEST_MODE = "pot",
+upload this file next to it) and on the PC for a captured log of its
+"P <knob_u16> <mean> <sd> <min> <max>" lines:
+
+    python pot_analysis.py capture.txt [-o pot_cal.json]
+
+Per knob position: mean, standard deviation and peak-to-peak of the reads. From those:
+the noise floor (noisiest position), the end stops and their dead zones (knob travel
+at either end where the reading no longer moves, found by extending the neighbouring
+slope to the end-stop reading) and the linearity curve (deviation from a straight line
+over the live travel, in % of the span). The filter suggestions keep 3 sigma of the
+filtered reading inside half an 8-bit pot step.
+
+pot_cal.json maps raw readings (ascending breakpoints) to positions 0..65535 over the
+live travel, so both end stops are reachable and the taper is straightened; hyst_u16
+is the raw noise peak-to-peak. NEO loads it at boot (see POT CALIBRATION in main.py).
+"""
+import math
+
+NOISE_SIGMAS = 3
+STEP_8BIT = 257             # one 8-bit pot step in u16 (65535 // 255)
+CAL_VERSION = 1
+
+
+def _cross(p, q, r_target):
+    """Knob position where the line through points p, q reaches r_target (None if flat)."""
+    if q[1] <= p[1]:
+        return None
+    return p[0] + (r_target - p[1]) * (q[0] - p[0]) / (q[1] - p[1])
+
+
+def _clamp(v, lo, hi):
+    return lo if v < lo else hi if v > hi else v
+
+
+class PotProfile:
+    """add_block() per knob position, then report() / table()."""
+
+    def __init__(self):
+        self.points = []    # (knob_u16, mean, sd, min, max), sorted by knob position
+
+    def add(self, knob_u16: int, mean, sd, lo: int, hi: int):
+        point = (knob_u16, mean, sd, lo, hi)
+        self.points.append(point)
+        self.points.sort()
+        return point
+
+    def add_block(self, knob_u16: int, buf, n: int = 0):
+        """Statistics of the first n reads in buf (all by default), added as one point."""
+        n = n or len(buf)
+        lo = 65535
+        hi = 0
+        s = 0
+        for i in range(n):
+            v = buf[i]
+            s += v
+            if v < lo:
+                lo = v
+            if v > hi:
+                hi = v
+        mean = s / n
+        q = 0.0
+        for i in range(n):
+            d = buf[i] - mean
+            q += d * d
+        return self.add(knob_u16, mean, math.sqrt(q / n), lo, hi)
+
+    def noise(self):
+        """(sd, peak-to-peak) in u16 of the noisiest position (ADC-clipped ends skipped)."""
+        pts = [p for p in self.points if p[3] > 0 and p[4] < 65535] or self.points
+        return max(p[2] for p in pts), max(p[4] - p[3] for p in pts)
+
+    def analyse(self):
+        """
+        Travel analysis, None without a usable sweep (< 2 positions, pot not moving):
+        {"flip", "start", "end", "live": [(knob_u16, reading, deviation %)], "r0", "r1"}
+        Readings are mirrored (65535 - mean) when the pot is wired reversed.
+        """
+        if len(self.points) < 2:
+            return None
+        flip = self.points[-1][1] < self.points[0][1]
+        pts = [(p[0], 65535 - p[1] if flip else p[1]) for p in self.points]
+        sd, pp = self.noise()
+        tol = max(pp, 2 * NOISE_SIGMAS * sd, 1)
+        n = len(pts)
+        r0 = pts[0][1]
+        r1 = pts[-1][1]
+        if r1 - r0 <= 2 * tol:
+            return None
+        if n == 2:
+            # only the two ends: the live travel is the span between them, no dead zones
+            live = [(knob, r, 0.0) for knob, r in pts]
+            return {"flip": flip, "start": pts[0][0], "end": pts[1][0], "live": live,
+                    "r0": r0, "r1": r1}
+        lo = 1                  # first position above the low end stop
+        while lo < n - 1 and pts[lo][1] - r0 <= tol:
+            lo += 1
+        hi = n - 2              # last position below the high end stop
+        while hi > 0 and r1 - pts[hi][1] <= tol:
+            hi -= 1
+        start = _cross(pts[lo], pts[lo + 1], r0)
+        start = pts[lo - 1][0] if start is None else _clamp(start, pts[lo - 1][0], pts[lo][0])
+        end = _cross(pts[hi - 1], pts[hi], r1) if hi > 0 else None
+        end = pts[hi + 1][0] if end is None else _clamp(end, pts[hi][0], pts[hi + 1][0])
+        live = []
+        for knob, r in pts[lo:hi + 1]:
+            ideal = r0 + (knob - start) * (r1 - r0) / (end - start)
+            live.append((knob, r, (r - ideal) * 100.0 / (r1 - r0)))
+        return {"flip": flip, "start": start, "end": end, "live": live, "r0": r0, "r1": r1}
+
+    def suggest(self):
+        """Filter parameters for the pot code of the test scripts and firmwares."""
+        sd, pp = self.noise()
+        spread = 2 * NOISE_SIGMAS * sd / STEP_8BIT      # 6 sigma in 8-bit steps
+        den = 1                 # EMA alpha 1/den: sd * sqrt(1 / (2 * den - 1))
+        while den < 64 and spread * spread > 2 * den - 1:
+            den *= 2
+        ema_steps = spread / math.sqrt(2 * den - 1)
+        return {
+            "POT_SMOOTH_ALPHA_DEN": den,
+            "POT_PRINT_THRESHOLD_8BIT": int(math.ceil(ema_steps)) + 1,
+            "hyst_u16": max(1, int(math.ceil(pp))),
+        }
+
+    def table(self):
+        """Calibration table for pot_cal.json (None without a usable sweep)."""
+        a = self.analyse()
+        if a is None:
+            return None
+        start, end = a["start"], a["end"]
+        rows = [(a["r0"], 0)]
+        for knob, r, _dev in a["live"]:
+            if r > rows[-1][0]:
+                rows.append((r, _clamp(int((knob - start) * 65535 / (end - start) + 0.5), 0, 65535)))
+        while len(rows) > 1 and rows[-1][0] >= a["r1"]:
+            rows.pop()          # non-monotonic reading next to the high end stop
+        rows.append((a["r1"], 65535))
+        if a["flip"]:
+            rows = [(65535 - r, pos) for r, pos in reversed(rows)]
+        sd, _pp = self.noise()
+        return {
+            "version": CAL_VERSION,
+            "raw": [int(r + 0.5) for r, _pos in rows],
+            "pos": [pos for _r, pos in rows],
+            "hyst_u16": self.suggest()["hyst_u16"],
+            "noise_sd_u16": round(sd, 1),
+            "dead_low_pct": round(start * 100.0 / 65535, 1),
+            "dead_high_pct": round(100 - end * 100.0 / 65535, 1),
+        }
+
+    def report(self):
+        """Report lines: per position, noise floor, end stops, dead zones, linearity, advice."""
+        lines = ["=== POT PROFILE (%d knob positions) ===" % len(self.points)]
+        a = self.analyse()
+        devs = {}
+        if a is not None:
+            for knob, _r, dev in a["live"]:
+                devs[knob] = dev
+        for knob, mean, sd, lo, hi in self.points:
+            dev = " | linearity %+.1f %%" % devs[knob] if knob in devs else ""
+            lines.append("knob %3d %%: mean %7.1f sd %6.1f p-p %5d (%d..%d)%s" % (
+                (knob * 100 + 32767) // 65535, mean, sd, hi - lo, lo, hi, dev))
+        if not self.points:
+            return lines
+        sd, pp = self.noise()
+        lines.append("noise floor: sd %.1f u16 (%.2f 8-bit steps), p-p %d u16" % (
+            sd, sd / STEP_8BIT, pp))
+        if a is None:
+            lines.append("no usable sweep: need >= 2 knob positions over the travel")
+            return lines
+        lo_end = self.points[0][1]
+        hi_end = self.points[-1][1]
+        lines.append("end stops: %d .. %d of 0..65535 (%.1f %% of the ADC range)%s" % (
+            lo_end, hi_end, abs(hi_end - lo_end) * 100.0 / 65535,
+            ", reversed wiring" if a["flip"] else ""))
+        lines.append("dead zones: low %.1f %%, high %.1f %% of the knob travel" % (
+            a["start"] * 100.0 / 65535, 100 - a["end"] * 100.0 / 65535))
+        if a["live"]:
+            worst = max(a["live"], key=lambda p: abs(p[2]))
+            lines.append("linearity: worst %+.1f %% of the span at knob %d %%%s" % (
+                worst[2], (worst[0] * 100 + 32767) // 65535,
+                " (log/audio taper?)" if abs(worst[2]) > 15 else ""))
+        s = self.suggest()
+        lines.append("suggested: POT_SMOOTH_ALPHA_DEN = %d, POT_PRINT_THRESHOLD_8BIT = %d"
+                     " (Hardware_Test_Midi_Access.py)" % (
+                         s["POT_SMOOTH_ALPHA_DEN"], s["POT_PRINT_THRESHOLD_8BIT"]))
+        lines.append("suggested: hysteresis %d u16 (pot_cal.json hyst_u16, NEO)" % s["hyst_u16"])
+        return lines
+
+
+def point_line(point) -> str:
+    """Log line of one knob position (parsed back by parse_point)."""
+    return "P %d %.1f %.2f %d %d" % point
+
+
+def parse_point(line: str):
+    """(knob_u16, mean, sd, min, max) from a "P ..." log line, else None."""
+    parts = line.split()
+    if len(parts) != 6 or parts[0] != "P":
+        return None
+    try:
+        return (int(parts[1]), float(parts[2]), float(parts[3]), int(parts[4]),
+                int(parts[5]))
+    except ValueError:
+        return None
+
+
+def save_table(cal, path: str):
+    import json
+    with open(path, "w") as f:
+        json.dump(cal, f)
+
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser(description="pot noise/linearity profile of a captured log")
+    ap.add_argument("capture", help="serial log of Hardware_Test_Midi_Access.py (TEST_MODE pot)")
+    ap.add_argument("-o", "--output", default="pot_cal.json",
+                    help="calibration table to write (default %(default)s)")
+    args = ap.parse_args()
+    prof = PotProfile()
+    with open(args.capture, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            point = parse_point(line)
+            if point is not None:
+                prof.add(*point)
+    for line in prof.report():
+        print(line)
+    cal = prof.table()
+    if cal is not None:
+        save_table(cal, args.output)
+        print("calibration table written to", args.output)
+
+
+if __name__ == "__main__":
+    main()